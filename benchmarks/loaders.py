@@ -0,0 +1,158 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Medir la conversión de filas en instancias de los modelos.
+
+Compara el camino anterior (un diccionario por fila y `cls(**row)`
+después de recorrer `dataclasses.fields` en cada fila) con los cargadores
+precompilados de `Model._row_loader`, y lo mismo para `_to_dict`. Se
+mide tanto la conversión sola, sobre filas ya leídas, como la lectura
+completa desde una base de datos SQLite en memoria:
+
+    python -m benchmarks.loaders --rows 2000 --model parrafo
+"""
+
+import argparse
+import dataclasses
+import json
+import sys
+import time
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.loaders',
+        description='Medir la conversión de filas en instancias de los modelos',
+        )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        default=2000,
+        help='Filas de cada modelo que no es subordinado de otro',
+        )
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument('--repeat', type=int, default=5, help='Repeticiones de cada medida')
+    parser.add_argument(
+        '--model',
+        action='append',
+        help='Modelos a medir (por defecto, Parrafo y DS_Sumario)',
+        )
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def legacy_from_dict(model, row):
+    """`Model._from_dict` tal como era antes de precompilar los cargadores.
+    """
+    _fields = set(_.name for _ in dataclasses.fields(model))
+    for name in list(row.keys()):
+        if name not in _fields:
+            row.pop(name)
+    return model(**row)
+
+
+def legacy_to_dict(model, obj):
+    names = [_.name for _ in dataclasses.fields(model)]
+    return {name: getattr(obj, name) for name in names}
+
+
+def best(func, repeat) -> float:
+    """Mejor tiempo de `repeat` ejecuciones, en segundos.
+    """
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        seconds = time.perf_counter() - start
+        result = seconds if result is None else min(result, seconds)
+    return result
+
+
+def compare(num_rows, before, after, repeat) -> dict:
+    seconds_before = best(before, repeat)
+    seconds_after = best(after, repeat)
+    return {
+        'rows': num_rows,
+        'before_rows_per_second': round(num_rows / seconds_before),
+        'after_rows_per_second': round(num_rows / seconds_after),
+        'speedup': round(seconds_before / seconds_after, 2),
+        }
+
+
+def measure(dbc, model, repeat) -> dict:
+    import dba
+    import dml
+    sql = dml.Select(dba.as_list(model._field_names())).From(model.Meta.table_name)
+    with dba.cursor(dbc) as cur:
+        cur.execute(str(sql))
+        columns = tuple(desc[0].lower() for desc in cur.description)
+        rows = cur.fetchall()
+    loader = model._row_loader(columns)
+    instances = [loader(row) for row in rows]
+    return {
+        'convert': compare(
+            len(rows),
+            lambda: [legacy_from_dict(model, dict(zip(columns, row))) for row in rows],
+            lambda: [loader(row) for row in rows],
+            repeat,
+            ),
+        'query': compare(
+            len(rows),
+            lambda: dba.get_rows(dbc, sql, cast=lambda row: legacy_from_dict(model, row)),
+            lambda: dba.get_rows(dbc, sql, rowfactory=model._row_loader),
+            repeat,
+            ),
+        'to_dict': compare(
+            len(instances),
+            lambda: [legacy_to_dict(model, obj) for obj in instances],
+            lambda: [model._to_dict(obj) for obj in instances],
+            repeat,
+            ),
+        }
+
+
+def run(options):
+    import dba
+    from benchmarks import synthetic
+
+    all_models = synthetic.all_models()
+    generator = synthetic.Generator(
+        num_rows=options.rows,
+        fanout=options.fanout,
+        seed=options.seed,
+        )
+    dbc = dba.get_sqlite_connection(':memory:')
+    generated = synthetic.populate(dbc, all_models, generator)
+    names = options.model or ['parrafo', 'ds_sumario']
+    selected = [
+        model for model in all_models
+        if model.__name__.lower() in [name.lower() for name in names]
+        ]
+    if not selected:
+        raise ValueError(f'Modelos desconocidos: {dba.as_list(names)}')
+    results = {
+        model.__name__: measure(dbc, model, options.repeat)
+        for model in selected
+        }
+    dbc.close()
+    return {
+        'meta': {
+            'rows': options.rows,
+            'fanout': options.fanout,
+            'repeat': options.repeat,
+            'seed': options.seed,
+            'models': {model.__name__: generated[model.__name__] for model in selected},
+            'fields': {model.__name__: len(model._field_names()) for model in selected},
+            },
+        **results,
+        }
+
+
+def main():
+    options = get_parser().parse_args()
+    print(json.dumps(run(options), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
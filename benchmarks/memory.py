@@ -0,0 +1,132 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Medir la memoria que ocupa un lote de filas cargadas.
+
+Carga un lote representativo de subordinados (todos los `Parrafo` de
+varias noticias, todos los `DS_Sumario` de varios diarios...) desde una
+base de datos SQLite en memoria y mide, con `tracemalloc`, cuánto ocupa
+en cada representación:
+
+- `dicts`: un diccionario por fila, como devuelve `dba.get_rows`.
+- `dataclass`: instancias de una *dataclass* sin `slots`, como eran los
+  modelos antes.
+- `slots`: instancias de los modelos del catálogo, con `slots=True`.
+- `tuples`: las tuplas tal como vienen del cursor, como referencia.
+
+    python -m benchmarks.memory --rows 2000 --model parrafo
+"""
+
+import argparse
+import dataclasses
+import gc
+import json
+import sys
+import tracemalloc
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.memory',
+        description='Medir la memoria de un lote de filas en cada representación',
+        )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        default=2000,
+        help='Filas de cada modelo que no es subordinado de otro',
+        )
+    parser.add_argument('--fanout', type=int, default=5)
+    parser.add_argument(
+        '--model',
+        action='append',
+        help='Modelos a medir (por defecto, Parrafo y DS_Sumario)',
+        )
+    parser.add_argument('--seed', type=int, default=0)
+    return parser
+
+
+def without_slots(model):
+    """Copia del modelo como *dataclass* normal, con `__dict__`.
+    """
+    return dataclasses.make_dataclass(
+        model.__name__,
+        [(field.name, field.type) for field in dataclasses.fields(model)],
+        )
+
+
+def allocated(build) -> int:
+    """Bytes que siguen reservados después de construir el lote con `build`.
+    """
+    gc.collect()
+    before, _peak = tracemalloc.get_traced_memory()
+    batch = build()
+    gc.collect()
+    after, _peak = tracemalloc.get_traced_memory()
+    del batch
+    return after - before
+
+
+def measure(dbc, model) -> dict:
+    import dba
+    import dml
+    sql = dml.Select(dba.as_list(model._field_names())).From(model.Meta.table_name)
+    plain = without_slots(model)
+    representations = {
+        'dicts': lambda: dba.get_rows(dbc, sql),
+        'dataclass': lambda: dba.get_rows(dbc, sql, cast=lambda row: plain(**row)),
+        'slots': lambda: dba.get_rows(dbc, sql, rowfactory=model._row_loader),
+        'tuples': lambda: dba.get_rows(dbc, sql, rowfactory=lambda columns: tuple),
+        }
+    num_rows = dba.get_scalar(dbc, f'SELECT Count(*) FROM {model.Meta.table_name}')
+    result = {'rows': num_rows}
+    for name, build in representations.items():
+        size = allocated(build)
+        result[name] = {
+            'kib': round(size / 1024, 1),
+            'bytes_per_row': round(size / num_rows, 1) if num_rows else None,
+            }
+    return result
+
+
+def run(options):
+    import dba
+    from benchmarks import synthetic
+
+    all_models = synthetic.all_models()
+    generator = synthetic.Generator(
+        num_rows=options.rows,
+        fanout=options.fanout,
+        seed=options.seed,
+        )
+    dbc = dba.get_sqlite_connection(':memory:')
+    synthetic.populate(dbc, all_models, generator)
+    names = [name.lower() for name in options.model or ['parrafo', 'ds_sumario']]
+    selected = [model for model in all_models if model.__name__.lower() in names]
+    if not selected:
+        raise ValueError(f'Modelos desconocidos: {dba.as_list(names)}')
+    tracemalloc.start()
+    try:
+        results = {model.__name__: measure(dbc, model) for model in selected}
+    finally:
+        tracemalloc.stop()
+        dbc.close()
+    return {
+        'meta': {
+            'rows': options.rows,
+            'fanout': options.fanout,
+            'seed': options.seed,
+            'python': sys.version.split()[0],
+            },
+        **results,
+        }
+
+
+def main():
+    options = get_parser().parse_args()
+    print(json.dumps(run(options), indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
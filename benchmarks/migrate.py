@@ -0,0 +1,245 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Medir el rendimiento de `madrox migrate` y `madrox duplicate`.
+
+Genera datos sintéticos para todo el catálogo en una base de datos
+SQLite de origen, migra a otra de destino y guarda, para cada modelo,
+las filas escritas por segundo, los viajes a la base de datos y el pico
+de memoria en un fichero JSON, para poder comparar unas versiones con
+otras:
+
+    python -m benchmarks.migrate --rows 1000 --fanout 5 -o antes.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(
+        prog='benchmarks.migrate',
+        description='Medir la migración del catálogo entre dos bases de datos SQLite',
+        )
+    parser.add_argument(
+        '--rows',
+        type=int,
+        default=500,
+        help='Filas de cada modelo que no es subordinado de otro',
+        )
+    parser.add_argument(
+        '--fanout',
+        type=int,
+        default=5,
+        help='Filas subordinadas por cada fila maestra',
+        )
+    parser.add_argument(
+        '--num-days',
+        type=int,
+        default=7,
+        help='Días hacia atrás de las fechas generadas y de la migración',
+        )
+    parser.add_argument(
+        '--batch-size',
+        type=int,
+        default=500,
+        help='Tamaño de lote de migrate (0 para migrar de uno en uno)',
+        )
+    parser.add_argument(
+        '--samples',
+        type=int,
+        default=20,
+        help='Registros de cada modelo a copiar con duplicate',
+        )
+    parser.add_argument(
+        '--upsert',
+        action='store_true',
+        help='Migrar con MERGE (INSERT ... ON CONFLICT en SQLite)',
+        )
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument(
+        '--workdir',
+        help='Directorio para las bases de datos (por defecto, uno temporal)',
+        )
+    parser.add_argument('-o', '--output', help='Fichero JSON de resultados')
+    parser.add_argument('-v', '--verbose', action='store_true')
+    return parser
+
+
+def total_rows(dbc, all_models) -> int:
+    import dba
+    return sum(
+        dba.get_scalar(dbc, f'SELECT Count(*) FROM {model.Meta.table_name}')
+        for model in all_models
+        )
+
+
+def measure(func, count_rows):
+    """Ejecutar `func` y medir tiempo, filas escritas, viajes a la base
+    de datos y pico de memoria.
+    """
+    import dba
+    rows_before = count_rows()
+    round_trips = dba.round_trips.value
+    tracemalloc.reset_peak()
+    start = time.perf_counter()
+    func()
+    seconds = time.perf_counter() - start
+    _current, peak = tracemalloc.get_traced_memory()
+    rows = count_rows() - rows_before
+    return {
+        'rows': rows,
+        'seconds': round(seconds, 4),
+        'rows_per_second': round(rows / seconds, 1) if seconds else None,
+        'round_trips': dba.round_trips.value - round_trips,
+        'peak_memory_kib': round(peak / 1024, 1),
+        }
+
+
+def run(options):
+    # Las variables de entorno tienen que estar antes de importar
+    # `settings`, porque se leen al cargar el módulo
+    workdir = options.workdir or tempfile.mkdtemp(prefix='madrox-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    source = os.path.join(workdir, 'source.db')
+    target = os.path.join(workdir, 'target.db')
+    os.environ['DB_SOURCE'] = f'sqlite:///{source}'
+    os.environ['DB_TARGET'] = f'sqlite:///{target}'
+    os.environ['MADROX_STATE_DB'] = os.path.join(workdir, 'madrox.db')
+    os.chdir(workdir)  # Aquí va también madrox.log
+
+    import rich
+    import rich.console
+    import dba
+    import madrox
+    from benchmarks import synthetic
+
+    if not options.verbose:
+        rich.reconfigure(quiet=True)
+    all_models = synthetic.all_models()
+    generator = synthetic.Generator(
+        num_rows=options.rows,
+        fanout=options.fanout,
+        num_days=options.num_days,
+        seed=options.seed,
+        )
+    with dba.connection('DB_SOURCE') as dbc:
+        generated = synthetic.populate(dbc, all_models, generator)
+        keys = {
+            model: [row['pk'] for row in dba.get_rows(
+                dbc,
+                f'SELECT {model.Meta.primary_key} AS pk FROM {model.Meta.table_name}'
+                f' ORDER BY {model.Meta.primary_key}',
+                )][:options.samples]
+            for model in all_models
+            }
+    migrables = [model for model in all_models if model._is_migrable()]
+
+    def reset_target():
+        with dba.connection('DB_TARGET') as dbc:
+            synthetic.create_schema(dbc, all_models)
+
+    def count_rows():
+        with dba.connection('DB_TARGET') as dbc:
+            return total_rows(dbc, all_models)
+
+    def make_handler():
+        handler = madrox.Handler()
+        if not options.verbose:
+            handler.console = rich.console.Console(quiet=True)
+        handler.is_verbose = options.verbose
+        handler.is_muted = not options.verbose
+        return handler
+
+    tracemalloc.start()
+    results = {'migrate': {}, 'duplicate': {}}
+
+    # migrate: un modelo cada vez, en orden de dependencias
+    reset_target()
+    handler = make_handler()
+    for model in migrables:
+        migrate_options = argparse.Namespace(
+            model=[model.__name__.lower()],
+            num_days=options.num_days,
+            batch_size=options.batch_size,
+            workers=1,
+            incremental=False,
+            hash_check=False,
+            upsert=options.upsert,
+            resume=False,
+            metrics_json=None,
+            metrics_prom=None,
+            verbose=options.verbose,
+            muted=not options.verbose,
+            )
+        results['migrate'][model.__name__] = measure(
+            lambda: handler.cmd_migrate(migrate_options),
+            count_rows,
+            )
+    handler.close()
+
+    # duplicate: unos cuantos registros de cada modelo, sobre un destino vacío
+    reset_target()
+    handler = make_handler()
+    for model in migrables:
+        def duplicate(model=model):
+            for pk in keys[model]:
+                handler.cmd_duplicate(argparse.Namespace(
+                    model=model.__name__.lower(),
+                    pk=pk,
+                    verbose=options.verbose,
+                    ))
+        results['duplicate'][model.__name__] = measure(duplicate, count_rows)
+    handler.close()
+    tracemalloc.stop()
+
+    for command in ('migrate', 'duplicate'):
+        measures = results[command].values()
+        rows = sum(_['rows'] for _ in measures)
+        seconds = sum(_['seconds'] for _ in measures)
+        results[command]['total'] = {
+            'rows': rows,
+            'seconds': round(seconds, 4),
+            'rows_per_second': round(rows / seconds, 1) if seconds else None,
+            'round_trips': sum(_['round_trips'] for _ in measures),
+            'peak_memory_kib': max(_['peak_memory_kib'] for _ in measures),
+            }
+    return {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'rows': options.rows,
+            'fanout': options.fanout,
+            'num_days': options.num_days,
+            'batch_size': options.batch_size,
+            'upsert': options.upsert,
+            'samples': options.samples,
+            'seed': options.seed,
+            },
+        'generated': generated,
+        **results,
+        }
+
+
+def main():
+    options = get_parser().parse_args()
+    output = options.output and os.path.abspath(options.output)
+    report = run(options)
+    text = json.dumps(report, indent=2)
+    if output:
+        with open(output, 'w') as f:
+            f.write(text)
+    else:
+        print(text)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Datos sintéticos para los modelos del catálogo.
+
+Crea las tablas de todos los modelos alcanzables desde `models.catalog`
+en una base de datos SQLite y las rellena con datos inventados pero
+coherentes: las claves ajenas de `depends_on` apuntan a filas que
+existen, y cada maestro (`master_of`) tiene `fanout` filas subordinadas
+(Sesion → Asunto, Noticia → Parrafo, Tarea → Nota...). Las fechas caen
+dentro de los últimos `num_days` días, para que `_since` las encuentre.
+"""
+
+from datetime import date as Date
+from datetime import datetime as DateTime
+from datetime import timedelta as TimeDelta
+import dataclasses
+import random
+
+import dba
+import models
+import scheduler
+
+SQL_TYPES = {
+    int: 'INTEGER',
+    float: 'REAL',
+    str: 'TEXT',
+    Date: 'DATE',
+    DateTime: 'TIMESTAMP',
+    }
+
+
+def all_models() -> list:
+    """Todos los modelos alcanzables desde el catálogo, ordenados de forma
+    que cada uno vaya después de sus dependencias y de su maestro.
+    """
+    graph = scheduler.build_graph([model for _name, model in models.catalog.items()])
+    return scheduler.topological_order(sorted(graph, key=lambda model: model.__name__))
+
+
+def masters(model, candidates) -> list:
+    return [master for master in candidates if model in master.Meta.master_of]
+
+
+def create_table(dbc, model):
+    columns = []
+    for field in dataclasses.fields(model):
+        sql_type = SQL_TYPES.get(field.type, 'TEXT')
+        if field.name == model.Meta.primary_key:
+            sql_type = f'{sql_type} PRIMARY KEY'
+        columns.append(f'{field.name} {sql_type}')
+    dba.execute(dbc, f'DROP TABLE IF EXISTS {model.Meta.table_name}')
+    dba.execute(dbc, f'CREATE TABLE {model.Meta.table_name} ({dba.as_list(columns)})')
+    if model.Meta.natural_keys:
+        # Como en destino, para que funcione `_upsert_many`
+        schema, _dot, table = model.Meta.table_name.rpartition('.')
+        prefix = f'{schema}.' if schema else ''
+        keys = dba.as_list(sorted(model.Meta.natural_keys))
+        dba.execute(dbc, f'CREATE UNIQUE INDEX {prefix}{table}_nk ON {table} ({keys})')
+
+
+def create_schema(dbc, all_models):
+    for model in all_models:
+        create_table(dbc, model)
+
+
+class Generator:
+
+    def __init__(self, num_rows=100, fanout=5, num_days=7, seed=0):
+        self.num_rows = num_rows
+        self.fanout = fanout
+        self.now = DateTime.now().replace(microsecond=0)
+        self.num_days = num_days
+        self.random = random.Random(seed)
+        self.keys = {}
+
+    def recent(self) -> DateTime:
+        minutes = self.random.randrange(1, max(self.num_days - 1, 1) * 24 * 60)
+        return self.now - TimeDelta(minutes=minutes)
+
+    def primary_key(self, model, index):
+        field_type = model.__dataclass_fields__[model.Meta.primary_key].type
+        if field_type is str:
+            return f'{model.__name__[:3].upper()}{index:07d}'
+        return index
+
+    def value(self, model, field, index):
+        """Valor inventado para un campo que no es clave.
+        """
+        if field.type is DateTime:
+            return self.recent()
+        if field.type is Date:
+            return self.recent().date()
+        if field.name == 'ts_mod':
+            return dba.as_ts_mod(self.recent())
+        if field.type is int:
+            return self.random.randrange(1, 100)
+        if field.type is float:
+            return self.random.random()
+        return f'{field.name} {index}'
+
+    def row(self, model, index, master=None, master_pk=None, position=0) -> dict:
+        row = {}
+        pk_name = model.Meta.primary_key
+        for field in dataclasses.fields(model):
+            if field.name in model.Meta.depends_on:
+                submodel = model.Meta.depends_on[field.name]
+                row[field.name] = self.random.choice(self.keys[submodel])
+            else:
+                row[field.name] = self.value(model, field, index)
+        if master is not None:
+            row[master.Meta.primary_key] = master_pk
+            # Las claves naturales de los subordinados tienen que ser únicas
+            for name in model.Meta.natural_keys:
+                if name == master.Meta.primary_key:
+                    continue
+                submodel = model.Meta.depends_on.get(name)
+                if submodel is not None:
+                    keys = self.keys[submodel]
+                    row[name] = keys[position % len(keys)]
+                else:
+                    row[name] = position + 1
+        if master is None or pk_name != master.Meta.primary_key:
+            row[pk_name] = self.primary_key(model, index)
+        return row
+
+    def rows(self, model, all_models) -> list[dict]:
+        """Filas de un modelo. Las de los subordinados se reparten entre
+        las filas de su maestro.
+        """
+        result = []
+        parents = masters(model, all_models)
+        if not parents:
+            for index in range(1, self.num_rows + 1):
+                result.append(self.row(model, index))
+        for master in parents:
+            # Si comparten clave primaria, la relación es uno a uno
+            same_key = master.Meta.primary_key == model.Meta.primary_key
+            fanout = 1 if same_key else self.fanout
+            for master_pk in self.keys[master]:
+                for position in range(fanout):
+                    index = len(result) + 1
+                    result.append(self.row(model, index, master, master_pk, position))
+        self.keys[model] = [row[model.Meta.primary_key] for row in result]
+        return result
+
+
+def populate(dbc, all_models, generator) -> dict:
+    """Crear y rellenar las tablas. Devuelve el número de filas por modelo.
+    """
+    counts = {}
+    dba.set_autocommit(dbc, False)
+    try:
+        for model in all_models:
+            create_table(dbc, model)
+            rows = generator.rows(model, all_models)
+            result = model._insert_many(dbc, rows)
+            if result.errors:
+                offset, message = result.errors[0]
+                raise ValueError(f'{model.__name__}: fila {offset}: {message}')
+            counts[model.__name__] = len(rows)
+        dbc.commit()
+    finally:
+        dba.set_autocommit(dbc, True)
+    return counts
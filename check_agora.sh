@@ -1,4 +1,3 @@
 #!/bin/bash
 
-./check_table.py agora.organo -n legislatura id_isla tipo tipo_comision codorg id_sala_habitual 
-./check_table.py agora.jornada -n id_sala canal estado 
+./madrox.py verify manifests/agora.toml
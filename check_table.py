@@ -3,11 +3,14 @@
 
 import sys
 import argparse
+import concurrent.futures
+import math
 from typing import Final
 
 from rich.console import Console
 import dml
 import dba
+import models
 
 OK: Final[str] = '[green]✓[/green]'
 ERROR: Final[str] = '[red]✖[/red]'
@@ -18,10 +21,39 @@ def red(msg):
     return f"[red]{msg}[/red]"
 
 
-def check_table_size(db_source, db_target, table_name):
-    sql = dml.Select('Count(*)').From(table_name)
-    rows_in_source = dba.get_scalar(db_source, sql)
-    rows_in_target = dba.get_scalar(db_target, sql)
+def aggregates_query(table_name, field_names):
+    """Una única consulta con el número de filas y la suma, media, máximo
+    y mínimo de cada uno de los campos indicados.
+
+    Los alias usan la posición del campo, para no superar el límite de
+    longitud de los identificadores de Oracle.
+    """
+    sql = dml.Select('Count(*) as num').From(table_name)
+    for index, field_name in enumerate(field_names):
+        sql = sql.add_field(
+            f'SUM({field_name}) as suma_{index},'
+            f' AVG({field_name}) as media_{index},'
+            f' MAX({field_name}) as maximo_{index},'
+            f' MIN({field_name}) as minimo_{index}'
+            )
+    return sql
+
+
+def get_row_on_both(db_source, db_target, sql):
+    """Ejecutar la misma consulta en origen y destino a la vez.
+
+    Cada consulta va en su propio hilo y con su propia conexión, así que
+    el tiempo total es el de la más lenta de las dos.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+        source = executor.submit(dba.get_row, db_source, sql)
+        target = executor.submit(dba.get_row, db_target, sql)
+        return source.result(), target.result()
+
+
+def check_table_size(source_row, target_row):
+    rows_in_source = source_row['num']
+    rows_in_target = target_row['num']
     if rows_in_source != rows_in_target:
         return (
             f'No son del mismo tamaño: En Origen {rows_in_source},'
@@ -29,26 +61,223 @@ def check_table_size(db_source, db_target, table_name):
             )
     return ''
 
-def check_table_number(db_source, db_target, table_name, field_name):
-    sql = dml.Select(
-        f'SUM({field_name}) as suma,'
-        f' AVG({field_name}) as media,'
-        f' MAX({field_name}) as maximo,'
-        f' MIN({field_name}) as minimo'
-        ).From(table_name)
-    source_row = dba.get_row(db_source, sql)
-    target_row = dba.get_row(db_target, sql)
-    if source_row['suma'] != target_row['suma']:
+
+def check_table_number(source_row, target_row, index, field_name):
+    if source_row[f'suma_{index}'] != target_row[f'suma_{index}']:
         return f'No coincide la suma del campo {field_name}'
-    if source_row['media'] != target_row['media']:
+    if source_row[f'media_{index}'] != target_row[f'media_{index}']:
         return f'No coincide la media del campo {field_name}'
-    if source_row['maximo'] != target_row['maximo']:
+    if source_row[f'maximo_{index}'] != target_row[f'maximo_{index}']:
         return f'No coincide el maximo del campo {field_name}'
-    if source_row['minimo'] != target_row['minimo']:
+    if source_row[f'minimo_{index}'] != target_row[f'minimo_{index}']:
         return f'No coincide el minimo del campo {field_name}'
     return ''
 
 
+def verify_table(db_source, db_target, table_name, field_names):
+    """Comprobar tamaño y campos numéricos de una tabla, sin imprimir nada.
+
+    Devuelve el primer error encontrado, o una cadena vacía.
+    """
+    sql = aggregates_query(table_name, field_names)
+    source_row, target_row = get_row_on_both(db_source, db_target, sql)
+    err = check_table_size(source_row, target_row)
+    if err:
+        return err
+    for index, field_name in enumerate(field_names):
+        err = check_table_number(source_row, target_row, index, field_name)
+        if err:
+            return err
+    return ''
+
+
+# --[ Comparación profunda (--deep) ]----------------------------------
+
+# Valor máximo de ORA_HASH; también se usa como módulo de las sumas
+MAX_HASH: Final[int] = 4294967295
+
+
+def get_columns(dbc, table_name):
+    """Lista de tuplas `(nombre, tipo)` de las columnas de una tabla.
+    """
+    sql = dml.Select('*').From(table_name).Where('1 = 0')
+    with dba.cursor(dbc) as cur:
+        cur.execute(str(sql))
+        return [(desc[0].lower(), str(desc[1]).upper()) for desc in cur.description]
+
+
+def get_key_name(table_name):
+    """Clave primaria de una tabla, buscándola en el catálogo de modelos.
+    """
+    for _name, model in models.catalog.items():
+        if model.Meta.table_name.lower() == table_name.lower():
+            return model.Meta.primary_key
+    return None
+
+
+def row_hash_expression(columns):
+    """Expresión SQL (Oracle) con un hash numérico de la fila.
+
+    Cada columna usa una semilla distinta en `ORA_HASH`, de forma que
+    intercambiar valores entre columnas cambia el resultado. De las
+    columnas LOB sólo se tiene en cuenta la longitud y el principio.
+    """
+    parts = []
+    for seed, (name, type_name) in enumerate(columns, start=1):
+        if 'LOB' in type_name:
+            name = f'DBMS_LOB.GETLENGTH({name}) || DBMS_LOB.SUBSTR({name}, 2000, 1)'
+        parts.append(f'NVL(ORA_HASH({name}, {MAX_HASH}, {seed}), 0)')
+    return ' + '.join(parts)
+
+
+class DeepCompare:
+    """Comparación jerárquica (tipo árbol de Merkle) de una tabla.
+
+    Se divide el espacio de claves primarias en rangos y se compara, para
+    cada rango, el número de filas y la suma de los hashes de fila en origen
+    y destino. Sólo se subdividen los rangos que no coinciden, hasta llegar
+    a rangos de `leaf_size` claves, donde se comparan las filas una a una.
+    El número de consultas depende del número de diferencias, no del tamaño
+    de la tabla.
+
+    Si la clave no es numérica se usa `ORA_HASH(clave)` como espacio de
+    claves, aunque entonces no se aprovechan los índices.
+    """
+
+    def __init__(self, db_source, db_target, table_name, key_name,
+                 leaf_size=1000, fanout=16):
+        self.db_source = db_source
+        self.db_target = db_target
+        self.table_name = table_name
+        self.key_name = key_name
+        self.leaf_size = leaf_size
+        self.fanout = fanout
+        self.num_queries = 0
+        columns = get_columns(db_source, table_name)
+        key_type = dict(columns)[key_name.lower()]
+        if 'NUMBER' in key_type:
+            self.key_expr = key_name
+        else:
+            self.key_expr = f'ORA_HASH({key_name})'
+        self.row_hash = row_hash_expression(columns)
+
+    def _on_both(self, sql, *args):
+        self.num_queries += 2
+        return (
+            dba.get_rows(self.db_source, sql, *args),
+            dba.get_rows(self.db_target, sql, *args),
+            )
+
+    def bounds(self):
+        """Rango de claves de la tabla, o `None` si no hay diferencias.
+        """
+        sql = dml.Select(
+            f'MIN({self.key_expr}) as minimo,'
+            f' MAX({self.key_expr}) as maximo,'
+            ' COUNT(*) as num,'
+            f' MOD(SUM({self.row_hash}), {MAX_HASH + 1}) as hash'
+            ).From(self.table_name)
+        [source], [target] = self._on_both(sql)
+        if source == target:
+            return None
+        values = [
+            row[name]
+            for row in (source, target)
+            for name in ('minimo', 'maximo')
+            if row[name] is not None
+            ]
+        return int(min(values)), int(max(values))
+
+    def buckets(self, lo, hi, width):
+        """Número de filas y suma de hashes por cada sub-rango de `[lo, hi]`.
+        """
+        bucket = f'FLOOR(({self.key_expr} - {lo}) / {width})'
+        sql = dml.Select(
+            f'{bucket} as bucket,'
+            ' COUNT(*) as num,'
+            f' MOD(SUM({self.row_hash}), {MAX_HASH + 1}) as hash'
+            ).From(self.table_name).Where(
+                f'{self.key_expr} BETWEEN :1 AND :2'
+            ).GroupBy(bucket)
+        source, target = self._on_both(sql, lo, hi)
+        source = {int(row['bucket']): (row['num'], row['hash']) for row in source}
+        target = {int(row['bucket']): (row['num'], row['hash']) for row in target}
+        return source, target
+
+    def leaf(self, lo, hi):
+        """Comparar fila a fila un rango pequeño de claves.
+        """
+        sql = dml.Select(
+            f'{self.key_name} as pk,'
+            f' {self.row_hash} as hash'
+            ).From(self.table_name).Where(
+                f'{self.key_expr} BETWEEN :1 AND :2'
+            )
+        source, target = self._on_both(sql, lo, hi)
+        source = {row['pk']: row['hash'] for row in source}
+        target = {row['pk']: row['hash'] for row in target}
+        for pk in source:
+            if pk not in target:
+                yield pk, 'falta en destino'
+            elif source[pk] != target[pk]:
+                yield pk, 'distinto'
+        for pk in target:
+            if pk not in source:
+                yield pk, 'sobra en destino'
+
+    def compare_range(self, lo, hi):
+        if hi - lo + 1 <= self.leaf_size:
+            yield from self.leaf(lo, hi)
+            return
+        width = math.ceil((hi - lo + 1) / self.fanout)
+        source, target = self.buckets(lo, hi, width)
+        for bucket in sorted(set(source) | set(target)):
+            if source.get(bucket) != target.get(bucket):
+                start = lo + bucket * width
+                end = min(hi, start + width - 1)
+                yield from self.compare_range(start, end)
+
+    def differences(self):
+        """Generador de tuplas `(clave, motivo)` con las filas que difieren.
+        """
+        limits = self.bounds()
+        if limits is None:
+            return
+        yield from self.compare_range(*limits)
+
+
+def check_deep(options, db_source, db_target, console):
+    key_name = options.key or get_key_name(options.table_name)
+    if not key_name:
+        console.print(red(
+            f'No sé cual es la clave primaria de {options.table_name};'
+            ' indíquela con --key'
+            ))
+        return -1
+    deep = DeepCompare(
+        db_source,
+        db_target,
+        options.table_name,
+        key_name,
+        leaf_size=options.leaf_size,
+        fanout=options.fanout,
+        )
+    num_differences = 0
+    for pk, reason in deep.differences():
+        if num_differences == 0:
+            console.print(ERROR)
+        num_differences += 1
+        console.print(f'  {key_name} = {pk!r}: {red(reason)}')
+    if num_differences:
+        console.print(
+            f'{num_differences} diferencias encontradas'
+            f' con {deep.num_queries} consultas'
+            )
+        return -1
+    console.print(f'deep {OK} ({deep.num_queries} consultas)')
+    return 0
+
+
 def get_options():
     parser = argparse.ArgumentParser(
         prog='check_table',
@@ -57,34 +286,53 @@ def get_options():
         )
     parser.add_argument('table_name')
     parser.add_argument('-n', '--number', nargs='*')
+    parser.add_argument(
+        '--deep',
+        action='store_true',
+        help='Comparar el contenido por rangos de claves, hasta encontrar'
+             ' las filas que difieren',
+        )
+    parser.add_argument('--key', help='Clave primaria (por defecto, la del catálogo)')
+    parser.add_argument('--leaf-size', type=int, default=1000)
+    parser.add_argument('--fanout', type=int, default=16)
     return parser.parse_args()
 
 
-def main():
-    options = get_options()
-    db_source = dba.get_database_connection('DB_SOURCE')
-    db_target = dba.get_database_connection('DB_TARGET')
+def check(options, db_source, db_target):
     console = Console()
     console.print(f'Comprobando [green]{options.table_name}[/green]', end=" : ")
-    err = check_table_size(db_source, db_target, options.table_name)
+    field_names = options.number or []
+    sql = aggregates_query(options.table_name, field_names)
+    source_row, target_row = get_row_on_both(db_source, db_target, sql)
+    err = check_table_size(source_row, target_row)
     if err:
         console.print(ERROR)
         console.print(red(err))
+        if options.deep:
+            return check_deep(options, db_source, db_target, console)
         return -1
     console.print(f'size {OK}', end=' ')
-    if options.number:
-        for field_name in options.number:
+    if field_names:
+        for index, field_name in enumerate(field_names):
             console.print(field_name, end=' ')
-            err = check_table_number(db_source, db_target, options.table_name, field_name)
+            err = check_table_number(source_row, target_row, index, field_name)
             if err:
                 console.print(ERROR)
                 console.print(red(err))
                 return -1
             console.print(OK, end=' ')
         console.print()
+    if options.deep:
+        return check_deep(options, db_source, db_target, console)
     return 0
 
 
+def main():
+    options = get_options()
+    with dba.connection('DB_SOURCE') as db_source, dba.connection('DB_TARGET') as db_target:
+        return check(options, db_source, db_target)
+
+
 if __name__ == "__main__":
     status = main()
     sys.exit(status)
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Marcas de agua (checkpoints) de cada modelo migrado.
+
+Se guardan en un fichero SQLite local, junto a `madrox.log`. Para cada
+modelo se guarda el valor máximo de sus campos `Meta.watermark` entre
+los registros migrados correctamente, de forma que la siguiente
+ejecución puede empezar desde ahí en vez de volver a revisar una
+ventana fija de días.
+"""
+
+from datetime import datetime as DateTime
+import sqlite3
+import threading
+
+from settings import STATE_DB
+
+
+class CheckpointStore:
+
+    def __init__(self, filename=STATE_DB):
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS checkpoint ('
+                '  model TEXT PRIMARY KEY,'
+                '  watermark TEXT NOT NULL,'
+                '  updated_at TEXT NOT NULL'
+                ')'
+                )
+
+    def get(self, model_name):
+        """Marca de agua de un modelo, o `None` si no hay ninguna.
+        """
+        with self.lock:
+            row = self.conn.execute(
+                'SELECT watermark FROM checkpoint WHERE model = ?',
+                (model_name,),
+                ).fetchone()
+        return DateTime.fromisoformat(row[0]) if row else None
+
+    def set(self, model_name, watermark):
+        """Guardar la marca de agua de un modelo, si es posterior a la actual.
+        """
+        with self.lock, self.conn:
+            self.conn.execute(
+                'INSERT INTO checkpoint (model, watermark, updated_at)'
+                ' VALUES (?, ?, ?)'
+                ' ON CONFLICT (model) DO UPDATE SET'
+                '   watermark = excluded.watermark,'
+                '   updated_at = excluded.updated_at'
+                ' WHERE excluded.watermark > checkpoint.watermark',
+                (model_name, watermark.isoformat(), DateTime.now().isoformat()),
+                )
+
+    def close(self):
+        self.conn.close()
@@ -2,19 +2,129 @@
 # -*- coding: utf-8 -*-
 
 
+import contextlib
+import dataclasses
+import datetime
 import functools
+import os
+import re
+import sqlite3
+import threading
+import time
 
 from prettyconf import config
 
+# Oracle no admite más de 1000 elementos en una lista IN (...)
+MAX_IN_LIST = 1000
+
+# Tamaño de los pools de conexiones (uno por DSN)
+POOL_MIN = config('MADROX_POOL_MIN', cast=int, default=1)
+POOL_MAX = config('MADROX_POOL_MAX', cast=int, default=8)
+POOL_INCREMENT = config('MADROX_POOL_INCREMENT', cast=int, default=1)
+
+# Segundos que se espera por una conexión libre de un pool de Oracle
+# antes de dar error, en vez de quedarse esperando para siempre
+POOL_WAIT_TIMEOUT = config('MADROX_POOL_WAIT_TIMEOUT', cast=int, default=60)
+
+# Segundos que espera SQLite a que otro escritor suelte la base de datos;
+# no debe ser menor que MADROX_COMMIT_SECONDS
+SQLITE_BUSY_TIMEOUT = config('MADROX_SQLITE_BUSY_TIMEOUT', cast=float, default=60)
+
+# Filas a traer en cada viaje a la base de datos con fetchmany
+DEFAULT_ARRAYSIZE = config('MADROX_ARRAYSIZE', cast=int, default=500)
+
+# Esquemas que se adjuntan (ATTACH) a las bases de datos SQLite, para que
+# funcionen nombres de tabla como `Agora.Sesion`
+SQLITE_SCHEMAS = config(
+    'MADROX_SQLITE_SCHEMAS',
+    cast=config.list,
+    default='Agora,Comun,Tareas,Noticias',
+    )
+
+
+class Counter:
+    """Contador que se puede incrementar desde varios hilos.
+
+    Además del total, lleva la cuenta de lo sumado en cada hilo
+    (`thread_value`), para poder atribuir el trabajo a cada trabajador.
+    """
+
+    def __init__(self):
+        self.value = 0
+        self.lock = threading.Lock()
+        self.local = threading.local()
+
+    def add(self, num=1):
+        with self.lock:
+            self.value += num
+        self.local.value = self.thread_value + num
+
+    @property
+    def thread_value(self):
+        return getattr(self.local, 'value', 0)
+
+
+# Viajes (aproximados) a la base de datos: cada `execute`, cada bloque
+# de `executemany` y cada `fetchmany`. Lo usan las mediciones de rendimiento.
+round_trips = Counter()
+
+# Filas leídas de la base de datos con `get_row` e `iter_rows`
+rows_fetched = Counter()
+
+# Trazador de sentencias SQL (ver `tracer.install`). Si es `None`, no
+# se apunta nada.
+tracer = None
+
 
 def as_ts_mod(dt):
-    return f'{dt.year:04d}{dt.month:04d}{dt.day:02d}000000'
+    hour = getattr(dt, 'hour', 0)
+    minute = getattr(dt, 'minute', 0)
+    second = getattr(dt, 'second', 0)
+    return (
+        f'{dt.year:04d}{dt.month:02d}{dt.day:02d}'
+        f'{hour:02d}{minute:02d}{second:02d}'
+        )
+
+
+def as_datetime(value):
+    """Convertir fechas, marcas de tiempo y valores `ts_mod` a `datetime`.
+
+    Devuelve `None` si el valor es nulo o no se puede interpretar.
+    """
+    if value is None:
+        return None
+    if isinstance(value, datetime.datetime):
+        return value
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day)
+    if isinstance(value, str):
+        value = value.strip()
+        try:
+            return datetime.datetime.strptime(value[:14].ljust(14, '0'), '%Y%m%d%H%M%S')
+        except ValueError:
+            return None
+    return None
 
 
 def as_list(values: list[str]) -> str:
     return ', '.join(values)
 
 
+def chunks(values, size):
+    """Dividir una secuencia en listas de, como máximo, `size` elementos.
+    """
+    values = list(values)
+    for start in range(0, len(values), size):
+        yield values[start:start+size]
+
+
+def in_clause(field_name, num_values, start=1) -> str:
+    """Condición `field_name IN (:1, :2, ...)` con `num_values` parámetros.
+    """
+    binds = ', '.join(f':{i}' for i in range(start, start + num_values))
+    return f'{field_name} IN ({binds})'
+
+
 def connection_params_from_db_url(conn_string):
     assert '://' in conn_string
     user = password = host = port = name = None
@@ -59,6 +169,89 @@ def get_oracle_connection(db_name, user, password):
     return db_connection
 
 
+# Equivalencias entre las máscaras de fecha de Oracle y las de strptime
+_ORACLE_DATE_FORMATS = [
+    ('YYYY', '%Y'),
+    ('HH24', '%H'),
+    ('MM', '%m'),
+    ('DD', '%d'),
+    ('MI', '%M'),
+    ('SS', '%S'),
+    ]
+
+
+def sqlite_to_date(value, mask):
+    """Implementación de `TO_DATE` para SQLite.
+
+    Devuelve la fecha en formato ISO, que es como se guardan las
+    fechas en SQLite, de forma que se pueda comparar con las columnas.
+    """
+    if value is None:
+        return None
+    fmt = mask.upper()
+    for oracle, python in _ORACLE_DATE_FORMATS:
+        fmt = fmt.replace(oracle, python)
+    result = datetime.datetime.strptime(value, fmt)
+    if '%H' in fmt:
+        return result.isoformat(' ')
+    return result.date().isoformat()
+
+
+def sqlite_convert_date(value: bytes):
+    value = value.decode()
+    result = datetime.datetime.fromisoformat(value)
+    return result.date() if len(value) == 10 else result
+
+
+sqlite3.register_adapter(datetime.date, lambda value: value.isoformat())
+sqlite3.register_adapter(datetime.datetime, lambda value: value.isoformat(' '))
+sqlite3.register_converter('DATE', sqlite_convert_date)
+sqlite3.register_converter('TIMESTAMP', sqlite_convert_date)
+
+
+def get_sqlite_connection(db_name):
+    """Conexión a una base de datos SQLite, para pruebas y mediciones locales.
+
+    Se adjuntan los esquemas de `SQLITE_SCHEMAS` como ficheros
+    hermanos (`origen.db` -> `origen.agora.db`, ...) y se definen
+    `TO_DATE` y `NVL`, que usan las sentencias generadas por `dml`.
+    """
+    db_connection = sqlite3.connect(
+        db_name,
+        detect_types=sqlite3.PARSE_DECLTYPES,
+        check_same_thread=False,
+        timeout=SQLITE_BUSY_TIMEOUT,
+        )
+    db_connection.create_function('TO_DATE', 2, sqlite_to_date, deterministic=True)
+    db_connection.create_function(
+        'NVL', 2,
+        lambda value, default: default if value is None else value,
+        deterministic=True,
+        )
+    root, ext = os.path.splitext(db_name)
+    for schema in SQLITE_SCHEMAS:
+        if db_name == ':memory:':
+            filename = ':memory:'
+        else:
+            filename = f'{root}.{schema.lower()}{ext}'
+        db_connection.execute(f'ATTACH DATABASE ? AS {schema}', (filename,))
+    set_autocommit(db_connection, True)
+    return db_connection
+
+
+def get_postgresql_connection(db_name, user, password, host=None, port=None):
+    import psycopg2
+    db_connection = psycopg2.connect(
+        dbname=db_name,
+        user=user,
+        password=password,
+        host=host,
+        port=port,
+        )
+    db_connection.autocommit = True
+    return db_connection
+
+
 def get_database_connection(dsn):
     db_connection_url = config(dsn)
     connection_parameters = connection_params_from_db_url(db_connection_url)
@@ -69,28 +262,462 @@ def get_database_connection(dsn):
             user = connection_parameters['user']
             password = connection_parameters['password']
             return get_oracle_connection(db_name, user, password)
+        case 'sqlite':
+            return get_sqlite_connection(connection_parameters['name'])
+        case 'postgresql' | 'postgres':
+            return get_postgresql_connection(
+                connection_parameters['name'],
+                connection_parameters['user'],
+                connection_parameters['password'],
+                host=connection_parameters['host'],
+                port=connection_parameters['port'],
+                )
         case _:
-            raise ValueError("Imposible conectarme a bases de datos de tipo {_}")
+            raise ValueError(f"Imposible conectarme a bases de datos de tipo {schema}")
+
+
+def set_autocommit(conn, value):
+    """Activar o desactivar el autocommit de una conexión.
+
+    Las conexiones de `sqlite3` anteriores a Python 3.12 no tienen el
+    atributo `autocommit`; en ellas se usa `isolation_level`.
+    """
+    if isinstance(conn, sqlite3.Connection) and not hasattr(conn, 'autocommit'):
+        conn.isolation_level = None if value else 'DEFERRED'
+    else:
+        conn.autocommit = value
+
+
+class ConnectionPool:
+    """Pool sencillo para los drivers que no tienen uno propio.
+
+    Reutiliza las conexiones liberadas, hasta un máximo de `max`
+    conexiones ociosas.
+    """
+
+    def __init__(self, connect, max=POOL_MAX):
+        self.connect = connect
+        self.max = max
+        self.idle = []
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            if self.idle:
+                return self.idle.pop()
+        return self.connect()
+
+    def release(self, conn):
+        with self.lock:
+            if len(self.idle) < self.max:
+                self.idle.append(conn)
+                return
+        conn.close()
+
+
+def get_oracle_pool(db_name, user, password, max=POOL_MAX):
+    import cx_Oracle
+    return cx_Oracle.SessionPool(
+        user=user,
+        password=password,
+        dsn=db_name,
+        min=POOL_MIN,
+        max=max,
+        increment=POOL_INCREMENT,
+        encoding="UTF-8",
+        nencoding="UTF-8",
+        threaded=True,
+        getmode=cx_Oracle.SPOOL_ATTRVAL_TIMEDWAIT,
+        waitTimeout=POOL_WAIT_TIMEOUT * 1000,
+        )
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+_pool_max = POOL_MAX
+
+
+def configure_pools(num_connections):
+    """Hacer que los pools admitan al menos `num_connections` conexiones
+    por DSN (por ejemplo, una por trabajador más la del proceso principal).
+
+    Sólo afecta a los pools que aún no se han creado.
+    """
+    global _pool_max
+    with _pools_lock:
+        _pool_max = max(POOL_MAX, num_connections)
+
+
+def get_pool(dsn):
+    """Pool de conexiones para un DSN. Se crea la primera vez que se pide.
+    """
+    with _pools_lock:
+        if dsn not in _pools:
+            db_connection_url = config(dsn)
+            connection_parameters = connection_params_from_db_url(db_connection_url)
+            match connection_parameters['schema']:
+                case 'oracle':
+                    _pools[dsn] = get_oracle_pool(
+                        connection_parameters['name'],
+                        connection_parameters['user'],
+                        connection_parameters['password'],
+                        max=_pool_max,
+                        )
+                case _:
+                    _pools[dsn] = ConnectionPool(
+                        functools.partial(get_database_connection, dsn),
+                        max=_pool_max,
+                        )
+        return _pools[dsn]
+
+
+def acquire(dsn):
+    """Obtener una conexión del pool del DSN indicado.
+
+    Hay que devolverla con `release` cuando no se necesite más.
+    """
+    conn = get_pool(dsn).acquire()
+    set_autocommit(conn, True)
+    return conn
+
+
+def release(dsn, conn):
+    get_pool(dsn).release(conn)
+
+
+@contextlib.contextmanager
+def connection(dsn):
+    """Gestor de contexto que toma una conexión del pool y la devuelve al salir.
+    """
+    conn = acquire(dsn)
+    try:
+        yield conn
+    finally:
+        release(dsn, conn)
+
+
+class Transaction:
+    """Transacción explícita que se confirma cada `max_rows` filas o cada
+    `max_seconds` segundos, lo que ocurra antes.
+
+    Mientras exista, la conexión trabaja sin autocommit. `on_commit` y
+    `on_rollback` se llaman después de confirmar o deshacer; además, a
+    `add` se le puede pasar una función que sólo se llamará si la
+    transacción en curso se confirma.
+    """
+
+    def __init__(self, dbc, max_rows, max_seconds, on_commit=None, on_rollback=None):
+        self.dbc = dbc
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.on_commit = on_commit
+        self.on_rollback = on_rollback
+        self.pending = []
+        self.num_rows = 0
+        self.started = time.monotonic()
+        set_autocommit(dbc, False)
+
+    def add(self, num_rows, on_commit=None):
+        """Apuntar filas escritas; confirma si se llega a algún límite.
+        """
+        self.num_rows += num_rows
+        if on_commit is not None:
+            self.pending.append(on_commit)
+        elapsed = time.monotonic() - self.started
+        if self.num_rows >= self.max_rows or elapsed >= self.max_seconds:
+            self.commit()
+
+    def _reset(self):
+        num_rows, self.num_rows = self.num_rows, 0
+        self.pending = []
+        self.started = time.monotonic()
+        return num_rows
+
+    def commit(self):
+        round_trips.add()
+        self.dbc.commit()
+        for func in self.pending:
+            func()
+        self._reset()
+        if self.on_commit is not None:
+            self.on_commit()
+
+    def rollback(self) -> int:
+        """Deshacer la transacción en curso. Devuelve las filas deshechas.
+        """
+        round_trips.add()
+        self.dbc.rollback()
+        num_rows = self._reset()
+        if self.on_rollback is not None:
+            self.on_rollback()
+        return num_rows
+
+    def savepoint(self):
+        """Marcar el punto al que vuelve `rollback_to_savepoint`.
+        """
+        if isinstance(self.dbc, sqlite3.Connection) and not self.dbc.in_transaction:
+            # SQLite no espera a otro escritor si la transacción ya ha leído
+            # (devuelve "database is locked"): se reserva la escritura al empezar
+            execute(self.dbc, 'BEGIN IMMEDIATE')
+        execute(self.dbc, 'SAVEPOINT madrox_group')
+
+    def rollback_to_savepoint(self):
+        """Deshacer lo escrito desde el último `savepoint`, conservando
+        el resto de la transacción.
+        """
+        execute(self.dbc, 'ROLLBACK TO SAVEPOINT madrox_group')
+
+    def close(self, commit=True):
+        """Terminar (confirmando o deshaciendo) y volver al autocommit.
+        """
+        if commit:
+            self.commit()
+        else:
+            self.rollback()
+        set_autocommit(self.dbc, True)
+
+
+def get_parameters(sql, args):
+    """Parámetros con los que ejecutar una sentencia.
+
+    Si la sentencia es de `dml` y usa variables de enlace (atributo
+    `binds`), se usan esas. En otro caso, los argumentos posicionales.
+    """
+    binds = getattr(sql, 'binds', None)
+    if binds:
+        if args:
+            raise ValueError(
+                'No se pueden mezclar variables de enlace con nombre'
+                ' y parámetros posicionales'
+                )
+        return dict(binds)
+    return list(args)
+
+
+def dialect(dbc) -> str:
+    """Tipo de base de datos de una conexión: `oracle`, `sqlite` o `postgresql`.
+    """
+    module = type(dbc).__module__.lower()
+    if 'sqlite' in module:
+        return 'sqlite'
+    if 'psycopg' in module:
+        return 'postgresql'
+    return 'oracle'
+
+
+# Literales entre comillas (que no se tocan), `::` (conversiones de
+# PostgreSQL), variables de enlace, funciones de Oracle y el signo `%`
+_SQL_TOKENS = re.compile(
+    r"""('(?:[^']|'')*'|"[^"]*")|::|:(\w+)|\b(TO_DATE|NVL)\s*\(|%""",
+    re.IGNORECASE,
+    )
+
+_POSTGRESQL_FUNCTIONS = {
+    'TO_DATE': 'TO_TIMESTAMP(',
+    'NVL': 'COALESCE(',
+    }
+
+
+@functools.lru_cache(maxsize=1024)
+def translate(sql, dialect) -> tuple[str, bool]:
+    """Adaptar una sentencia escrita para Oracle a otra base de datos.
+
+    Las variables de enlace `:1` pasan a ser `?1` en SQLite y `%(p1)s`
+    en PostgreSQL, y las variables `:nombre` pasan a `%(nombre)s` en
+    PostgreSQL. En PostgreSQL, además, `TO_DATE` se cambia por
+    `TO_TIMESTAMP` (para no perder la hora) y `NVL` por `COALESCE`. No
+    se toca nada dentro de los literales entre comillas.
+
+    Devuelve la sentencia traducida y si usa variables de enlace.
+    """
+    if dialect == 'oracle':
+        return sql, True
+    matches = list(_SQL_TOKENS.finditer(sql))
+    has_binds = any(match.group(2) is not None for match in matches)
+    parts = []
+    position = 0
+    for match in matches:
+        literal, name, function = match.groups()
+        token = match.group(0)
+        if name is not None:
+            if dialect == 'sqlite':
+                token = f'?{name}' if name.isdigit() else token
+            else:
+                token = f'%(p{name})s' if name.isdigit() else f'%({name.lower()})s'
+        elif dialect == 'postgresql':
+            if function is not None:
+                token = _POSTGRESQL_FUNCTIONS[function.upper()]
+            elif has_binds:  # psycopg2 sólo interpreta `%` si hay parámetros
+                token = token.replace('%', '%%')
+        parts.append(sql[position:match.start()])
+        parts.append(token)
+        position = match.end()
+    parts.append(sql[position:])
+    return ''.join(parts), has_binds
+
+
+def adapt_parameters(parameters, dialect):
+    """Adaptar los parámetros a la sintaxis de `translate`.
+    """
+    if dialect != 'postgresql':
+        return parameters
+    if isinstance(parameters, dict):
+        return {name.lower(): value for name, value in parameters.items()}
+    return {f'p{i}': value for i, value in enumerate(parameters, start=1)}
+
+
+def prepare(dbc, sql, args):
+    """Sentencia y parámetros, ya adaptados a la base de datos de `dbc`.
+    """
+    parameters = get_parameters(sql, args)
+    kind = dialect(dbc)
+    sql, has_binds = translate(str(sql), kind)
+    if not has_binds and kind == 'postgresql':
+        return sql, None
+    return sql, adapt_parameters(parameters, kind)
+
+
+@contextlib.contextmanager
+def cursor(dbc):
+    """Cursor que se cierra al salir.
+
+    Los cursores de `sqlite3` no son gestores de contexto, así que no
+    se puede usar directamente `with dbc.cursor() as cur`.
+    """
+    cur = dbc.cursor()
+    try:
+        yield cur
+    finally:
+        cur.close()
 
 
 def execute(dbc, sql, *args):
-    sql = str(sql)
-    parameters = list(args)
+    sql, parameters = prepare(dbc, sql, args)
     result = None
-    with dbc.cursor() as cur:
+    round_trips.add()
+    start = time.perf_counter()
+    with cursor(dbc) as cur:
         result = cur.execute(sql, parameters)
+    if tracer is not None:
+        tracer.record(sql, time.perf_counter() - start, 0)
     return result
 
 
-def get_row(dbc, sql, *args, cast=None):
-    sql = str(sql)
+@dataclasses.dataclass
+class BulkResult:
+    """Resultado de una ejecución en bloque con `execute_many`.
+
+    `errors` es una lista de tuplas `(offset, mensaje)`, donde `offset`
+    es la posición de la fila que falló dentro de la lista original.
+    """
+    num_rows: int = 0
+    errors: list = dataclasses.field(default_factory=list)
+
+
+def is_autocommit(conn) -> bool:
+    """Si la conexión confirma cada sentencia por su cuenta.
+    """
+    if isinstance(conn, sqlite3.Connection) and not hasattr(conn, 'autocommit'):
+        return conn.isolation_level is None
+    return bool(conn.autocommit)
+
+
+@contextlib.contextmanager
+def atomic(dbc, cur):
+    """Bloque de sentencias que se confirma o se deshace entero, sin
+    tocar el resto de la transacción en curso.
+
+    Con autocommit, el bloque es una transacción propia; si hay una
+    transacción abierta, es un `SAVEPOINT`. No se usa con Oracle, que
+    tiene `batcherrors`.
+    """
+    if is_autocommit(dbc):
+        cur.execute('BEGIN')
+        finish, undo = 'COMMIT', 'ROLLBACK'
+    else:
+        if isinstance(dbc, sqlite3.Connection) and not dbc.in_transaction:
+            # Si no, el SAVEPOINT abriría la transacción y RELEASE la confirmaría
+            cur.execute('BEGIN')
+        cur.execute('SAVEPOINT madrox_bulk')
+        finish = 'RELEASE SAVEPOINT madrox_bulk'
+        undo = 'ROLLBACK TO SAVEPOINT madrox_bulk'
+    try:
+        yield
+    except BaseException:
+        cur.execute(undo)
+        raise
+    cur.execute(finish)
+
+
+def execute_many(dbc, sql, rows, batch_size=1000, lobs=()):
+    """Ejecutar una sentencia parametrizada para una lista de filas.
+
+    Las filas se envían en bloques de `batch_size` usando
+    `cursor.executemany`. En Oracle se activa `batcherrors`, de forma
+    que un error en una fila no aborta el resto del bloque, y las
+    variables de enlace de `lobs` se declaran como CLOB (un texto de
+    más de 4000 bytes se enviaría como LONG, que sólo se admite al
+    insertar en una columna LONG: ORA-01461). En las
+    demás bases de datos cada bloque es atómico (ver `atomic`); si
+    falla, se deshace y se repite fila a fila, para escribir las filas
+    buenas y saber la posición de cada error.
+    """
+    kind = dialect(dbc)
+    sql, _has_binds = translate(str(sql), kind)
+    rows = [adapt_parameters(row, kind) for row in rows]
+    result = BulkResult()
+    is_oracle = kind == 'oracle'
+    start = time.perf_counter()
+    with cursor(dbc) as cur:
+        offset = 0
+        for batch in chunks(rows, batch_size):
+            round_trips.add()
+            if is_oracle:
+                if lobs:
+                    import cx_Oracle
+                    cur.setinputsizes(**{name: cx_Oracle.DB_TYPE_CLOB for name in lobs})
+                cur.executemany(sql, batch, batcherrors=True)
+                errors = cur.getbatcherrors()
+                for error in errors:
+                    result.errors.append((offset + error.offset, error.message))
+                if errors and dbc.autocommit:
+                    dbc.commit()
+                result.num_rows += len(batch) - len(errors)
+            else:
+                try:
+                    with atomic(dbc, cur):
+                        cur.executemany(sql, batch)
+                    result.num_rows += len(batch)
+                except Exception:
+                    for index, row in enumerate(batch):
+                        round_trips.add()
+                        try:
+                            with atomic(dbc, cur):
+                                cur.execute(sql, row)
+                            result.num_rows += 1
+                        except Exception as err:
+                            result.errors.append((offset + index, str(err)))
+            offset += len(batch)
+    if tracer is not None:
+        tracer.record(sql, time.perf_counter() - start, 0)
+    return result
+
+
+def get_row(dbc, sql, *args, cast=None, rowfactory=None):
+    sql, parameters = prepare(dbc, sql, args)
     field_names = []
-    parameters = list(args)
-    with dbc.cursor() as cur:
+    round_trips.add()
+    start = time.perf_counter()
+    with cursor(dbc) as cur:
         cur.execute(sql, parameters)
         field_names = [desc[0].lower() for desc in cur.description]
         row = cur.fetchone()
+        if tracer is not None:
+            tracer.record(sql, time.perf_counter() - start, 1 if row else 0)
         if row:
+            rows_fetched.add()
+            if rowfactory is not None:
+                return rowfactory(tuple(field_names))(row)
             row = dict(zip(field_names, row))
             if cast:
                 row = cast(row)
@@ -98,20 +725,64 @@ def get_row(dbc, sql, *args, cast=None):
     return {}
 
 
-def get_rows(dbc, sql, *args, cast=None):
-    sql = str(sql)
-    field_names = []
-    parameters = list(args)
-    with dbc.cursor() as cur:
+def iter_rows(
+        dbc, sql, *args, cast=None, rowfactory=None, arraysize=None, prefetchrows=None,
+        ):
+    """Generador que devuelve las filas de una consulta de una en una.
+
+    Las filas se traen en bloques de `arraysize` con `fetchmany`, así que
+    nunca se tiene en memoria más de un bloque. `prefetchrows` sólo se
+    aplica si el driver lo soporta (cx_Oracle 8 o posterior).
+
+    Si se indica `rowfactory`, se llama una vez con la tupla de nombres
+    de columna y la función que devuelve se aplica a cada fila tal como
+    viene del cursor, sin pasar por un diccionario; `cast` no se usa.
+    """
+    sql, parameters = prepare(dbc, sql, args)
+    with cursor(dbc) as cur:
+        cur.arraysize = arraysize or DEFAULT_ARRAYSIZE
+        if prefetchrows is not None and hasattr(cur, 'prefetchrows'):
+            cur.prefetchrows = prefetchrows
+        round_trips.add()
+        # Sólo cuenta el tiempo de la base de datos, no el de quien
+        # consume las filas
+        start = time.perf_counter()
         cur.execute(sql, parameters)
         field_names = [desc[0].lower() for desc in cur.description]
-        rows = cur.fetchall()
-        if rows:
-            rows = [dict(zip(field_names, row)) for row in rows]
-            if cast:
-                rows = [cast(row) for row in rows]
-            return rows
-    return []
+        seconds = time.perf_counter() - start
+        convert = rowfactory(tuple(field_names)) if rowfactory is not None else None
+        num_rows = 0
+        try:
+            while True:
+                start = time.perf_counter()
+                rows = cur.fetchmany()
+                seconds += time.perf_counter() - start
+                if not rows:
+                    break
+                round_trips.add()
+                rows_fetched.add(len(rows))
+                num_rows += len(rows)
+                if convert is not None:
+                    yield from map(convert, rows)
+                    continue
+                for row in rows:
+                    row = dict(zip(field_names, row))
+                    yield cast(row) if cast else row
+        finally:
+            if tracer is not None:
+                tracer.record(sql, seconds, num_rows)
+
+
+def get_rows(
+        dbc, sql, *args, cast=None, rowfactory=None, arraysize=None, prefetchrows=None,
+        ):
+    return list(iter_rows(
+        dbc, sql, *args,
+        cast=cast,
+        rowfactory=rowfactory,
+        arraysize=arraysize,
+        prefetchrows=prefetchrows,
+        ))
 
 
 def get_scalar(dbc, sql, *args, cast=None, default=None):
@@ -123,13 +794,7 @@ def get_scalar(dbc, sql, *args, cast=None, default=None):
 
 
 def es_oracle(conn):
-    cursor = None
-    try:
-        cursor = conn.cursor()
-        return 'oracle' in cursor.db.__module__
-    finally:
-        if cursor:
-            cursor.close()
+    return 'oracle' in type(conn).__module__.lower()
 
 
 def next_val(sequence_name, conn="default"):
@@ -144,18 +809,18 @@ def next_val(sequence_name, conn="default"):
     el contador de forma atómica.
     '''
 
-    db_conn = get_database_connection(conn)
-    if es_oracle(db_conn):
-        sql = "SELECT {}.NextVal FROM Dual".format(sequence_name)
-    else:  # Será postgres
-        sql = "SELECT nextval('{}')".format(sequence_name)
-    cur = db_conn.cursor()
-    try:
-        cur.execute(sql)
-        row = cur.fetchone()
-        return row[0]
-    finally:
-        cur.close()
+    with connection(conn) as db_conn:
+        if es_oracle(db_conn):
+            sql = "SELECT {}.NextVal FROM Dual".format(sequence_name)
+        else:  # Será postgres
+            sql = "SELECT nextval('{}')".format(sequence_name)
+        cur = db_conn.cursor()
+        try:
+            cur.execute(sql)
+            row = cur.fetchone()
+            return row[0]
+        finally:
+            cur.close()
 
 
 def listify(value) -> list:
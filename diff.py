@@ -0,0 +1,89 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import dataclasses
+
+
+@dataclasses.dataclass
+class Diff:
+    """Resultado de comparar un lote de instancias de origen con destino.
+
+    - `to_insert`: instancias que no existen en destino.
+    - `to_update`: tuplas `(instancia, destino, cambios)`, donde
+      `cambios` es un diccionario con los nuevos valores.
+    - `unchanged`: instancias que ya están en destino sin cambios.
+    """
+    to_insert: list = dataclasses.field(default_factory=list)
+    to_update: list = dataclasses.field(default_factory=list)
+    unchanged: list = dataclasses.field(default_factory=list)
+
+    def __len__(self):
+        return len(self.to_insert) + len(self.to_update) + len(self.unchanged)
+
+
+def skip_unchanged(model, db_source, dbc, instances, result: Diff) -> list:
+    """Descartar las instancias cuyo hash de fila coincide en origen y destino.
+
+    Los hashes se calculan en el servidor (`Model._load_hashes`), así que
+    sólo viajan las claves y los hashes. Las instancias descartadas se
+    añaden a `result.unchanged`; se devuelven las demás.
+    """
+    pk_name = model.Meta.primary_key
+    primary_keys = [getattr(instance, pk_name) for instance in instances]
+    source_hashes = model._load_hashes(db_source, primary_keys)
+    target_hashes = model._load_hashes(dbc, primary_keys)
+    remaining = []
+    for instance, primary_key in zip(instances, primary_keys):
+        target_hash = target_hashes.get(primary_key)
+        if target_hash is not None and target_hash == source_hashes.get(primary_key):
+            result.unchanged.append(instance)
+        else:
+            remaining.append(instance)
+    return remaining
+
+
+def diff_batch(model, dbc, instances, db_source=None) -> Diff:
+    """Comparar un lote de instancias con las filas de destino.
+
+    Se cargan todas las filas de destino del lote a la vez (por clave
+    primaria y, si el modelo las tiene, por claves naturales) y se
+    clasifican las instancias en memoria. Sigue el mismo criterio que
+    `Model.not_exists`: si el modelo tiene claves naturales, la
+    existencia se determina por ellas.
+
+    Si se indica la conexión de origen, `db_source`, antes se comparan
+    los hashes de las filas en ambos lados, y sólo se cargan de destino
+    las filas cuyo hash no coincide.
+    """
+    result = Diff()
+    if db_source is not None:
+        instances = skip_unchanged(model, db_source, dbc, instances, result)
+    pk_name = model.Meta.primary_key
+    primary_keys = [getattr(instance, pk_name) for instance in instances]
+    by_pk = {
+        getattr(target, pk_name): target
+        for target in model._load_many(dbc, primary_keys)
+        }
+    by_natural_key = {}
+    if model.Meta.natural_keys:
+        by_natural_key = {
+            model._natural_key(target): target
+            for target in model._load_from_natural_keys_in(dbc, instances)
+            }
+    for instance, primary_key in zip(instances, primary_keys):
+        if model.Meta.natural_keys:
+            natural_key = model._natural_key(instance)
+            exists = natural_key in by_natural_key
+            target = by_pk.get(primary_key) or by_natural_key.get(natural_key)
+        else:
+            target = by_pk.get(primary_key)
+            exists = target is not None
+        if not exists or target is None:
+            result.to_insert.append(instance)
+            continue
+        changes = model._changes(instance, target)
+        if changes:
+            result.to_update.append((instance, target, changes))
+        else:
+            result.unchanged.append(instance)
+    return result
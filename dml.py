@@ -341,6 +341,83 @@ def get_predicate(field__op, value):
     return functor(field_name, value)
 
 
+# Predicados con variables de enlace. El texto de la sentencia no depende
+# de los valores, así que Oracle puede reutilizar el cursor ya analizado.
+
+_Mapa_Operadores_Bind = {
+    "gt": "{fn} > {b}",
+    "gte": "{fn} >= {b}",
+    "lt": "{fn} < {b}",
+    "lte": "{fn} <= {b}",
+    "eq": "{fn} = {b}",
+    "noteq": "{fn} <> {b}",
+    "contains": "{fn} LIKE '%' || {b} || '%'",
+    "icontains": "UPPER({fn}) LIKE '%' || UPPER({b}) || '%'",
+    "startswith": "{fn} LIKE {b} || '%'",
+    "istartswith": "UPPER({fn}) LIKE UPPER({b}) || '%'",
+    "endswith": "{fn} LIKE '%' || {b}",
+    "notendswith": "{fn} NOT LIKE '%' || {b}",
+    "iendsswith": "UPPER({fn}) LIKE '%' || UPPER({b})",
+    "year": "extract(year from {fn}) = {b}",
+    "month": "extract(month from {fn}) = {b}",
+}
+
+
+def new_bind(binds, nombre, valor):
+    """Registrar un valor en el diccionario de variables de enlace.
+
+    Devuelve el marcador (`:nombre`) que hay que usar en la sentencia.
+    Si el nombre ya está en uso, se le añade un sufijo numérico.
+
+    Ejemplo de uso:
+
+        >>> binds = {}
+        >>> new_bind(binds, 'Id_Isla', 7)
+        ':id_isla'
+        >>> new_bind(binds, 'id_isla', 8)
+        ':id_isla_2'
+        >>> binds
+        {'id_isla': 7, 'id_isla_2': 8}
+    """
+    base = nombre.lower().replace(".", "_")
+    name = base
+    counter = 1
+    while name in binds:
+        counter += 1
+        name = f"{base}_{counter}"
+    binds[name] = valor
+    return f":{name}"
+
+
+def get_bind_predicate(field__op, value, binds):
+    """Como L{get_predicate}, pero usando variables de enlace.
+
+    Los valores se añaden al diccionario `binds`.
+
+    Ejemplo de uso:
+
+        >>> binds = {}
+        >>> get_bind_predicate('id_isla__gte', 3, binds)
+        'id_isla >= :id_isla'
+        >>> binds
+        {'id_isla': 3}
+    """
+    if "__" in field__op:
+        (field_name, op_name) = field__op.split("__", 1)
+    else:
+        field_name = field__op
+        op_name = "eq"
+    if op_name in ("isnull", "isnotnull"):
+        return get_predicate(field__op, value)
+    if op_name == "between":
+        (minimo, maximo) = value
+        b_min = new_bind(binds, field_name, minimo)
+        b_max = new_bind(binds, field_name, maximo)
+        return f"{field_name} BETWEEN {b_min} AND {b_max}"
+    template = _Mapa_Operadores_Bind[op_name]
+    return template.format(fn=field_name, b=new_bind(binds, field_name, value))
+
+
 class Select:
     """
     DESCRIPCIÓN
@@ -367,16 +444,26 @@ class Select:
          WHERE Codigo Between 2 and 5
     """
 
-    def __init__(self, fields=""):
+    def __init__(self, fields="", binds=False):
         """Constructor
 
         Constructor de la clase Select.
 
-        @param fields: Los nombres de los campos que se quieren obtener
-        @type fields: string
+        @param fields: Los nombres de los campos que se quieren obtener,
+                       separados por comas o como lista (para
+                       expresiones que llevan comas)
+        @type fields: string or list
+        @param binds: Si es C{True}, L{Filter} usa variables de enlace
+                      en vez de literales. Los valores quedan en el
+                      atributo C{binds}.
+        @type binds: bool
         """
+        self.use_binds = binds
+        self.binds = {}
         if not fields:
             self._fields = []
+        elif isinstance(fields, (list, tuple)):
+            self._fields = list(fields)
         elif "," in fields:
             self._fields = [s.strip() for s in fields.split(",")]
         else:
@@ -389,7 +476,9 @@ class Select:
         self._limit = None
 
     def add_field(self, field):
-        if "," in field:
+        if isinstance(field, (list, tuple)):
+            self._fields.extend(field)
+        elif "," in field:
             self._fields.extend([s.strip() for s in field.split(",")])
         else:
             self._fields.append(field)
@@ -457,9 +546,24 @@ class Select:
         return self
 
     def Filter(self, **kwargs):
+        """Añadir condiciones a partir de argumentos con nombre.
+
+        Ejemplo de Uso:
+
+            >>> sql = Select('Nombre', binds=True).From('Comun.Usuario')
+            >>> print(sql.Filter(id_usuario=23))
+            SELECT Nombre
+              FROM Comun.Usuario
+             WHERE id_usuario = :id_usuario
+            >>> sql.binds
+            {'id_usuario': 23}
+        """
         kwargs.pop("tron", False)
         for k in kwargs:
-            self.And(get_predicate(k, kwargs[k]))
+            if self.use_binds:
+                self.And(get_bind_predicate(k, kwargs[k], self.binds))
+            else:
+                self.And(get_predicate(k, kwargs[k]))
         return self
 
     def Where(self, condicion):
@@ -550,11 +654,9 @@ class Select:
                 )
             )
         if self._where:
-            first_cond = self._where.pop(0)
+            first_cond, *rest = self._where
             buff.append(" WHERE {}".format(first_cond))
-            while self._where:
-                op_ = self._where.pop(0)
-                cond = self._where.pop(0)
+            for op_, cond in zip(rest[0::2], rest[1::2]):
                 buff.append("   {} {}".format(op_, cond))
         if self._group_by:
             buff.append(" GROUP BY %s" % self._group_by)
@@ -573,11 +675,24 @@ class Insert:
     El objetivo de esta clase es poder escribir
     sentencias Insert SQL, de forma sencilla. Permite ir componiendo la
     sentencia mediante distintas llamadas.
+
+    Con C{binds=True} los valores no se escriben en la sentencia, sino
+    que se usan variables de enlace y se guardan en el atributo C{binds}:
+
+        >>> sql = Insert('Agora.Isla', binds=True)
+        >>> sql = sql.Set('id_isla', 9).Set('descripcion', 'San Borondon')
+        >>> print(sql)
+        INSERT INTO Agora.Isla (ID_ISLA, DESCRIPCION)
+         VALUES (:id_isla, :descripcion)
+        >>> sql.binds
+        {'id_isla': 9, 'descripcion': 'San Borondon'}
     """
 
-    def __init__(self, tabla):
+    def __init__(self, tabla, binds=False):
         """Constructor"""
         self.tabla = tabla
+        self.use_binds = binds
+        self.binds = {}
         self._fields = []
         self._values = {}
 
@@ -586,7 +701,10 @@ class Insert:
         nombre = nombre.upper()
         if nombre not in self._fields:
             self._fields.append(nombre)
-        if str(valor) == '%s':
+        if self.use_binds:
+            self.binds.pop(nombre.lower(), None)
+            self._values[nombre] = new_bind(self.binds, nombre, valor)
+        elif str(valor) == '%s':
             self._values[nombre] = '%s'
         else:
             self._values[nombre] = new_field(valor)
@@ -595,6 +713,8 @@ class Insert:
     def get(self, nombre):
         nombre = nombre.upper()
         if nombre in self._fields:
+            if self.use_binds:
+                return self.binds[nombre.lower()]
             return self._values[nombre].value
         else:
             raise KeyError('Field not found')
@@ -650,9 +770,11 @@ class Update:
 
     """
 
-    def __init__(self, tabla):
+    def __init__(self, tabla, binds=False):
         """Constructor"""
         self.tabla = tabla
+        self.use_binds = binds
+        self.binds = {}
         self._fields = []
         self._values = {}
         self._where = []
@@ -662,7 +784,11 @@ class Update:
         nombre = nombre.upper()
         if nombre not in self._fields:
             self._fields.append(nombre)
-        self._values[nombre] = new_field(valor)
+        if self.use_binds:
+            self.binds.pop(nombre.lower(), None)
+            self._values[nombre] = new_bind(self.binds, nombre, valor)
+        else:
+            self._values[nombre] = new_field(valor)
         return self
 
     def SetLiteral(self, nombre, valor):
@@ -699,6 +825,27 @@ class Update:
         self._where.append(condicion)
         return self
 
+    def Filter(self, **kwargs):
+        """Añadir condiciones a partir de argumentos con nombre.
+
+        Ejemplo de Uso:
+
+            >>> sql = Update('Agora.Isla', binds=True)
+            >>> sql = sql.Set('Descripcion', 'San Borondon')
+            >>> print(sql.Filter(id_isla=9))
+            UPDATE Agora.Isla
+               SET DESCRIPCION = :descripcion
+             WHERE id_isla = :id_isla
+            >>> sql.binds
+            {'descripcion': 'San Borondon', 'id_isla': 9}
+        """
+        for k in kwargs:
+            if self.use_binds:
+                self.And(get_bind_predicate(k, kwargs[k], self.binds))
+            else:
+                self.And(get_predicate(k, kwargs[k]))
+        return self
+
     def __str__(self):
         """Retorna la sentencia UPDATE en forma de string.
 
@@ -726,5 +873,161 @@ class Update:
         first, *rest = self._where
         buff.append(f' WHERE {first}')
         for cond in rest:
-            buff.append('   AND {cond}')
+            buff.append(f'   AND {cond}')
+        return '\n'.join(buff)
+
+
+# --[ Delete ]---------------------------------------------------------
+
+
+class Delete:
+    """
+    El objetivo de esta clase es poder escribir sentencias Delete SQL
+    de forma sencilla. Igual que con L{Update}, es obligatorio
+    indicar al menos una condición.
+
+        Ejemplo de Uso:
+
+        >>> print(Delete('Agora.Isla').Where('id_isla IN (:1, :2)'))
+        DELETE FROM Agora.Isla
+         WHERE id_isla IN (:1, :2)
+    """
+
+    def __init__(self, tabla):
+        """Constructor"""
+        self.tabla = tabla
+        self._where = []
+
+    def Where(self, condicion):
+        """Añadir una condición WHERE a la sentencia."""
+        if condicion not in self._where:
+            self._where.append(condicion)
+        return self
+
+    And = Where
+
+    def __str__(self):
+        """Retorna la sentencia DELETE en forma de string.
+
+        @return: La sentencia SQL construida.
+        @rtype: string
+        """
+        if not self._where:
+            raise ValueError(
+                'No se acepta una sentencia Delete'
+                ' que afecte a toda la tabla, tiene que'
+                ' incluir al menos una condicion'
+                )
+        first, *rest = self._where
+        buff = [f'DELETE FROM {self.tabla}', f' WHERE {first}']
+        for cond in rest:
+            buff.append(f'   AND {cond}')
+        return '\n'.join(buff)
+
+
+# --[ Merge ]----------------------------------------------------------
+
+
+class Merge:
+    """
+    El objetivo de esta clase es escribir sentencias MERGE (Oracle) que
+    insertan o actualizan una fila en un único viaje a la base de datos.
+    Los valores van siempre en variables de enlace con el nombre del
+    campo, para poder usarla con C{executemany}.
+
+    La fila se busca por los campos de C{claves}. Si existe, sólo se
+    actualiza si algún campo ha cambiado; los campos de C{claves} y de
+    C{fijos} (por ejemplo, la clave primaria cuando se busca por claves
+    naturales) no se actualizan nunca. Los campos de C{lobs} se comparan
+    con C{DBMS_LOB.COMPARE}, porque C{DECODE} no admite LOBs.
+
+        >>> sql = Merge('Agora.Isla', ['id_isla', 'descripcion'], ['id_isla'])
+        >>> print(sql)
+        MERGE INTO Agora.Isla t
+        USING (SELECT :id_isla AS ID_ISLA, :descripcion AS DESCRIPCION FROM Dual) s
+           ON (t.ID_ISLA = s.ID_ISLA)
+         WHEN MATCHED THEN UPDATE SET t.DESCRIPCION = s.DESCRIPCION
+              WHERE DECODE(t.DESCRIPCION, s.DESCRIPCION, 0, 1) = 1
+         WHEN NOT MATCHED THEN INSERT (ID_ISLA, DESCRIPCION)
+              VALUES (s.ID_ISLA, s.DESCRIPCION)
+
+    En otras bases de datos se puede usar C{upsert}, que genera un
+    C{INSERT ... ON CONFLICT} equivalente (SQLite y PostgreSQL):
+
+        >>> print(sql.upsert('sqlite'))
+        INSERT INTO Agora.Isla AS t (ID_ISLA, DESCRIPCION)
+         VALUES (:id_isla, :descripcion)
+         ON CONFLICT (ID_ISLA) DO UPDATE SET DESCRIPCION = excluded.DESCRIPCION
+              WHERE t.DESCRIPCION IS NOT excluded.DESCRIPCION
+    """
+
+    def __init__(self, tabla, campos, claves, fijos=(), lobs=()):
+        """Constructor"""
+        self.tabla = tabla
+        self.campos = [nombre.upper() for nombre in campos]
+        self.claves = [nombre.upper() for nombre in claves]
+        excluidos = set(self.claves) | {nombre.upper() for nombre in fijos}
+        self.actualizables = [_ for _ in self.campos if _ not in excluidos]
+        self.lobs = {nombre.upper() for nombre in lobs}
+        if not self.claves:
+            raise ValueError('Hay que indicar al menos un campo para buscar la fila')
+
+    def changed(self, nombre, old='t', new='s', dialect='oracle'):
+        """Condición que se cumple si el campo ha cambiado (los nulos
+        se consideran iguales entre sí).
+        """
+        if dialect == 'sqlite':
+            return f'{old}.{nombre} IS NOT {new}.{nombre}'
+        if dialect == 'postgresql':
+            return f'{old}.{nombre} IS DISTINCT FROM {new}.{nombre}'
+        if nombre in self.lobs:
+            # DBMS_LOB.COMPARE devuelve NULL si alguno de los dos es nulo
+            return (
+                f'(NVL(DBMS_LOB.COMPARE({old}.{nombre}, {new}.{nombre}), 1) <> 0'
+                f' AND NOT ({old}.{nombre} IS NULL AND {new}.{nombre} IS NULL))'
+                )
+        return f'DECODE({old}.{nombre}, {new}.{nombre}, 0, 1) = 1'
+
+    def __str__(self):
+        """Retorna la sentencia MERGE en forma de string.
+
+        @return: La sentencia SQL construida.
+        @rtype: string
+        """
+        source = ', '.join(f':{nombre.lower()} AS {nombre}' for nombre in self.campos)
+        on = ' AND '.join(f't.{nombre} = s.{nombre}' for nombre in self.claves)
+        buff = [
+            f'MERGE INTO {self.tabla} t',
+            f'USING (SELECT {source} FROM Dual) s',
+            f'   ON ({on})',
+            ]
+        if self.actualizables:
+            assignments = ', '.join(f't.{_} = s.{_}' for _ in self.actualizables)
+            changes = ' OR '.join(self.changed(_) for _ in self.actualizables)
+            buff.append(f' WHEN MATCHED THEN UPDATE SET {assignments}')
+            buff.append(f'      WHERE {changes}')
+        buff.append(f' WHEN NOT MATCHED THEN INSERT ({", ".join(self.campos)})')
+        buff.append(f'      VALUES ({", ".join(f"s.{_}" for _ in self.campos)})')
+        return '\n'.join(buff)
+
+    def upsert(self, dialect):
+        """Sentencia `INSERT ... ON CONFLICT` equivalente, para SQLite o
+        PostgreSQL. Necesita un índice único sobre los campos de C{claves}.
+        """
+        values = ', '.join(f':{nombre.lower()}' for nombre in self.campos)
+        buff = [
+            f'INSERT INTO {self.tabla} AS t ({", ".join(self.campos)})',
+            f' VALUES ({values})',
+            ]
+        conflict = f' ON CONFLICT ({", ".join(self.claves)})'
+        if self.actualizables:
+            assignments = ', '.join(f'{_} = excluded.{_}' for _ in self.actualizables)
+            changes = ' OR '.join(
+                self.changed(_, new='excluded', dialect=dialect)
+                for _ in self.actualizables
+                )
+            buff.append(f'{conflict} DO UPDATE SET {assignments}')
+            buff.append(f'      WHERE {changes}')
+        else:
+            buff.append(f'{conflict} DO NOTHING')
         return '\n'.join(buff)
@@ -0,0 +1,117 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Diario de claves ya migradas, para poder reanudar una ejecución.
+
+Cada ejecución de `migrate` tiene un identificador. Las claves
+`(modelo, pk)` migradas se apuntan en un fichero SQLite local (el
+mismo que los checkpoints), en bloques, para que escribir el diario no
+sea un cuello de botella. Si la ejecución se interrumpe, con `--resume`
+se retoma la última ejecución sin terminar y se saltan las claves que ya
+estaban apuntadas.
+"""
+
+from datetime import datetime as DateTime
+import sqlite3
+import threading
+
+from settings import STATE_DB, JOURNAL_FLUSH_EVERY
+
+
+class Journal:
+
+    def __init__(self, run_id=None, filename=STATE_DB, flush_every=JOURNAL_FLUSH_EVERY):
+        self.conn = sqlite3.connect(filename, check_same_thread=False)
+        self.lock = threading.Lock()
+        self.flush_every = flush_every
+        self.pending = []
+        with self.lock, self.conn:
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS run ('
+                '  run_id TEXT PRIMARY KEY,'
+                '  started TEXT NOT NULL,'
+                '  finished TEXT'
+                ')'
+                )
+            self.conn.execute(
+                'CREATE TABLE IF NOT EXISTS journal ('
+                '  run_id TEXT NOT NULL,'
+                '  model TEXT NOT NULL,'
+                '  pk TEXT NOT NULL,'
+                '  PRIMARY KEY (run_id, model, pk)'
+                ')'
+                )
+            if run_id is None:
+                run_id = DateTime.now().strftime('%Y%m%d%H%M%S%f')
+            self.run_id = run_id
+            self.conn.execute(
+                'INSERT OR IGNORE INTO run (run_id, started) VALUES (?, ?)',
+                (run_id, DateTime.now().isoformat()),
+                )
+
+    @classmethod
+    def last_unfinished(cls, filename=STATE_DB):
+        """Identificador de la última ejecución sin terminar, o `None`.
+
+        Sólo cuentan las ejecuciones posteriores a la última terminada:
+        lo apuntado por una anterior puede haber cambiado desde entonces.
+        """
+        conn = sqlite3.connect(filename)
+        try:
+            row = conn.execute(
+                'SELECT run_id FROM run'
+                ' WHERE finished IS NULL'
+                "   AND started > (SELECT COALESCE(MAX(started), '') FROM run"
+                '                   WHERE finished IS NOT NULL)'
+                ' ORDER BY started DESC'
+                ' LIMIT 1'
+                ).fetchone()
+        except sqlite3.OperationalError:  # Todavía no hay diario
+            row = None
+        finally:
+            conn.close()
+        return row[0] if row else None
+
+    def done(self, model_name) -> set:
+        """Claves del modelo ya apuntadas en esta ejecución, como texto.
+        """
+        self.flush()
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT pk FROM journal WHERE run_id = ? AND model = ?',
+                (self.run_id, model_name),
+                ).fetchall()
+        return {row[0] for row in rows}
+
+    def record(self, model_name, primary_keys):
+        """Apuntar claves ya migradas. Se escriben en bloques de `flush_every`.
+        """
+        with self.lock:
+            self.pending.extend((self.run_id, model_name, str(pk)) for pk in primary_keys)
+            must_flush = len(self.pending) >= self.flush_every
+        if must_flush:
+            self.flush()
+
+    def flush(self):
+        with self.lock, self.conn:
+            rows, self.pending = self.pending, []
+            if rows:
+                self.conn.executemany(
+                    'INSERT OR IGNORE INTO journal (run_id, model, pk) VALUES (?, ?, ?)',
+                    rows,
+                    )
+
+    def finish(self):
+        """Marcar la ejecución como terminada y borrar sus claves del diario.
+        """
+        with self.lock, self.conn:
+            self.pending = []
+            self.conn.execute('DELETE FROM journal WHERE run_id = ?', (self.run_id,))
+            self.conn.execute(
+                'UPDATE run SET finished = ? WHERE run_id = ?',
+                (DateTime.now().isoformat(), self.run_id),
+                )
+
+    def close(self):
+        self.flush()
+        self.conn.close()
@@ -3,28 +3,224 @@
 
 import logging
 import argparse
+import sys
+import concurrent.futures
+import contextlib
+import functools
+import json
+import time
+import tomllib
+from datetime import datetime as DateTime
+from datetime import timedelta as TimeDelta
 from rich.progress import Progress
 from rich.console import Console
 
+from checkpoints import CheckpointStore
+from journal import Journal
+from metrics import Metrics
+from clitools import Tabula
+import clitools
 from models import catalog
+from diff import diff_batch
 from results import Success, Failure
-from settings import DEFAULT_SINCE_DAYS
+from settings import (
+    DEFAULT_SINCE_DAYS,
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_WORKERS,
+    HASH_CHECK,
+    CHECKPOINT_OVERLAP_MINUTES,
+    TRACE_SQL,
+    PLAN_SECONDS_PER_WRITE,
+    UPSERT,
+    COMMIT_ROWS,
+    COMMIT_SECONDS,
+    )
+import check_table
 import dba
+import scheduler
+import tracer
 
 
 OK = "[green]✓[/green]"
 ERROR = "[red]✖[/red]"
 
 
+class IdentityMap:
+    """Registro de las instancias `(modelo, clave primaria)` ya visitadas
+    durante una ejecución.
+
+    Las dependencias compartidas (por ejemplo, el `Proyecto` de muchas
+    `Tarea`) sólo se migran la primera vez que aparecen.
+    """
+
+    def __init__(self):
+        self.seen = set()
+        self.recent = None
+        self.hits = 0
+        self.misses = 0
+
+    def visit(self, model, primary_key) -> bool:
+        """Marcar como visitada. Devuelve `False` si ya lo estaba.
+
+        Las claves se comparan como texto: la de `duplicate` llega como
+        `str` desde la línea de órdenes y las leídas de la base de
+        datos suelen ser `int`.
+        """
+        key = (model.__name__, str(primary_key))
+        if key in self.seen:
+            self.hits += 1
+            return False
+        self.seen.add(key)
+        if self.recent is not None:
+            self.recent.append(key)
+        self.misses += 1
+        return True
+
+    def pending(self, model, primary_keys) -> list:
+        """Filtrar (y marcar como visitadas) las claves no visitadas aun.
+        """
+        return [pk for pk in primary_keys if self.visit(model, pk)]
+
+    def forget(self):
+        """Olvidar las claves visitadas (por ejemplo, tras deshacer una
+        transacción), conservando los contadores.
+        """
+        self.seen = set()
+        self.recent = None
+
+    def mark(self):
+        """Empezar a apuntar las claves que se visiten, para poder
+        olvidarlas con `undo`.
+        """
+        self.recent = []
+
+    def undo(self) -> list:
+        """Olvidar las claves visitadas desde el último `mark`. Devuelve
+        las tuplas `(nombre del modelo, clave)` olvidadas.
+        """
+        recent, self.recent = self.recent or [], None
+        self.seen.difference_update(recent)
+        return recent
+
+    def unmark(self):
+        """Dejar de apuntar las claves visitadas, conservándolas.
+        """
+        self.recent = None
+
+
+def positive_int(value) -> int:
+    """Tipo de argparse para enteros mayores que cero.
+    """
+    result = int(value)
+    if result <= 0:
+        raise argparse.ArgumentTypeError(f'tiene que ser mayor que cero: {value}')
+    return result
+
+
 class Handler:
 
     def __init__(self):
         self.console = Console()
+        self.identity = IdentityMap()
+        self.checkpoints = None
+        self.journal = None
+        self.metrics = None
+        self.dry_run = False
+        self.transaction = None
+        self.watermarks = {}
+        self.committed_watermarks = {}
+        self.failures = {}
+        self.started = DateTime.now()
         logging.basicConfig(filename='madrox.log', level='DEBUG')
         self.log = logging.getLogger('madrox')
         self.log.setLevel(logging.DEBUG)
-        self.db_source = dba.get_database_connection('DB_SOURCE')
-        self.db_target = dba.get_database_connection('DB_TARGET')
+        self._db_source = None
+        self._db_target = None
+
+    @property
+    def db_source(self):
+        """Conexión de origen. Se toma del pool la primera vez que se usa.
+        """
+        if self._db_source is None:
+            self._db_source = dba.acquire('DB_SOURCE')
+        return self._db_source
+
+    @property
+    def db_target(self):
+        """Conexión de destino. Se toma del pool la primera vez que se usa.
+        """
+        if self._db_target is None:
+            self._db_target = dba.acquire('DB_TARGET')
+        return self._db_target
+
+    def close(self):
+        """Devolver las conexiones a sus pools. Si queda una transacción
+        abierta es porque algo ha fallado, así que se deshace.
+        """
+        if self.transaction is not None:
+            self.transaction.close(commit=False)
+            self.transaction = None
+        if self._db_source is not None:
+            dba.release('DB_SOURCE', self._db_source)
+            self._db_source = None
+        if self._db_target is not None:
+            dba.release('DB_TARGET', self._db_target)
+            self._db_target = None
+
+    def spawn(self):
+        """Nuevo Handler, con sus propias conexiones, para un trabajador.
+
+        Comparte las opciones y la consola, pero no el mapa de identidad.
+        """
+        handler = Handler()
+        handler.console = self.console
+        handler.options = self.options
+        handler.is_verbose = self.is_verbose
+        handler.is_muted = self.is_muted
+        handler.checkpoints = self.checkpoints
+        handler.journal = self.journal
+        handler.metrics = self.metrics
+        handler.dry_run = self.dry_run
+        handler.failures = self.failures
+        if self.transaction is not None:
+            # Los trabajadores escriben las mismas dependencias compartidas;
+            # cada grupo se confirma al terminar para no bloquear a los demás
+            handler.begin(max_rows=1)
+        handler.started = self.started
+        return handler
+
+    def measure(self, model, phase):
+        """Gestor de contexto que mide una fase de la migración de un modelo.
+        """
+        if self.metrics is None:
+            return contextlib.nullcontext()
+        return self.metrics.phase(model, phase)
+
+    def count(self, model, name, num=1):
+        if self.metrics is not None:
+            self.metrics.count(model, name, num)
+
+    def begin(self, max_rows=COMMIT_ROWS):
+        """Empezar a escribir en destino en transacciones explícitas de
+        `max_rows` claves o `COMMIT_SECONDS` segundos.
+        """
+        self.transaction = dba.Transaction(
+            self.db_target,
+            max_rows=max_rows,
+            max_seconds=COMMIT_SECONDS,
+            on_commit=self.on_commit,
+            on_rollback=self.on_rollback,
+            )
+
+    def on_commit(self):
+        if self.journal is not None:
+            self.journal.flush()
+        self.committed_watermarks = dict(self.watermarks)
+
+    def on_rollback(self):
+        # Lo visitado desde el último commit ya no está en destino
+        self.identity.forget()
+        self.watermarks = dict(self.committed_watermarks)
 
     def print(self, *args, **kwargs):
         self.console.print(*args, **kwargs)
@@ -59,35 +255,81 @@ class Handler:
             f' pero {num_target} en destino.'
             )
 
-    def _do_update(self, model, source, target):
+    def _do_update(self, model, source, target, changes=None):
         primary_key = getattr(source, model.Meta.primary_key)
-        exclude = set([model.Meta.primary_key])
-        new_values = model._to_dict(source, exclude=exclude)
-        old_values = model._to_dict(target, exclude=exclude)
-        if new_values != old_values:  # Update needed
-            diff_values = {}
-            for name in old_values:
-                old_value = old_values[name]
-                new_value = new_values[name]
-                if new_value != old_value:
-                    if self.is_verbose:
-                        self.out(f'{name} {new_value} != {old_value}')
-                    diff_values[name] = new_values[name]
-            model._update(self.db_target, primary_key, diff_values)
+        if changes is None:
+            changes = model._changes(source, target)
+        if changes:  # Update needed
+            if self.is_verbose:
+                for name, new_value in changes.items():
+                    self.out(f'{name} {new_value} != {getattr(target, name)}')
+            with self.measure(model, 'write'):
+                model._update(self.db_target, primary_key, changes)
+            self.count(model, 'updated')
             return Success('Ya existe. Actualizado')
+        self.count(model, 'unchanged')
         return Success('Sin cambios')
 
-    def _do_insert(self, model, instance):
-        values = model._to_dict(instance)
-        model._insert(self.db_target, values)
-        return Success('No existe. Insertado')
+    def _do_insert(self, model, *instances):
+        rows = [model._to_dict(instance) for instance in instances]
+        with self.measure(model, 'write'):
+            result = model._insert_many(self.db_target, rows)
+        self.count(model, 'inserted', result.num_rows)
+        for offset, message in result.errors:
+            primary_key = getattr(instances[offset], model.Meta.primary_key)
+            self.fail(model, [primary_key])
+            self.out(Failure(
+                f'No puedo insertar {model.Meta.table_name}[{primary_key!r}]: {message}'
+                ))
+        if result.errors:
+            return Failure(
+                f'Insertados {result.num_rows} de {len(rows)},'
+                f' {len(result.errors)} errores'
+                )
+        if len(rows) == 1:
+            return Success('No existe. Insertado')
+        return Success(f'No existen. Insertados {result.num_rows}')
+
+    def _do_upsert(self, model, *instances):
+        rows = [model._to_dict(instance) for instance in instances]
+        with self.measure(model, 'write'):
+            result = model._upsert_many(self.db_target, rows)
+        self.count(model, 'merged', result.num_rows)
+        for offset, message in result.errors:
+            primary_key = getattr(instances[offset], model.Meta.primary_key)
+            self.fail(model, [primary_key])
+            self.out(Failure(
+                f'No puedo migrar {model.Meta.table_name}[{primary_key!r}]: {message}'
+                ))
+        if result.errors:
+            return Failure(
+                f'Migrados {result.num_rows} de {len(rows)},'
+                f' {len(result.errors)} errores'
+                )
+        return Success(f'Insertados o actualizados {result.num_rows}')
+
+    def _do_replace(self, model, instance):
+        primary_key = getattr(instance, model.Meta.primary_key)
+        with self.measure(model, 'target'):
+            target = model._load_instance(self.db_target, primary_key)
+            if not target:
+                target = model._load_from_natural_keys(self.db_target, instance)
+        if target:
+            return self._do_update(model, instance, target)
+        return self._do_insert(model, instance)
 
     def migrar_modelo(self, model, primary_key, level=0):
         subject = f'{model.Meta.table_name}[{primary_key!r}]'
+        if not self.identity.visit(model, primary_key):
+            if self.options.verbose:
+                self.out(f'{subject} ya migrado', level=level)
+            return Success('Ya migrado')
         if self.options.verbose:
             self.out(f'Migrando [bold yellow]{subject}[/]', level=level)
-        instance = model._load_instance(self.db_source, primary_key)
+        with self.measure(model, 'source'):
+            instance = model._load_instance(self.db_source, primary_key)
         if not instance:
+            self.fail(model, [primary_key])
             return self.out(Failure(f"No puedo cargar {subject} en origen"))
 
         # Dependencias previas
@@ -103,40 +345,199 @@ class Handler:
                 self.migrar_modelo(submodel, value, level=level+1)
 
         # Instancia actual
+        self.migrar_instancia(model, instance, level=level)
+
+        # modelos subordinados
+        for submodel in model.Meta.master_of:
+            self.out(f'Entidad dependiente {submodel}', level=level+1)
+            if self.options.verbose:
+                self.out(f'Veamos las entidades dependientes {submodel}', level=level+1)
+            with self.measure(submodel, 'source'):
+                masons = list(submodel._load_instances(
+                    self.db_source,
+                    model.Meta.primary_key,
+                    value=primary_key,
+                    ))
+            for mason in masons:
+                mason_pk = getattr(mason, submodel.Meta.primary_key)
+                self.migrar_modelo(submodel, mason_pk, level=level+1)
+        return Success()
+
+    def migrar_instancia(self, model, instance, level=0):
+        """Insertar o actualizar en destino una instancia ya cargada.
+
+        No sigue ni las dependencias ni los modelos subordinados.
+        """
+        primary_key = getattr(instance, model.Meta.primary_key)
         if self.is_verbose:
             self.out(
                 f'Migrando instancia actual {model.__name__}[{primary_key}]',
                 level=level,
                 )
-        no_existe = instance.not_exists(self.db_target)
+        with self.measure(model, 'exists'):
+            no_existe = instance.not_exists(self.db_target)
         if no_existe:  # Insert
             result = self._do_insert(model, instance)
-            if self.is_verbose:
-                self.out(result, level=level)
         else:
-            target = model._load_instance(self.db_target, primary_key)
-            if not target:
-                target = model._load_from_natural_keys(self.db_target, instance)
-            if target:
-                result = self._do_update(model, instance, target)
-            else:
-                result = self._do_insert(model, instance)
-            if self.is_verbose:
-                self.out(result, level=level)
+            result = self._do_replace(model, instance)
+        if result:
+            self.track_watermark(model, [instance])
+        if self.is_verbose:
+            self.out(result, level=level)
+        return result
 
-        # modelos subordinados
+    def track_watermark(self, model, instances):
+        """Actualizar la marca de agua del modelo con instancias ya migradas.
+        """
+        watermark = model._watermark(instances)
+        if watermark is not None:
+            current = self.watermarks.get(model)
+            if current is None or watermark > current:
+                self.watermarks[model] = watermark
+
+    def fail(self, model, primary_keys):
+        """Apuntar claves de un modelo que no se han podido migrar.
+
+        Mientras un modelo tenga claves fallidas no se guarda su
+        checkpoint, para que la siguiente ejecución incremental las
+        vuelva a intentar. `model` puede ser la clase o su nombre.
+        """
+        name = model if isinstance(model, str) else model.__name__
+        failed = self.failures.setdefault(name, set())
+        num_failed = len(failed)
+        failed.update(str(pk) for pk in primary_keys)
+        self.count(name, 'failed', len(failed) - num_failed)
+
+    def record(self, model, primary_keys):
+        """Apuntar en el diario las claves ya migradas de un modelo.
+        """
+        if self.journal is not None:
+            self.journal.record(model.__name__, primary_keys)
+
+    def save_checkpoint(self, model):
+        """Guardar la marca de agua de un modelo, sin pasar nunca del
+        momento en que empezó la ejecución.
+
+        No se guarda si alguna clave del modelo ha fallado: la marca de
+        agua de las demás podría dejar atrás las filas fallidas.
+        """
+        watermark = self.watermarks.get(model)
+        if self.checkpoints is None or watermark is None:
+            return
+        failed = self.failures.get(model.__name__)
+        if failed:
+            self.out(Failure(
+                f'{model.__name__}: {len(failed)} claves sin migrar,'
+                ' no se avanza el checkpoint'
+                ))
+            return
+        self.checkpoints.set(model.__name__, min(watermark, self.started))
+
+    def migrar_lote(self, model, primary_keys, level=0):
+        """Migrar un lote de instancias de un modelo, dadas sus claves.
+
+        Las instancias se cargan en bloque desde origen, en vez de
+        hacer una consulta por cada clave primaria.
+        """
+        primary_keys = self.identity.pending(model, primary_keys)
+        if not primary_keys:
+            return Success('Ya migrado')
+        if self.options.verbose:
+            self.out(
+                f'Migrando lote de {len(primary_keys)}'
+                f' [bold yellow]{model.Meta.table_name}[/]',
+                level=level,
+                )
+        with self.measure(model, 'source'):
+            instances = model._load_many(self.db_source, primary_keys)
+        if len(instances) < len(primary_keys):
+            loaded = {getattr(_, model.Meta.primary_key) for _ in instances}
+            for primary_key in primary_keys:
+                if primary_key not in loaded:
+                    subject = f'{model.Meta.table_name}[{primary_key!r}]'
+                    self.fail(model, [primary_key])
+                    self.out(Failure(f"No puedo cargar {subject} en origen"))
+        return self.migrar_instancias(model, instances, level=level)
+
+    def migrar_instancias(self, model, instances, level=0):
+        """Migrar un lote de instancias ya cargadas desde origen.
+
+        Las dependencias y los modelos subordinados también se
+        migran por lotes, agrupando las claves de todo el lote.
+        Las instancias ya tienen que estar marcadas como visitadas
+        en el mapa de identidad.
+        """
+        if not instances:
+            return Success()
+
+        # Dependencias previas
+        for field_name, submodel in model.Meta.depends_on.items():
+            values = [getattr(_, field_name) for _ in instances]
+            values = list(dict.fromkeys(_ for _ in values if _ is not None))
+            if values:
+                if self.options.verbose:
+                    self.out(
+                        f'Depende de {field_name} = {submodel!r}'
+                        f' ({len(values)} claves)',
+                        level=level,
+                        )
+                self.migrar_lote(submodel, values, level=level+1)
+
+        # Instancias actuales: con --upsert, un MERGE por bloque y sin
+        # leer destino; si no, comparadas en bloque con destino
+        if getattr(self.options, 'upsert', False) and not self.dry_run:
+            if self._do_upsert(model, *instances):
+                self.track_watermark(model, instances)
+            return self.migrar_subordinados(model, instances, level=level)
+        hash_check = getattr(self.options, 'hash_check', False)
+        with self.measure(model, 'target'):
+            diff = diff_batch(
+                model,
+                self.db_target,
+                instances,
+                db_source=self.db_source if hash_check else None,
+                )
+        self.count(model, 'unchanged', len(diff.unchanged))
+        if self.dry_run:  # Sólo contar lo que se haría
+            self.count(model, 'inserted', len(diff.to_insert))
+            self.count(model, 'updated', len(diff.to_update))
+        else:
+            migrated = list(diff.unchanged)
+            if diff.to_insert:
+                result = self._do_insert(model, *diff.to_insert)
+                if result:
+                    migrated.extend(diff.to_insert)
+                if self.is_verbose:
+                    self.out(result, level=level)
+            for instance, target, changes in diff.to_update:
+                result = self._do_update(model, instance, target, changes)
+                migrated.append(instance)
+                if self.is_verbose:
+                    self.out(result, level=level)
+            self.track_watermark(model, migrated)
+        if self.is_verbose and diff.unchanged:
+            self.out(Success(f'Sin cambios: {len(diff.unchanged)}'), level=level)
+        return self.migrar_subordinados(model, instances, level=level)
+
+    def migrar_subordinados(self, model, instances, level=0):
+        """Migrar por lotes los modelos subordinados (`master_of`) de
+        un lote de instancias.
+        """
+        primary_keys = [getattr(_, model.Meta.primary_key) for _ in instances]
         for submodel in model.Meta.master_of:
-            self.out(f'Entidad dependiente {submodel}', level=level+1)
             if self.options.verbose:
                 self.out(f'Veamos las entidades dependientes {submodel}', level=level+1)
-            masons = submodel._load_instances(
-                self.db_source,
-                model.Meta.primary_key,
-                value=primary_key,
-                )
-            for mason in masons:
-                mason_pk = getattr(mason, submodel.Meta.primary_key)
-                self.migrar_modelo(submodel, mason_pk, level=level+1)
+            with self.measure(submodel, 'source'):
+                masons = submodel._load_instances_in(
+                    self.db_source,
+                    model.Meta.primary_key,
+                    primary_keys,
+                    )
+            masons = [
+                mason for mason in masons
+                if self.identity.visit(submodel, getattr(mason, submodel.Meta.primary_key))
+                ]
+            self.migrar_instancias(submodel, masons, level=level+1)
         return Success()
 
     def get_parser(self):
@@ -147,6 +548,13 @@ class Handler:
         group = parser.add_mutually_exclusive_group()
         group.add_argument('-v', '--verbose', action='store_true')
         group.add_argument('-m', '--muted', action='store_true')
+        parser.add_argument(
+            '--trace-sql',
+            type=int,
+            metavar='N',
+            default=TRACE_SQL,
+            help='Trazar las sentencias SQL y mostrar al salir las N más costosas',
+            )
         subparsers = parser.add_subparsers(help='Comandos displonibles')
         # ls
         ls_parser = subparsers.add_parser(
@@ -188,7 +596,110 @@ class Handler:
             help='Número de días a migrar',
             default=DEFAULT_SINCE_DAYS,
             )
+        migrate_parser.add_argument(
+            '--batch-size',
+            type=int,
+            help='Número de registros a cargar por lote (0 para migrar de uno en uno)',
+            default=DEFAULT_BATCH_SIZE,
+            )
+        migrate_parser.add_argument(
+            '--workers',
+            type=int,
+            help='Número de modelos a migrar en paralelo',
+            default=DEFAULT_WORKERS,
+            )
+        migrate_parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Empezar desde el último checkpoint de cada modelo, si lo hay,'
+                 ' en vez de usar --num-days',
+            )
+        migrate_parser.add_argument(
+            '--hash-check',
+            action='store_true',
+            help='Comparar hashes de fila calculados en el servidor antes de'
+                 ' cargar las filas de destino',
+            default=HASH_CHECK,
+            )
+        migrate_parser.add_argument(
+            '--upsert',
+            action='store_true',
+            help='Escribir cada lote con un MERGE, sin leer antes destino',
+            default=UPSERT,
+            )
+        migrate_parser.add_argument(
+            '--resume',
+            action='store_true',
+            help='Reanudar la última ejecución interrumpida, saltando las claves'
+                 ' que ya se migraron',
+            )
+        migrate_parser.add_argument(
+            '--metrics-json',
+            metavar='FICHERO',
+            help='Guardar las métricas por modelo y fase en formato JSON',
+            )
+        migrate_parser.add_argument(
+            '--metrics-prom',
+            metavar='FICHERO',
+            help='Guardar las métricas como fichero de texto para Prometheus'
+                 ' (textfile collector del node exporter)',
+            )
         migrate_parser.set_defaults(func=self.cmd_migrate)
+
+        # plan
+        plan_parser = subparsers.add_parser(
+            'plan',
+            help='calcular, sin escribir nada, lo que haría migrate',
+            )
+        plan_parser.add_argument(
+            'model',
+            nargs='+',
+            )
+        plan_parser.add_argument(
+            '--num-days',
+            type=int,
+            help='Número de días a migrar',
+            default=DEFAULT_SINCE_DAYS,
+            )
+        plan_parser.add_argument(
+            '--batch-size',
+            type=positive_int,
+            help='Número de registros a cargar por lote (el camino fila a fila'
+                 ' escribe en destino, así que plan no lo admite)',
+            default=DEFAULT_BATCH_SIZE or 500,
+            )
+        plan_parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Empezar desde el último checkpoint de cada modelo, si lo hay',
+            )
+        plan_parser.add_argument(
+            '--hash-check',
+            action='store_true',
+            help='Comparar hashes de fila calculados en el servidor',
+            default=HASH_CHECK,
+            )
+        plan_parser.add_argument(
+            '--from-metrics',
+            metavar='FICHERO',
+            help='Métricas JSON de una migración anterior (--metrics-json),'
+                 ' para estimar el coste de cada escritura por modelo',
+            )
+        plan_parser.set_defaults(func=self.cmd_plan)
+
+        # verify
+        verify_parser = subparsers.add_parser(
+            'verify',
+            help='verificar las tablas indicadas en un manifiesto',
+            )
+        verify_parser.add_argument('manifest')
+        verify_parser.add_argument(
+            '--workers',
+            type=int,
+            help='Número de tablas a verificar en paralelo',
+            default=max(DEFAULT_WORKERS, 4),
+            )
+        verify_parser.set_defaults(func=self.cmd_verify)
         return parser
 
     def run(self):
@@ -196,7 +707,14 @@ class Handler:
         options = parser.parse_args()
         self.is_verbose = options.verbose
         self.is_muted = options.muted
-        return options.func(options)
+        if options.trace_sql:
+            tracer.install(top=options.trace_sql)
+        # Una conexión de cada pool por trabajador, más la de este Handler
+        dba.configure_pools(getattr(options, 'workers', 1) + 1)
+        try:
+            return options.func(options)
+        finally:
+            self.close()
 
     def cmd_ls(self, options):
         models = options.model
@@ -217,37 +735,273 @@ class Handler:
             self.out(f'Migrando registro {pk} de {model}')
         self.migrar_modelo(model, pk, level=0)
 
+    def migrable_models(self, names):
+        if len(names) == 1 and names[0] == 'all':
+            names = list(catalog.keys())
+        models = [catalog[name] for name in names]
+        return [model for model in models if model._is_migrable()]
+
     def cmd_migrate(self, options):
         self.options = options
-        models = options.model
-        if len(models) == 1 and models[0] == 'all':
-            models = list(catalog.keys())
         if self.is_verbose:
             self.out(
                 'Migrando registros creados o modificados'
                 f' en los ultimos {options.num_days} días.',
                 )
-        tasks = {}
-        with Progress() as progress:
-            for model_name in models:
-                model = catalog[model_name]
-                if not model._is_migrable():
-                    continue
-                primary_keys = list(model._since(self.db_source, num_days=options.num_days))
-                total = len(primary_keys)
-                tasks[model_name] = progress.add_task(
-                    description=f'{model_name} 0/{total}',
-                    total=len(primary_keys),
+        models = self.migrable_models(options.model)
+        if options.incremental:
+            self.checkpoints = CheckpointStore()
+        run_id = Journal.last_unfinished() if options.resume else None
+        if options.resume and run_id is None:
+            self.out('No hay ninguna ejecución que reanudar', style='yellow')
+        self.journal = Journal(run_id)
+        self.metrics = Metrics()
+        if COMMIT_ROWS > 0:
+            self.begin()
+        try:
+            with Progress() as progress:
+                if options.workers > 1:
+                    workers = []
+
+                    def make_worker():
+                        worker = self.spawn()
+                        workers.append(worker)
+                        return worker
+                    try:
+                        scheduler.run(
+                            models,
+                            task=lambda worker, model: worker.migrar_desde(model, progress),
+                            make_worker=make_worker,
+                            num_workers=options.workers,
+                            )
+                        for worker in workers:
+                            if worker.transaction is not None:
+                                worker.transaction.close()
+                                worker.transaction = None
+                    finally:
+                        # Si algo ha fallado, close deshace lo que quede pendiente
+                        for worker in workers:
+                            worker.close()
+                else:
+                    workers = [self]
+                    for model in scheduler.topological_order(models):
+                        self.migrar_desde(model, progress)
+        except BaseException:
+            self.journal.close()  # Lo apuntado queda para --resume
+            raise
+        if self.transaction is not None:
+            self.transaction.close()
+            self.transaction = None
+        if not self.is_muted:
+            hits = sum(worker.identity.hits for worker in workers)
+            misses = sum(worker.identity.misses for worker in workers)
+            self.out(f'Mapa de identidad: {hits} aciertos, {misses} fallos')
+            self.metrics.print_table()
+        if options.metrics_json:
+            self.metrics.save_json(options.metrics_json)
+        if options.metrics_prom:
+            self.metrics.save_prometheus(options.metrics_prom)
+        if self.checkpoints is not None:
+            self.checkpoints.close()
+        self.journal.finish()
+        self.journal.close()
+        num_failed = sum(len(keys) for keys in self.failures.values())
+        if num_failed:
+            self.out(Failure(
+                f'{num_failed} claves sin migrar en {len(self.failures)} modelos'
+                ))
+            return 1
+        return 0
+
+    def cmd_plan(self, options):
+        """Calcular lo que haría `migrate` con las mismas consultas en
+        bloque, pero sin escribir nada en destino.
+
+        La duración estimada es el tiempo de lectura medido ahora más
+        el coste de cada escritura: el de una migración anterior
+        (`--from-metrics`) o, si no, `PLAN_SECONDS_PER_WRITE`.
+        """
+        self.options = options
+        self.dry_run = True
+        self.metrics = Metrics()
+        models = self.migrable_models(options.model)
+        if options.incremental:
+            self.checkpoints = CheckpointStore()
+        write_costs = {}
+        if options.from_metrics:
+            with open(options.from_metrics) as f:
+                for name, data in json.load(f).items():
+                    num_writes = data['inserted'] + data['updated']
+                    if num_writes:
+                        write_costs[name] = data['seconds']['write'] / num_writes
+        with Progress(console=self.console, transient=True) as progress:
+            for model in scheduler.topological_order(models):
+                self.migrar_desde(model, progress)
+        if self.checkpoints is not None:
+            self.checkpoints.close()
+        stats = self.metrics.as_dict()
+        width = max([len(name) for name in stats] + [6])
+        totals = dict.fromkeys(['keys', 'inserted', 'updated', 'unchanged', 'seconds'], 0)
+        with Tabula(
+                modelo=width, claves=-8, insert=-8, update=-8, igual=-8, estimado=-10,
+                ) as tab:
+            for name, data in stats.items():
+                cost = write_costs.get(name, PLAN_SECONDS_PER_WRITE)
+                reads = sum(data['seconds'].values())
+                seconds = reads + cost * (data['inserted'] + data['updated'])
+                for key in totals:
+                    totals[key] += seconds if key == 'seconds' else data[key]
+                tab(
+                    name,
+                    data['keys'],
+                    data['inserted'],
+                    data['updated'],
+                    data['unchanged'],
+                    f'{seconds:.1f}s',
                     )
-                for counter, pk in enumerate(primary_keys, start=1):
-                    self.migrar_modelo(model, pk, level=0)
-                    progress.update(
-                        tasks[model_name],
-                        description=f'{model_name} {counter}/{total}',
-                        advance=1,
-                        )
+        self.print(
+            f"{totals['keys']} claves: {totals['inserted']} inserciones,"
+            f" {totals['updated']} actualizaciones y {totals['unchanged']} sin cambios."
+            f" Duración estimada: {TimeDelta(seconds=round(totals['seconds']))}"
+            )
         return 0
 
+    def migrar_desde(self, model, progress):
+        """Migrar los registros de un modelo creados o modificados
+        en los últimos `options.num_days` días.
+        """
+        options = self.options
+        model_name = model.__name__.lower()
+        since = None
+        if self.checkpoints is not None:
+            watermark = self.checkpoints.get(model.__name__)
+            if watermark is not None:
+                since = watermark - TimeDelta(minutes=CHECKPOINT_OVERLAP_MINUTES)
+                if self.is_verbose:
+                    self.out(f'{model_name}: desde el checkpoint {since}')
+        with self.measure(model, 'since'):
+            primary_keys = list(model._since(
+                self.db_source,
+                num_days=options.num_days,
+                since=since,
+                ))
+        self.count(model, 'keys', len(primary_keys))
+        if self.journal is not None and self.options.resume:
+            done = self.journal.done(model.__name__)
+            primary_keys = [pk for pk in primary_keys if str(pk) not in done]
+            if self.is_verbose and done:
+                self.out(f'{model_name}: {len(done)} claves ya migradas')
+        total = len(primary_keys)
+        task = progress.add_task(
+            description=f'{model_name} 0/{total}',
+            total=total,
+            )
+        if options.batch_size > 0:
+            groups = dba.chunks(primary_keys, options.batch_size)
+            step = functools.partial(self.migrar_lote, model)
+        else:
+            groups = ([pk] for pk in primary_keys)
+
+            def step(keys):
+                return self.migrar_modelo(model, keys[0])
+        counter = 0
+        for keys in groups:
+            self.migrar_claves(model, keys, step)
+            counter += len(keys)
+            progress.update(
+                task,
+                description=f'{model_name} {counter}/{total}',
+                advance=len(keys),
+                )
+        if self.transaction is not None:
+            self.transaction.commit()
+        self.save_checkpoint(model)
+        return total
+
+    def migrated(self, model, keys) -> list:
+        """Las claves de `keys` que no han fallado (ver `fail`).
+        """
+        failed = self.failures.get(model.__name__, ())
+        return [key for key in keys if str(key) not in failed]
+
+    def migrar_claves(self, model, keys, step):
+        """Migrar un grupo de claves con `step` dentro de la transacción
+        en curso, si la hay.
+
+        Sólo se apuntan en el diario las claves que se han migrado sin
+        errores, y cuando se confirma la transacción. Si algo falla, se
+        deshace sólo lo escrito por este grupo (hasta un `SAVEPOINT`), y
+        sus claves, con las de las dependencias y subordinados que se
+        migraron con ellas, se apuntan como fallidas.
+        """
+        if self.transaction is None:
+            step(keys)
+            self.record(model, self.migrated(model, keys))
+            return
+        self.transaction.savepoint()
+        self.identity.mark()
+        watermarks = dict(self.watermarks)
+        try:
+            step(keys)
+        except Exception as err:
+            self.transaction.rollback_to_savepoint()
+            self.watermarks = watermarks
+            self.fail(model, keys)
+            for name, primary_key in self.identity.undo():
+                self.fail(name, [primary_key])
+            self.out(Failure(
+                f'{model.__name__}: deshecho el grupo de {len(keys)} claves: {err}'
+                ))
+            return
+        self.identity.unmark()
+        self.transaction.add(
+            len(keys),
+            on_commit=functools.partial(self.record, model, self.migrated(model, keys)),
+            )
+
+    def verificar_tabla(self, table):
+        """Verificar una tabla del manifiesto con conexiones de los pools.
+
+        Devuelve una tupla `(nombre, mensaje de error, segundos)`.
+        """
+        name = table['name']
+        started = time.perf_counter()
+        try:
+            with (
+                dba.connection('DB_SOURCE') as db_source,
+                dba.connection('DB_TARGET') as db_target,
+            ):
+                err = check_table.verify_table(
+                    db_source,
+                    db_target,
+                    name,
+                    table.get('number', []),
+                    )
+        except Exception as exc:
+            err = str(exc)
+        return name, err, time.perf_counter() - started
+
+    def cmd_verify(self, options):
+        with open(options.manifest, 'rb') as f:
+            manifest = tomllib.load(f)
+        tables = manifest.get('table', [])
+        started = time.perf_counter()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=options.workers) as executor:
+            results = list(executor.map(self.verificar_tabla, tables))
+        elapsed = time.perf_counter() - started
+        num_errors = 0
+        width = max([len(name) for name, _err, _seconds in results] + [5])
+        with Tabula(tabla=width, estado=6, segundos=-8, mensaje=60) as tab:
+            for name, err, seconds in results:
+                if err:
+                    num_errors += 1
+                tab(name, clitools.ERROR if err else clitools.OK, f'{seconds:.2f}', err)
+        self.print(
+            f'{len(results)} tablas verificadas en {elapsed:.2f} segundos,'
+            f' {num_errors} con errores'
+            )
+        return 1 if num_errors else 0
+
     def cmd_graph(self, options):
         models = options.model
         if len(models) == 1 and models[0] == 'all':
@@ -275,4 +1029,4 @@ class Handler:
 
 if __name__ == "__main__":
     handler = Handler()
-    handler.run()
+    sys.exit(handler.run())
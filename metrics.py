@@ -0,0 +1,204 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Métricas de rendimiento de una migración, por modelo y por fase.
+
+Las fases son:
+
+- `since`: buscar las claves a migrar (`_since`).
+- `source`: cargar instancias desde origen.
+- `exists`: comprobar si existen en destino (camino fila a fila).
+- `target`: leer instancias de destino para compararlas.
+- `write`: insertar, actualizar o hacer `MERGE` en destino.
+
+De cada fase se guarda un histograma de tiempos, y de cada modelo los
+contadores de claves, filas insertadas, actualizadas y sin cambios,
+claves que no se han podido migrar, viajes a la base de datos y filas
+leídas. Se pueden volcar como JSON o como fichero de texto para el
+*textfile collector* de Prometheus.
+"""
+
+import contextlib
+import dataclasses
+import json
+import os
+import threading
+import time
+
+from clitools import Tabula
+import dba
+
+PHASES = ('since', 'source', 'exists', 'target', 'write')
+
+COUNTERS = (
+    'keys', 'inserted', 'updated', 'unchanged', 'merged', 'failed', 'round_trips',
+    'rows_fetched',
+    )
+
+# Límites superiores, en segundos, de los intervalos de los histogramas
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+@dataclasses.dataclass
+class Histogram:
+    buckets: list = dataclasses.field(default_factory=lambda: [0] * len(BUCKETS))
+    count: int = 0
+    total: float = 0.0
+
+    def observe(self, seconds):
+        self.count += 1
+        self.total += seconds
+        for index, limit in enumerate(BUCKETS):
+            if seconds <= limit:
+                self.buckets[index] += 1
+                break
+
+
+@dataclasses.dataclass
+class ModelMetrics:
+    counters: dict = dataclasses.field(default_factory=lambda: dict.fromkeys(COUNTERS, 0))
+    phases: dict = dataclasses.field(
+        default_factory=lambda: {phase: Histogram() for phase in PHASES},
+        )
+
+    @property
+    def seconds(self) -> float:
+        return sum(histogram.total for histogram in self.phases.values())
+
+
+class Metrics:
+    """Métricas de todos los modelos. Se puede compartir entre trabajadores.
+    """
+
+    def __init__(self):
+        self.models = {}
+        self.lock = threading.Lock()
+
+    def _get(self, model) -> ModelMetrics:
+        name = model if isinstance(model, str) else model.__name__
+        if name not in self.models:
+            self.models[name] = ModelMetrics()
+        return self.models[name]
+
+    def count(self, model, name, num=1):
+        with self.lock:
+            self._get(model).counters[name] += num
+
+    @contextlib.contextmanager
+    def phase(self, model, phase):
+        """Medir el tiempo, los viajes y las filas leídas de un bloque
+        de código, y asignarlos a la fase `phase` del modelo.
+        """
+        round_trips = dba.round_trips.thread_value
+        rows_fetched = dba.rows_fetched.thread_value
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start
+            with self.lock:
+                metrics = self._get(model)
+                metrics.phases[phase].observe(seconds)
+                counters = metrics.counters
+                counters['round_trips'] += dba.round_trips.thread_value - round_trips
+                counters['rows_fetched'] += dba.rows_fetched.thread_value - rows_fetched
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                name: {
+                    **metrics.counters,
+                    'seconds': {
+                        phase: round(histogram.total, 6)
+                        for phase, histogram in metrics.phases.items()
+                        },
+                    'calls': {
+                        phase: histogram.count
+                        for phase, histogram in metrics.phases.items()
+                        },
+                    }
+                for name, metrics in sorted(self.models.items())
+                }
+
+    def print_table(self, **kwargs):
+        width = max([len(name) for name in self.models] + [6])
+        columns = {
+            'modelo': width,
+            'claves': -7,
+            'insert': -7,
+            'update': -7,
+            'igual': -7,
+            'merge': -7,
+            'fallos': -7,
+            'viajes': -7,
+            'filas': -8,
+            **{phase: -7 for phase in PHASES},
+            'total': -8,
+            }
+        with self.lock, Tabula(**columns, **kwargs) as tab:
+            for name, metrics in sorted(self.models.items()):
+                counters = metrics.counters
+                tab(
+                    name,
+                    counters['keys'],
+                    counters['inserted'],
+                    counters['updated'],
+                    counters['unchanged'],
+                    counters['merged'],
+                    counters['failed'],
+                    counters['round_trips'],
+                    counters['rows_fetched'],
+                    *[f'{metrics.phases[phase].total:.2f}' for phase in PHASES],
+                    f'{metrics.seconds:.2f}',
+                    )
+
+    def as_prometheus(self) -> str:
+        """Métricas en el formato de texto de Prometheus.
+        """
+        lines = [
+            '# HELP madrox_rows_total Claves y filas procesadas por modelo.',
+            '# TYPE madrox_rows_total counter',
+            ]
+        with self.lock:
+            models = sorted(self.models.items())
+            for name, metrics in models:
+                for counter, value in metrics.counters.items():
+                    labels = f'model="{name}",kind="{counter}"'
+                    lines.append(f'madrox_rows_total{{{labels}}} {value}')
+            lines.extend([
+                '# HELP madrox_phase_seconds Tiempo dedicado a cada fase, por modelo.',
+                '# TYPE madrox_phase_seconds histogram',
+                ])
+            for name, metrics in models:
+                for phase, histogram in metrics.phases.items():
+                    labels = f'model="{name}",phase="{phase}"'
+                    accumulated = 0
+                    for limit, num in zip(BUCKETS, histogram.buckets):
+                        accumulated += num
+                        lines.append(
+                            f'madrox_phase_seconds_bucket{{{labels},le="{limit}"}}'
+                            f' {accumulated}'
+                            )
+                    lines.extend([
+                        f'madrox_phase_seconds_bucket{{{labels},le="+Inf"}}'
+                        f' {histogram.count}',
+                        f'madrox_phase_seconds_sum{{{labels}}} {histogram.total:.6f}',
+                        f'madrox_phase_seconds_count{{{labels}}} {histogram.count}',
+                        ])
+        return '\n'.join(lines) + '\n'
+
+    def save_json(self, filename):
+        write_atomic(filename, json.dumps(self.as_dict(), indent=2))
+
+    def save_prometheus(self, filename):
+        write_atomic(filename, self.as_prometheus())
+
+
+def write_atomic(filename, text):
+    """Escribir un fichero de una vez, para que quien lo lea (por ejemplo,
+    el node exporter) nunca vea un fichero a medio escribir.
+    """
+    temporary = f'{filename}.tmp'
+    with open(temporary, 'w') as f:
+        f.write(text)
+    os.replace(temporary, filename)
@@ -5,8 +5,9 @@ from datetime import datetime as DateTime
 from datetime import timedelta as TimeDelta
 import dataclasses
 import logging
+import operator
 
-from settings import DEFAULT_SINCE_DAYS
+from settings import DEFAULT_SINCE_DAYS, DEFAULT_INSERT_BATCH_SIZE
 
 import dba
 import dml
@@ -21,26 +22,79 @@ class MetaModel:
     natural_keys: tuple = dataclasses.field(default_factory=tuple)
     depends_on: dict = dataclasses.field(default_factory=dict)
     master_of: set = dataclasses.field(default_factory=set)
+    # Sólo columnas de última modificación, nunca fechas de eventos: una
+    # fila dada de alta tarde con una fecha antigua quedaría detrás del
+    # checkpoint. Sin marca de agua, --incremental usa --num-days
+    watermark: tuple = dataclasses.field(default_factory=tuple)
+    lob_fields: tuple = dataclasses.field(default_factory=tuple)
+    arraysize: int | None = None
+    prefetchrows: int | None = None
 
 
 class Model:
+    """Base de los modelos. Los del catálogo se declaran como
+    `dataclasses.dataclass(slots=True)`: sin `__dict__` por instancia, una
+    fila cargada ocupa bastante menos, lo que se nota con las colecciones
+    grandes de subordinados (`Parrafo`, `DS_Sumario`...).
+    """
+
+    __slots__ = ()
 
     Meta = None
 
+    @classmethod
+    def _compile(cls):
+        """Precalcular, una sola vez por modelo, la tupla de nombres de
+        campo y los cargadores de filas. Lo hace `Catalog.register`; los
+        modelos que no se registran se compilan la primera vez que se usan.
+        """
+        cls._fields = tuple(_.name for _ in dataclasses.fields(cls))
+        cls._getter = operator.attrgetter(*cls._fields)
+        # Columnas en el mismo orden que los campos: argumentos posicionales
+        cls._loaders = {cls._fields: lambda row: cls(*row)}
+        return cls
+
+    @classmethod
+    def _compiled(cls):
+        if '_fields' not in cls.__dict__:
+            cls._compile()
+        return cls
+
     @classmethod
     def _field_names(cls):
-        return [_.name for _ in dataclasses.fields(cls)]
+        return list(cls._compiled()._fields)
 
     @classmethod
     def _to_dict(cls, obj, exclude=None):
         assert isinstance(obj, Model)
-        exclude = exclude or set([])
+        cls._compiled()
+        values = cls._getter(obj)
+        if len(cls._fields) == 1:
+            values = (values, )
+        result = dict(zip(cls._fields, values))
+        for name in exclude or ():
+            result.pop(name, None)
+        return result
+
+    @classmethod
+    def _changes(cls, source, target) -> dict:
+        """Campos que difieren entre dos instancias, con el nuevo valor.
+
+        No se tiene en cuenta la clave primaria.
+        """
+        exclude = set([cls.Meta.primary_key])
+        new_values = cls._to_dict(source, exclude=exclude)
+        old_values = cls._to_dict(target, exclude=exclude)
         return {
-            name: getattr(obj, name)
-            for name in cls._field_names()
-            if name not in exclude
+            name: new_values[name]
+            for name in old_values
+            if new_values[name] != old_values[name]
             }
 
+    @classmethod
+    def _natural_key(cls, obj) -> tuple:
+        return tuple(getattr(obj, name) for name in sorted(cls.Meta.natural_keys))
+
     @classmethod
     def _from_dict(cls, dict_data):
         _fields = set(cls._field_names())
@@ -50,13 +104,52 @@ class Model:
                 dict_data.pop(name)
         return cls(**dict_data)
 
+    @classmethod
+    def _row_loader(cls, columns: tuple):
+        """Función que construye una instancia a partir de una fila (tupla)
+        de un cursor con las columnas `columns`.
+
+        Se calcula una vez por cada orden de columnas: las posiciones de
+        los campos en la fila se resuelven al compilar, no en cada fila.
+        Si falta algún campo se recurre a `_from_dict`.
+        """
+        loaders = cls._compiled()._loaders
+        loader = loaders.get(columns)
+        if loader is None:
+            positions = {name: index for index, name in enumerate(columns)}
+            if all(name in positions for name in cls._fields):
+                getter = operator.itemgetter(*[positions[name] for name in cls._fields])
+                if len(cls._fields) == 1:
+                    def loader(row):
+                        return cls(getter(row))
+                else:
+                    def loader(row):
+                        return cls(*getter(row))
+            else:
+                def loader(row):
+                    return cls._from_dict(dict(zip(columns, row)))
+            loaders[columns] = loader
+        return loader
+
+    @classmethod
+    def _iter_rows(cls, db, sql, *args, cast=None, rowfactory=None):
+        """`dba.iter_rows` con los parámetros de lectura del modelo.
+        """
+        return dba.iter_rows(
+            db, sql, *args,
+            cast=cast,
+            rowfactory=rowfactory,
+            arraysize=cls.Meta.arraysize,
+            prefetchrows=cls.Meta.prefetchrows,
+            )
+
     @classmethod
     def _load_instance(cls, db, pk):
         table_name = cls.Meta.table_name
         names = dba.as_list(cls._field_names())
         query = f'{cls.Meta.primary_key} = :1'
         sql = dml.Select(names).From(table_name).Where(query)
-        return dba.get_row(db, sql, pk, cast=cls._from_dict)
+        return dba.get_row(db, sql, pk, rowfactory=cls._row_loader)
 
     @classmethod
     def _load_instances(cls, db, field_name, value):
@@ -64,23 +157,105 @@ class Model:
         names = dba.as_list(cls._field_names())
         query = f'{field_name} = :1'
         sql = dml.Select(names).From(table_name).Where(query)
-        return dba.get_rows(db, sql, value, cast=cls._from_dict)
+        return cls._iter_rows(db, sql, value, rowfactory=cls._row_loader)
+
+    @classmethod
+    def _load_instances_in(cls, db, field_name, values):
+        """Cargar las instancias cuyo campo `field_name` esté en `values`.
+
+        Las consultas se dividen en bloques de `dba.MAX_IN_LIST`
+        valores, para respetar el límite de Oracle.
+        """
+        table_name = cls.Meta.table_name
+        names = dba.as_list(cls._field_names())
+        result = []
+        for chunk in dba.chunks(values, dba.MAX_IN_LIST):
+            query = dba.in_clause(field_name, len(chunk))
+            sql = dml.Select(names).From(table_name).Where(query)
+            result.extend(cls._iter_rows(db, sql, *chunk, rowfactory=cls._row_loader))
+        return result
+
+    @classmethod
+    def _load_many(cls, db, primary_keys):
+        return cls._load_instances_in(db, cls.Meta.primary_key, primary_keys)
 
     @classmethod
     def _load_from_natural_keys(cls, dbc, obj):
         if cls.Meta.natural_keys:
-            sql = dml.Select('*').From(cls.Meta.table_name)
+            sql = dml.Select('*', binds=True).From(cls.Meta.table_name)
             conditions = {
                 field_name: getattr(obj, field_name)
                 for field_name in cls.Meta.natural_keys
                 }
             sql = sql.Filter(**conditions)
-            return dba.get_row(dbc, sql, cast=cls._from_dict)
+            return dba.get_row(dbc, sql, rowfactory=cls._row_loader)
         return None
 
+    @classmethod
+    def _load_from_natural_keys_in(cls, dbc, objs):
+        """Cargar las instancias que coincidan en las claves naturales
+        con alguno de los objetos indicados.
+
+        Usa condiciones del tipo `(k1, k2) IN ((:1, :2), (:3, :4), ...)`.
+        """
+        if not cls.Meta.natural_keys:
+            return []
+        table_name = cls.Meta.table_name
+        names = dba.as_list(cls._field_names())
+        key_names = sorted(cls.Meta.natural_keys)
+        width = len(key_names)
+        result = []
+        for chunk in dba.chunks(objs, dba.MAX_IN_LIST):
+            tuples = []
+            parameters = []
+            for index, obj in enumerate(chunk):
+                start = index * width + 1
+                binds = ', '.join(f':{i}' for i in range(start, start + width))
+                tuples.append(f'({binds})')
+                parameters.extend(cls._natural_key(obj))
+            query = f'({dba.as_list(key_names)}) IN ({dba.as_list(tuples)})'
+            sql = dml.Select(names).From(table_name).Where(query)
+            result.extend(
+                cls._iter_rows(dbc, sql, *parameters, rowfactory=cls._row_loader),
+                )
+        return result
+
+    @classmethod
+    def _hash_expression(cls) -> str:
+        """Expresión SQL (Oracle) con un hash MD5 de todos los campos de la fila.
+
+        Cada campo se resume por separado, para no superar el límite de
+        4000 caracteres de las cadenas al concatenarlos. Los campos LOB
+        (`Meta.lob_fields`) no admiten `STANDARD_HASH` y se resumen con
+        `DBMS_CRYPTO.HASH`.
+        """
+        parts = []
+        for name in cls._field_names():
+            if name in cls.Meta.lob_fields:
+                expr = f'RAWTOHEX(DBMS_CRYPTO.HASH({name}, 2))'
+            else:
+                expr = f"RAWTOHEX(STANDARD_HASH({name}, 'MD5'))"
+            parts.append(f"NVL({expr}, '-')")
+        return f"STANDARD_HASH({' || '.join(parts)}, 'MD5')"
+
+    @classmethod
+    def _load_hashes(cls, db, primary_keys) -> dict:
+        """Diccionario `clave primaria -> hash de la fila`, calculado en
+        el servidor, para las claves indicadas.
+        """
+        pk_name = cls.Meta.primary_key
+        fields = [f'{pk_name} as pk', f'{cls._hash_expression()} as hash']
+        result = {}
+        for chunk in dba.chunks(primary_keys, dba.MAX_IN_LIST):
+            query = dba.in_clause(pk_name, len(chunk))
+            sql = dml.Select(fields).From(cls.Meta.table_name).Where(query)
+            for row in cls._iter_rows(db, sql, *chunk):
+                result[row['pk']] = row['hash']
+        return result
+
     def not_exists(self, dbc) -> bool:
         table_name = self.Meta.table_name
-        sql = dml.Select('Count(*)').From(table_name)
+        sql = dml.Select('Count(*)', binds=True).From(table_name)
         if self.Meta.natural_keys:
             conditions = {
                 field_name: getattr(self, field_name)
@@ -95,32 +270,106 @@ class Model:
     @classmethod
     def _insert(cls, dbc, data: dict):
         table_name = cls.Meta.table_name
-        sql = dml.Insert(table_name)
+        sql = dml.Insert(table_name, binds=True)
         names = cls._field_names()
         values = [data[name] for name in names]
         for name, value in zip(names, values):
             sql = sql.Set(name, value)
         return dba.execute(dbc, sql)
 
+    @classmethod
+    def _insert_many(cls, dbc, rows: list[dict], batch_size=DEFAULT_INSERT_BATCH_SIZE):
+        """Insertar varias filas con una única sentencia parametrizada.
+
+        Devuelve un `dba.BulkResult` con el número de filas insertadas
+        y los errores de cada bloque.
+        """
+        table_name = cls.Meta.table_name
+        sql = dml.Insert(table_name)
+        names = cls._field_names()
+        for name in names:
+            sql = sql.SetLiteral(name, f':{name}')
+        data = [{name: row[name] for name in names} for row in rows]
+        return dba.execute_many(
+            dbc, sql, data,
+            batch_size=batch_size,
+            lobs=cls.Meta.lob_fields,
+            )
+
+    @classmethod
+    def _upsert_many(cls, dbc, rows: list[dict], batch_size=DEFAULT_INSERT_BATCH_SIZE):
+        """Insertar o actualizar varias filas en un único viaje por bloque.
+
+        En Oracle usa un `MERGE` con `executemany`; en otras bases de
+        datos, el `INSERT ... ON CONFLICT` equivalente. Las filas se
+        buscan por las claves naturales, si el modelo las tiene, o por
+        la clave primaria, que nunca se actualiza.
+        """
+        names = cls._field_names()
+        sql = dml.Merge(
+            cls.Meta.table_name,
+            names,
+            sorted(cls.Meta.natural_keys) or [cls.Meta.primary_key],
+            fijos=[cls.Meta.primary_key],
+            lobs=cls.Meta.lob_fields,
+            )
+        kind = dba.dialect(dbc)
+        if kind != 'oracle':
+            sql = sql.upsert(kind)
+        data = [{name: row[name] for name in names} for row in rows]
+        return dba.execute_many(
+            dbc, sql, data,
+            batch_size=batch_size,
+            lobs=cls.Meta.lob_fields,
+            )
+
     @classmethod
     def _update(cls, dbc, pk, new_values):
         table_name = cls.Meta.table_name
-        sql = dml.Update(table_name)
+        sql = dml.Update(table_name, binds=True)
         for name in new_values:
             value = new_values[name]
             sql = sql.Set(name, value)
-        sql = sql.Where(f'{cls.Meta.primary_key} = {pk!r}')
+        sql = sql.Filter(**{cls.Meta.primary_key: pk})
         return dba.execute(dbc, sql)
 
     @classmethod
-    def _keys_since(cls, source, query, num_days=DEFAULT_SINCE_DAYS, cast=None):
-        fecha = Date.today() - TimeDelta(days=num_days)
+    def _delete_many(cls, dbc, primary_keys):
+        """Borrar las filas con las claves primarias indicadas, en bloques
+        de como mucho `dba.MAX_IN_LIST` claves.
+        """
+        for chunk in dba.chunks(primary_keys, dba.MAX_IN_LIST):
+            query = dba.in_clause(cls.Meta.primary_key, len(chunk))
+            sql = dml.Delete(cls.Meta.table_name).Where(query)
+            dba.execute(dbc, sql, *chunk)
+
+    @classmethod
+    def _keys_since(cls, source, query, num_days=DEFAULT_SINCE_DAYS, cast=None, since=None):
+        """Claves de los registros que cumplen `query` desde una fecha.
+
+        La fecha es `since` si se indica (por ejemplo, la marca de agua del
+        último checkpoint) o, si no, hace `num_days` días.
+        """
+        fecha = since if since is not None else Date.today() - TimeDelta(days=num_days)
         if cast:
             fecha = cast(fecha)
         table_name = cls.Meta.table_name
         pk_name = cls.Meta.primary_key
         sql = dml.Select(f'{pk_name} as pk').From(table_name).Where(query)
-        return dba.get_rows(source, sql, fecha, cast=lambda row: row['pk'])
+        return cls._iter_rows(source, sql, fecha, cast=lambda row: row['pk'])
+
+    @classmethod
+    def _watermark(cls, instances):
+        """Valor máximo, como `DateTime`, de los campos de `Meta.watermark`
+        en las instancias indicadas, o `None` si no hay ninguno.
+        """
+        values = [
+            dba.as_datetime(getattr(instance, name))
+            for instance in instances
+            for name in cls.Meta.watermark
+            ]
+        values = [value for value in values if value is not None]
+        return max(values) if values else None
 
     @classmethod
     def _is_migrable(cls):
@@ -135,6 +384,7 @@ class Catalog:
     def register(self, model):
         name = model.__name__.lower()
         self.kernel[name] = model
+        model._compile()
         for field_name, _model in model.Meta.depends_on.items():
             assert issubclass(_model, Model)
             assert isinstance(field_name, str)
@@ -144,6 +394,7 @@ class Catalog:
                 )
         for _model in model.Meta.master_of:
             assert issubclass(_model, Model)
+            _model._compile()
         return model
 
     def __getitem__(self, key):
@@ -160,7 +411,7 @@ catalog = Catalog()
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Legislatura(Model):
 
     Meta = MetaModel(
@@ -176,21 +427,23 @@ class Legislatura(Model):
     anio: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_inicio >= :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Usuario(Model):
 
     Meta = MetaModel(
         table_name="Comun.Usuario",
         primary_key='id_usuario',
+        watermark=('f_mod', 'f_alta'),
         )
 
     id_usuario: int
@@ -224,16 +477,17 @@ class Usuario(Model):
     pwd_inicial: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_mod > :1 OR f_alta > :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Proyecto(Model):
 
     Meta = MetaModel(
@@ -249,22 +503,25 @@ class Proyecto(Model):
     status: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_creacion > :1 OR f_cierre > :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Nota(Model):
 
     Meta = MetaModel(
         table_name="Tareas.Nota",
         primary_key='id_nota',
+        watermark=('f_creacion', 'f_modificacion'),
         natural_keys={'id_tarea', 'numero'},
+        lob_fields=('texto',),
         )
 
     id_nota: int
@@ -277,21 +534,23 @@ class Nota(Model):
     f_creacion: Date
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_creacion > :1 OR f_modificacion > :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Tarea(Model):
 
     Meta = MetaModel(
         table_name="Tareas.Tarea",
         primary_key='id_tarea',
+        watermark=('f_ultima_act',),
         depends_on={
             'id_proyecto': Proyecto,
             'id_usr_solicitante': Usuario,
@@ -317,21 +576,23 @@ class Tarea(Model):
     id_proyecto: int
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_ultima_act >= :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Isla(Model):
 
     Meta = MetaModel(
         table_name="Agora.Isla",
         primary_key='id_isla',
+        watermark=('ts_mod',),
         )
 
     id_isla: int
@@ -340,22 +601,24 @@ class Isla(Model):
     migrable: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='ts_mod >= :1',
             num_days=num_days,
+            since=since,
             cast=dba.as_ts_mod,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Sala(Model):
 
     Meta = MetaModel(
         table_name="Agora.Sala",
         primary_key='id_sala',
+        watermark=('updated_at',),
         )
 
     id_sala: int
@@ -367,26 +630,23 @@ class Sala(Model):
     updated_at: DateTime
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
-        fecha = DateTime.now() - TimeDelta(days=num_days)
-        sql = (
-            f'Select {cls.Meta.primary_key} as pk'
-            f'  from {cls.Meta.table_name}'
-            '  WHERE updated_at > :1'
-            )
-        return dba.get_rows(
-            dbc, sql, fecha,
-            cast=lambda d: cls.Meta.primary_key.cast(d['pk']),
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
+        return cls._keys_since(
+            source=dbc,
+            query='updated_at > :1',
+            num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Organo(Model):
 
     Meta = MetaModel(
         table_name="Agora.organo",
         primary_key='id_organo',
+        watermark=('ts_mod',),
         depends_on={
             'id_isla': Isla,
             'legislatura': Legislatura,
@@ -419,17 +679,18 @@ class Organo(Model):
     nombre_completo: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='ts_mod >= :1',
             num_days=num_days,
+            since=since,
             cast=dba.as_ts_mod,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class SesionDatos(Model):
 
     Meta = MetaModel(
@@ -445,22 +706,24 @@ class SesionDatos(Model):
     confirmada: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_convocada >= :1 OR f_desconvocada >= :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Asunto(Model):
 
     Meta = MetaModel(
         table_name="AGORA.Asunto",
         primary_key='id_asunto',
         depends_on={'legislatura': Legislatura},
+        lob_fields=('extracto',),
         )
 
     id_asunto: str
@@ -484,7 +747,7 @@ class Asunto(Model):
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Sesion(Model):
 
     Meta = MetaModel(
@@ -511,16 +774,17 @@ class Sesion(Model):
     migrable: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='fecha >= :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Jornada(Model):
 
     Meta = MetaModel(
@@ -552,16 +816,17 @@ class Jornada(Model):
     emision_para_prensa: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='fecha > :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Acceso(Model):
 
     Meta = MetaModel(
@@ -579,16 +844,17 @@ class Acceso(Model):
     alta: DateTime
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='alta > :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Aplicacion(Model):
 
     Meta = MetaModel(
@@ -606,16 +872,17 @@ class Aplicacion(Model):
     codigo: str
 
     @classmethod
-    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS):
+    def _since(cls, dbc, num_days=DEFAULT_SINCE_DAYS, since=None):
         return cls._keys_since(
             source=dbc,
             query='alta > :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Parrafo(Model):
 
     Meta = MetaModel(
@@ -630,13 +897,14 @@ class Parrafo(Model):
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Noticia(Model):
 
     Meta = MetaModel(
         table_name="Noticias.Noticia",
         primary_key='id_noticia',
         master_of={Parrafo},
+        lob_fields=('texto',),
         )
 
     id_noticia: int
@@ -653,11 +921,12 @@ class Noticia(Model):
     streaming_url: str
 
     @classmethod
-    def _since(cls, dbc, num_days):
+    def _since(cls, dbc, num_days, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_alta >= :1',
             num_days=num_days,
+            since=since,
             )
 
 
@@ -665,7 +934,7 @@ class Noticia(Model):
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class BOP(Model):
 
     Meta = MetaModel(
@@ -687,17 +956,18 @@ class BOP(Model):
     ts_mod: str
 
     @classmethod
-    def _since(cls, dbc, num_days):
+    def _since(cls, dbc, num_days, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_publicacion >= :1',
             num_days=num_days,
+            since=since,
             )
 
 
 # Diarios de sesiones del PArlamento
 
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class DS_Sumario(Model):
 
     Meta = MetaModel(
@@ -714,7 +984,7 @@ class DS_Sumario(Model):
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class DS(Model):
 
     Meta = MetaModel(
@@ -740,16 +1010,17 @@ class DS(Model):
     ts_mod: str
 
     @classmethod
-    def _since(cls, dbc, num_days):
+    def _since(cls, dbc, num_days, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_publicacion >= :1',
             num_days=num_days,
+            since=since,
             )
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Tramite(Model):
 
     Meta = MetaModel(
@@ -780,17 +1051,18 @@ class Tramite(Model):
     migrable: str
 
     @classmethod
-    def _since(cls, dbc, num_days):
+    def _since(cls, dbc, num_days, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_tramite >= :1',
             num_days=num_days,
+            since=since,
             )
 
 
 
 @catalog.register
-@dataclasses.dataclass
+@dataclasses.dataclass(slots=True)
 class Iniciativa(Model):
 
     Meta = MetaModel(
@@ -817,9 +1089,10 @@ class Iniciativa(Model):
     migrable: str
 
     @classmethod
-    def _since(cls, dbc, num_days):
+    def _since(cls, dbc, num_days, since=None):
         return cls._keys_since(
             source=dbc,
             query='f_creacion >= :1',
             num_days=num_days,
+            since=since,
             )
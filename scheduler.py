@@ -0,0 +1,120 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Planificador de migraciones en paralelo.
+
+Construye un grafo dirigido a partir de `MetaModel.depends_on` y
+`MetaModel.master_of`, y ejecuta la migración de cada modelo en cuanto
+han terminado todos los modelos de los que depende. Los modelos
+independientes entre sí se migran a la vez, cada uno en un trabajador
+con sus propias conexiones.
+"""
+
+import concurrent.futures
+import queue
+
+
+def edges(model) -> set:
+    """Modelos que tienen que migrarse antes que `model`.
+    """
+    return set(model.Meta.depends_on.values())
+
+
+def build_graph(models) -> dict:
+    """Grafo `modelo -> {modelos previos}` para todos los modelos alcanzables.
+
+    Un modelo depende de los modelos indicados en su `depends_on`, y
+    cada modelo subordinado (`master_of`) depende de su maestro.
+    """
+    graph = {}
+    stack = list(models)
+    while stack:
+        model = stack.pop()
+        if model in graph:
+            continue
+        graph.setdefault(model, set()).update(edges(model))
+        for submodel in model.Meta.master_of:
+            graph.setdefault(submodel, set()).add(model)
+            stack.append(submodel)
+        stack.extend(edges(model))
+    return graph
+
+
+def prerequisites(models) -> dict:
+    """Para cada modelo de `models`, los otros modelos de la lista de los
+    que depende, directa o indirectamente.
+    """
+    graph = build_graph(models)
+    selected = set(models)
+    result = {}
+    for model in models:
+        seen = set()
+        stack = list(graph[model])
+        while stack:
+            previous = stack.pop()
+            if previous in seen:
+                continue
+            seen.add(previous)
+            stack.extend(graph.get(previous, ()))
+        result[model] = (seen & selected) - {model}
+    return result
+
+
+def topological_order(models) -> list:
+    """Ordenar los modelos de forma que cada uno vaya después de
+    aquellos de los que depende. A igualdad, se respeta el orden original.
+    """
+    pending = prerequisites(models)
+    result = []
+    while pending:
+        ready = [m for m in models if m in pending and not (pending[m] - set(result))]
+        if not ready:
+            names = ', '.join(sorted(m.__name__ for m in pending))
+            raise ValueError(f'Hay dependencias circulares entre {names}')
+        for model in ready:
+            result.append(model)
+            del pending[model]
+    return result
+
+
+def run(models, task, make_worker, num_workers=1):
+    """Ejecutar `task(worker, model)` para cada modelo, en paralelo.
+
+    Se crean `num_workers` trabajadores con `make_worker()`; cada uno
+    sólo atiende una tarea a la vez. Un modelo no empieza hasta que
+    hayan terminado todos los modelos de la lista de los que depende.
+    Devuelve la lista de trabajadores, para poder consultar sus
+    estadísticas.
+    """
+    order = topological_order(models)
+    requires = prerequisites(order)
+    workers = queue.Queue()
+    all_workers = [make_worker() for _ in range(num_workers)]
+    for worker in all_workers:
+        workers.put(worker)
+
+    def _run_one(model):
+        worker = workers.get()
+        try:
+            return task(worker, model)
+        finally:
+            workers.put(worker)
+
+    pending = list(order)
+    done = set()
+    running = {}
+    with concurrent.futures.ThreadPoolExecutor(max_workers=num_workers) as executor:
+        while pending or running:
+            ready = [m for m in pending if requires[m] <= done]
+            for model in ready:
+                pending.remove(model)
+                running[executor.submit(_run_one, model)] = model
+            finished, _ = concurrent.futures.wait(
+                running,
+                return_when=concurrent.futures.FIRST_COMPLETED,
+                )
+            for future in finished:
+                model = running.pop(future)
+                future.result()
+                done.add(model)
+    return all_workers
@@ -5,3 +5,31 @@ from prettyconf import config
 DEBUG = config('DEBUG', cast=config.boolean, default=False)
 
 DEFAULT_SINCE_DAYS = config('MADROX_SINCE_DAYS', cast=int, default=7)
+
+DEFAULT_BATCH_SIZE = config('MADROX_BATCH_SIZE', cast=int, default=500)
+
+DEFAULT_INSERT_BATCH_SIZE = config('MADROX_INSERT_BATCH_SIZE', cast=int, default=1000)
+
+DEFAULT_WORKERS = config('MADROX_WORKERS', cast=int, default=1)
+
+HASH_CHECK = config('MADROX_HASH_CHECK', cast=config.boolean, default=False)
+
+STATE_DB = config('MADROX_STATE_DB', default='madrox.db')
+
+CHECKPOINT_OVERLAP_MINUTES = config(
+    'MADROX_CHECKPOINT_OVERLAP_MINUTES',
+    cast=int,
+    default=60,
+    )
+
+JOURNAL_FLUSH_EVERY = config('MADROX_JOURNAL_FLUSH_EVERY', cast=int, default=1000)
+
+COMMIT_ROWS = config('MADROX_COMMIT_ROWS', cast=int, default=5000)
+
+COMMIT_SECONDS = config('MADROX_COMMIT_SECONDS', cast=float, default=30)
+
+UPSERT = config('MADROX_UPSERT', cast=config.boolean, default=False)
+
+TRACE_SQL = config('MADROX_TRACE_SQL', cast=int, default=0)
+
+PLAN_SECONDS_PER_WRITE = config('MADROX_PLAN_SECONDS_PER_WRITE', cast=float, default=0.002)
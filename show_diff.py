@@ -3,33 +3,77 @@
 
 import sys
 import argparse
+import time
 from typing import Final
 
 from rich.console import Console
 import models
 import dml
 import dba
+from madrox import Handler
+from results import Failure
+from settings import DEFAULT_BATCH_SIZE
 
 OK: Final[str] = '[green]✓[/green]'
 ERROR: Final[str] = '[red]✖[/red]'
 
+MISSING: Final[str] = 'missing'
+EXTRA: Final[str] = 'extra'
+
 
 def red(msg):
     """Devuelve el texto en color rojo (Para terminal/consola ANSI)."""
     return f"[red]{msg}[/red]"
 
 
-def get_primary_keys(db_source, db_target, table_name):
-    _model = getattr(models, table_name)
-    primary_key = _model._primary_key
-    table_name = _model._table_name
-    sql = dml.Select(primary_key).From(table_name)
-    keys_in_source = set([row[primary_key] for row in dba.get_rows(db_source, sql)])
-    keys_in_target = set([row[primary_key] for row in dba.get_rows(db_target, sql)])
-    return keys_in_source, keys_in_target
+def iter_keys(dbc, model):
+    """Generador con las claves primarias de un modelo, en orden ascendente.
+
+    En Oracle, las claves de texto se ordenan con `NLSSORT` binario, para
+    que el orden coincida con el de Python.
+    """
+    primary_key = model.Meta.primary_key
+    order_by = primary_key
+    if model.__annotations__.get(primary_key) is str and dba.es_oracle(dbc):
+        order_by = f"NLSSORT({primary_key}, 'NLS_SORT=BINARY')"
+    sql = dml.Select(f'{primary_key} as pk').From(model.Meta.table_name).OrderBy(order_by)
+    return model._iter_rows(dbc, sql, cast=lambda row: row['pk'])
+
+
+def _ordered(keys):
+    previous = None
+    for key in keys:
+        if previous is not None and key <= previous:
+            raise ValueError(
+                f'Las claves no vienen ordenadas: {key!r} después de {previous!r}'
+                )
+        previous = key
+        yield key
+
+
+def merge_diff(keys_in_source, keys_in_target):
+    """Comparar dos secuencias ordenadas de claves, en memoria constante.
+
+    Genera tuplas `(clave, MISSING)` para las claves que faltan en destino
+    y `(clave, EXTRA)` para las que sobran, según se van encontrando.
+    """
+    source = _ordered(keys_in_source)
+    target = _ordered(keys_in_target)
+    s = next(source, None)
+    t = next(target, None)
+    while s is not None or t is not None:
+        if t is None or (s is not None and s < t):
+            yield s, MISSING
+            s = next(source, None)
+        elif s is None or t < s:
+            yield t, EXTRA
+            t = next(target, None)
+        else:
+            s = next(source, None)
+            t = next(target, None)
 
 
-def get_options():
+def get_options(args=None):
     parser = argparse.ArgumentParser(
         prog='show_diff',
         description='Muestra claves primarias diferentes entre destino y objetivo',
@@ -37,37 +81,136 @@ def get_options():
         )
     parser.add_argument('table_name', nargs='+')
     parser.add_argument('--verbose', action='store_true')
-    return parser.parse_args()
+    parser.add_argument(
+        '--repair',
+        action='store_true',
+        help='Migrar las claves que faltan y borrar las que sobran en destino',
+        )
+    parser.add_argument(
+        '--dry-run',
+        action='store_true',
+        help='Con --repair, sólo contar lo que se haría',
+        )
+    parser.add_argument('--batch-size', type=int, default=DEFAULT_BATCH_SIZE)
+    options = parser.parse_args(args)
+    if options.dry_run and not options.repair:
+        parser.error('--dry-run sólo se puede usar con --repair')
+    return options
+
+
+class Repair:
+    """Reparar las diferencias de claves de un modelo, por lotes.
+
+    Las claves que faltan en destino se migran con `Handler.migrar_lote`
+    (con sus dependencias y modelos subordinados), y las que sobran se
+    borran con `DELETE ... WHERE pk IN (...)`. Con `dry_run` sólo se
+    cuentan.
+    """
+
+    def __init__(self, handler, model, batch_size, dry_run=False):
+        self.handler = handler
+        self.model = model
+        self.batch_size = batch_size
+        self.dry_run = dry_run
+        self.pending = {MISSING: [], EXTRA: []}
+        self.done = {MISSING: 0, EXTRA: 0}
+        self.errors = 0
+
+    def add(self, pk, kind):
+        self.pending[kind].append(pk)
+        if len(self.pending[kind]) >= self.batch_size:
+            self.flush(kind)
+
+    def flush(self, kind):
+        keys, self.pending[kind] = self.pending[kind], []
+        if not keys:
+            return
+        if not self.dry_run:
+            try:
+                if kind == MISSING:
+                    self.handler.migrar_lote(self.model, keys)
+                else:
+                    self.model._delete_many(self.handler.db_target, keys)
+            except Exception as err:
+                self.errors += 1
+                self.handler.out(Failure(f'{self.model.Meta.table_name}: {err}'))
+                return
+        self.done[kind] += len(keys)
+
+    def close(self):
+        self.flush(MISSING)
+        self.flush(EXTRA)
+
+
+def get_handler(options):
+    handler = Handler()
+    handler.options = options
+    handler.is_verbose = options.verbose
+    handler.is_muted = not options.verbose
+    return handler
+
+
+def check(options, db_source, db_target):
+    console = Console()
+    status = 0
+    handler = get_handler(options) if options.repair else None
+    started = time.perf_counter()
+    totals = {MISSING: 0, EXTRA: 0}
+    try:
+        for name in options.table_name:
+            model = models.catalog[name]
+            console.print(f'Comprobando [green]{name}[/green]', end=" : ")
+            counters = {MISSING: 0, EXTRA: 0}
+            repair = None
+            if handler:
+                repair = Repair(handler, model, options.batch_size, dry_run=options.dry_run)
+            keys_in_source = iter_keys(db_source, model)
+            keys_in_target = iter_keys(db_target, model)
+            for pk, kind in merge_diff(keys_in_source, keys_in_target):
+                counters[kind] += 1
+                if options.verbose:
+                    label = 'Falta en destino' if kind == MISSING else 'Sobra en destino'
+                    console.print(f'\n  {label}: {pk}', end='')
+                if repair:
+                    repair.add(pk, kind)
+            if repair:
+                repair.close()
+                for kind in (MISSING, EXTRA):
+                    totals[kind] += repair.done[kind]
+            if options.verbose and (counters[MISSING] or counters[EXTRA]):
+                console.print()
+            if counters[MISSING]:
+                num = counters[MISSING]
+                console.print(f'Faltan [red][bold]{num}[/] en destino', end=' ')
+            if counters[EXTRA]:
+                num = counters[EXTRA]
+                console.print(f'Sobran [red][bold]{num}[/] en destino', end=' ')
+            if counters[MISSING] or counters[EXTRA]:
+                console.print(ERROR)
+                status = -1
+            else:
+                console.print(OK)
+            if repair and repair.errors:
+                status = -1
+    finally:
+        if handler:
+            handler.close()
+    if handler:
+        elapsed = time.perf_counter() - started
+        verb = 'Se migrarían' if options.dry_run else 'Migrados'
+        verb_delete = 'se borrarían' if options.dry_run else 'borrados'
+        rate = (totals[MISSING] + totals[EXTRA]) / elapsed if elapsed else 0
+        console.print(
+            f'{verb} {totals[MISSING]}, {verb_delete} {totals[EXTRA]}'
+            f' en {elapsed:.1f} segundos ({rate:.1f} registros/segundo)'
+            )
+    return status
 
 
 def main():
     options = get_options()
-    db_source = dba.get_database_connection('DB_SOURCE')
-    db_target = dba.get_database_connection('DB_TARGET')
-    console = Console()
-    for name in options.table_name:
-        console.print(f'Comprobando [green]{name}[/green]', end=" : ")
-        keys_in_source, keys_in_target = get_primary_keys(db_source, db_target, name)
-        num_in_source = len(keys_in_source)
-        num_in_target = len(keys_in_target)
-        a_insertar = a_borrar = set()
-        if options.verbose:
-            console.print(f'[En origen: {num_in_source}]', end=' ')
-            console.print(f'[En destino: {num_in_target}]', end=' ')
-        if num_in_target < num_in_source:
-            a_insertar = keys_in_source - keys_in_target
-            console.print(f'Faltan [red][bold]{len(a_insertar)}[/] en destino')
-            if options.verbose and a_insertar:
-                for pk in a_insertar:
-                    console.print(pk)
-        elif num_in_target > num_in_source:
-            a_borrar = keys_in_target - keys_in_source
-            console.print(f'Sobran [red][bold]{len(a_borrar)}[/] en destino')
-            if options.verbose and a_borrar:
-                for pk in a_borrar:
-                    console.print(pk)
-        else:
-            console.print(OK)
+    with dba.connection('DB_SOURCE') as db_source, dba.connection('DB_TARGET') as db_target:
+        return check(options, db_source, db_target)
 
 
 if __name__ == "__main__":
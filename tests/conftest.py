@@ -0,0 +1,35 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import argparse
+
+import pytest
+from rich.console import Console
+
+from benchmarks import synthetic
+import dba
+import madrox
+
+
+@pytest.fixture
+def handler(tmp_path, monkeypatch):
+    """Handler con bases de datos SQLite de origen y destino vacías.
+    """
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setenv('DB_SOURCE', f'sqlite:///{tmp_path / "source.db"}')
+    monkeypatch.setenv('DB_TARGET', f'sqlite:///{tmp_path / "target.db"}')
+    monkeypatch.setattr(dba, '_pools', {})
+    handler = madrox.Handler()
+    handler.console = Console(quiet=True)
+    handler.is_verbose = False
+    handler.is_muted = True
+    handler.options = argparse.Namespace(
+        verbose=False,
+        upsert=False,
+        hash_check=False,
+        resume=False,
+        )
+    for dbc in (handler.db_source, handler.db_target):
+        synthetic.create_schema(dbc, synthetic.all_models())
+    yield handler
+    handler.close()
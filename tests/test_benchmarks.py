@@ -0,0 +1,44 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import dba
+import models
+from benchmarks import synthetic
+
+
+@pytest.fixture
+def source():
+    return dba.get_sqlite_connection(':memory:')
+
+
+def test_all_models_includes_subordinates():
+    all_models = synthetic.all_models()
+    assert models.DS_Sumario in all_models
+    assert all_models.index(models.Tarea) < all_models.index(models.Nota)
+    assert all_models.index(models.Organo) < all_models.index(models.Sesion)
+
+
+def test_populate_keeps_fanout(source):
+    all_models = synthetic.all_models()
+    generator = synthetic.Generator(num_rows=4, fanout=3)
+    counts = synthetic.populate(source, all_models, generator)
+    assert counts['Tarea'] == 4
+    assert counts['Nota'] == 12
+    assert counts['SesionDatos'] == counts['Sesion']
+    num_natural_keys = dba.get_scalar(
+        source,
+        'SELECT Count(DISTINCT id_tarea || \'-\' || numero) FROM Tareas.Nota',
+        )
+    assert num_natural_keys == 12
+    orphans = dba.get_scalar(
+        source,
+        'SELECT Count(*) FROM Agora.sesion'
+        ' WHERE id_organo NOT IN (SELECT id_organo FROM Agora.organo)',
+        )
+    assert orphans == 0
+
+
+if __name__ == "__main__":
+    pytest.main()
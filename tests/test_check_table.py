@@ -0,0 +1,201 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import math
+import zlib
+
+import pytest
+
+import check_table
+import dba
+
+
+def test_aggregates_query():
+    sql = check_table.aggregates_query('Agora.Jornada', ['canal'])
+    assert str(sql) == (
+        'SELECT Count(*) as num, SUM(canal) as suma_0, AVG(canal) as media_0,'
+        ' MAX(canal) as maximo_0, MIN(canal) as minimo_0\n'
+        '  FROM Agora.Jornada'
+        )
+
+
+def test_check_table_number():
+    source = {'suma_0': 10, 'media_0': 2.5, 'maximo_0': 4, 'minimo_0': 1}
+    assert check_table.check_table_number(source, dict(source), 0, 'canal') == ''
+    target = dict(source, maximo_0=5)
+    assert check_table.check_table_number(source, target, 0, 'canal') == (
+        'No coincide el maximo del campo canal'
+        )
+
+
+# --[ verify_table sobre SQLite ]--------------------------------------
+
+
+def test_verify_table_equal():
+    rows = {pk: f'fila {pk}' for pk in range(1, 10)}
+    source, target = sqlite_table(rows), sqlite_table(dict(rows))
+    assert check_table.verify_table(source, target, 'Agora.Prueba', ['id']) == ''
+
+
+def test_verify_table_size():
+    rows = {pk: f'fila {pk}' for pk in range(1, 10)}
+    source, target = sqlite_table(rows), sqlite_table({1: 'fila 1'})
+    assert check_table.verify_table(source, target, 'Agora.Prueba', ['id']) == (
+        'No son del mismo tamaño: En Origen 9, en destino 1'
+        )
+
+
+def test_verify_table_number(tables):
+    assert check_table.verify_table(*tables, 'Agora.Prueba', []) == ''
+    assert check_table.verify_table(*tables, 'Agora.Prueba', ['id']) == (
+        'No coincide la suma del campo id'
+        )
+
+
+class FakeDeepCompare(check_table.DeepCompare):
+    """DeepCompare sobre diccionarios `clave -> hash` en memoria."""
+
+    def __init__(self, source, target, leaf_size=4, fanout=4):
+        self.source = source
+        self.target = target
+        self.leaf_size = leaf_size
+        self.fanout = fanout
+        self.num_queries = 0
+
+    def _range(self, rows, lo, hi):
+        return {pk: h for pk, h in rows.items() if lo <= pk <= hi}
+
+    def bounds(self):
+        self.num_queries += 2
+        if self.source == self.target:
+            return None
+        keys = set(self.source) | set(self.target)
+        return min(keys), max(keys)
+
+    def buckets(self, lo, hi, width):
+        self.num_queries += 2
+        result = []
+        for rows in (self.source, self.target):
+            groups = {}
+            for pk, h in self._range(rows, lo, hi).items():
+                num, total = groups.get((pk - lo) // width, (0, 0))
+                groups[(pk - lo) // width] = (num + 1, total + h)
+            result.append(groups)
+        return result
+
+    def leaf(self, lo, hi):
+        self.num_queries += 2
+        source = self._range(self.source, lo, hi)
+        target = self._range(self.target, lo, hi)
+        for pk in source:
+            if pk not in target:
+                yield pk, 'falta en destino'
+            elif source[pk] != target[pk]:
+                yield pk, 'distinto'
+        for pk in target:
+            if pk not in source:
+                yield pk, 'sobra en destino'
+
+
+def test_deep_compare_equal_tables():
+    rows = {pk: pk * 7 for pk in range(1, 1000)}
+    deep = FakeDeepCompare(rows, dict(rows))
+    assert list(deep.differences()) == []
+    assert deep.num_queries == 2
+
+
+def test_deep_compare_finds_differences():
+    source = {pk: pk * 7 for pk in range(1, 1000)}
+    target = dict(source)
+    del target[500]
+    target[123] = 0
+    target[2000] = 1
+    deep = FakeDeepCompare(source, target)
+    assert sorted(deep.differences()) == [
+        (123, 'distinto'),
+        (500, 'falta en destino'),
+        (2000, 'sobra en destino'),
+        ]
+    assert deep.num_queries < 100
+
+
+def test_row_hash_expression():
+    expression = check_table.row_hash_expression([('id', 'NUMBER'), ('texto', 'CLOB')])
+    assert expression == (
+        f'NVL(ORA_HASH(id, {check_table.MAX_HASH}, 1), 0)'
+        ' + NVL(ORA_HASH(DBMS_LOB.GETLENGTH(texto) || DBMS_LOB.SUBSTR(texto, 2000, 1),'
+        f' {check_table.MAX_HASH}, 2), 0)'
+        )
+
+
+# --[ DeepCompare sobre SQLite ]---------------------------------------
+
+
+def ora_hash(value, max_bucket=check_table.MAX_HASH, seed=0):
+    if value is None:
+        return None
+    return zlib.crc32(f'{seed}:{value}'.encode()) % (max_bucket + 1)
+
+
+def sqlite_table(rows):
+    """Base de datos SQLite con las funciones de Oracle que usa
+    `DeepCompare` y la tabla `Agora.Prueba` con las filas indicadas.
+    """
+    dbc = dba.get_sqlite_connection(':memory:')
+    dbc.create_function('ORA_HASH', -1, ora_hash, deterministic=True)
+    dbc.create_function('MOD', 2, lambda a, b: a % b, deterministic=True)
+    dbc.create_function('FLOOR', 1, math.floor, deterministic=True)
+    dba.execute(dbc, 'CREATE TABLE Agora.Prueba (id, nombre)')
+    for pk, nombre in rows.items():
+        dba.execute(dbc, 'INSERT INTO Agora.Prueba VALUES (:1, :2)', pk, nombre)
+    return dbc
+
+
+@pytest.fixture
+def tables():
+    source = {pk: f'fila {pk}' for pk in range(1, 200)}
+    target = dict(source)
+    del target[50]
+    target[123] = 'cambiada'
+    target[300] = 'nueva'
+    return sqlite_table(source), sqlite_table(target)
+
+
+def test_deep_compare_sqlite_numeric_key(tables, monkeypatch):
+    monkeypatch.setattr(
+        check_table, 'get_columns',
+        lambda dbc, table_name: [('id', 'NUMBER'), ('nombre', 'VARCHAR2')],
+        )
+    deep = check_table.DeepCompare(*tables, 'Agora.Prueba', 'id', leaf_size=8, fanout=4)
+    assert deep.key_expr == 'id'
+    assert sorted(deep.differences()) == [
+        (50, 'falta en destino'),
+        (123, 'distinto'),
+        (300, 'sobra en destino'),
+        ]
+    source, target = deep.buckets(1, 300, 100)
+    assert {bucket: num for bucket, (num, _hash) in source.items()} == {0: 100, 1: 99}
+    assert {bucket: num for bucket, (num, _hash) in target.items()} == {0: 99, 1: 99, 2: 1}
+    assert source[1] != target[1]
+    assert list(deep.leaf(1, 8)) == []
+
+
+def test_deep_compare_sqlite_hashed_key(tables):
+    deep = check_table.DeepCompare(*tables, 'Agora.Prueba', 'id', leaf_size=64)
+    assert deep.key_expr == 'ORA_HASH(id)'
+    assert sorted(deep.differences()) == [
+        (50, 'falta en destino'),
+        (123, 'distinto'),
+        (300, 'sobra en destino'),
+        ]
+
+
+def test_deep_compare_sqlite_equal_tables(tables):
+    source, _target = tables
+    deep = check_table.DeepCompare(source, source, 'Agora.Prueba', 'id')
+    assert deep.bounds() is None
+    assert deep.num_queries == 2
+
+
+if __name__ == "__main__":
+    pytest.main()
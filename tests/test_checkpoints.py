@@ -0,0 +1,44 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+from datetime import datetime as DateTime
+
+import pytest
+
+from checkpoints import CheckpointStore
+import models
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = CheckpointStore(tmp_path / 'madrox.db')
+    yield store
+    store.close()
+
+
+def test_checkpoint_missing(store):
+    assert store.get('Sesion') is None
+
+
+def test_checkpoint_only_moves_forward(store):
+    store.set('Sesion', DateTime(2024, 5, 1, 10, 0))
+    store.set('Sesion', DateTime(2024, 4, 1))
+    assert store.get('Sesion') == DateTime(2024, 5, 1, 10, 0)
+    store.set('Sesion', DateTime(2024, 6, 1))
+    assert store.get('Sesion') == DateTime(2024, 6, 1)
+
+
+def test_watermark_of_instances():
+    isla = models.Isla(
+        id_isla=1,
+        descripcion='Tenerife',
+        ts_mod='20240102030405',
+        migrable='S',
+        )
+    otra = models.Isla(id_isla=2, descripcion='La Palma', ts_mod=None, migrable='S')
+    assert models.Isla._watermark([isla, otra]) == DateTime(2024, 1, 2, 3, 4, 5)
+    assert models.Isla._watermark([otra]) is None
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -2,10 +2,15 @@
 # -*- coding: utf-8 -*-
 
 from dataclasses import dataclass
+import datetime
+import sqlite3
+import sys
+import types
 
 import pytest
 
 import dba
+import dml
 
 
 # --[ listify function ]-----------------------------------------------
@@ -91,6 +96,330 @@ def test_exists_exists(isla_tf):
     assert dba.create_exists(Isla, isla_tf) == expected
 
 
+# --[ chunks function ]------------------------------------------------
+
+
+def test_chunks():
+    assert list(dba.chunks(range(5), 2)) == [[0, 1], [2, 3], [4]]
+
+
+def test_chunks_empty():
+    assert list(dba.chunks([], 1000)) == []
+
+
+# --[ in_clause function ]---------------------------------------------
+
+
+def test_in_clause():
+    assert dba.in_clause('id_isla', 3) == 'id_isla IN (:1, :2, :3)'
+
+
+# --[ get_parameters function ]----------------------------------------
+
+
+def test_get_parameters_positional():
+    assert dba.get_parameters('SELECT 1 FROM Dual', (1, 2)) == [1, 2]
+
+
+def test_get_parameters_binds():
+    sql = dml.Select('*', binds=True).From('Agora.Isla').Filter(id_isla=7)
+    assert dba.get_parameters(sql, ()) == {'id_isla': 7}
+
+
+def test_get_parameters_mixed():
+    sql = dml.Select('*', binds=True).From('Agora.Isla').Filter(id_isla=7)
+    with pytest.raises(ValueError):
+        dba.get_parameters(sql, (1,))
+
+
+# --[ iter_rows function ]---------------------------------------------
+
+
+class FakeCursor:
+
+    description = [('ID_ISLA',), ('NOMBRE',)]
+
+    def __init__(self, rows):
+        self.rows = list(rows)
+        self.arraysize = 1
+        self.fetches = 0
+
+    def __enter__(self):
+        return self
+
+    def close(self):
+        pass
+
+    def __exit__(self, *args):
+        pass
+
+    def execute(self, sql, parameters):
+        self.sql = sql
+        self.parameters = parameters
+
+    def fetchmany(self):
+        self.fetches += 1
+        batch, self.rows = self.rows[:self.arraysize], self.rows[self.arraysize:]
+        return batch
+
+
+class FakeConnection:
+
+    def __init__(self, rows):
+        self.cur = FakeCursor(rows)
+
+    def cursor(self):
+        return self.cur
+
+
+def test_iter_rows_uses_fetchmany():
+    dbc = FakeConnection([(1, 'Tenerife'), (2, 'La Palma'), (3, 'El Hierro')])
+    rows = dba.iter_rows(dbc, 'SELECT id_isla, nombre FROM Agora.Isla', arraysize=2)
+    assert next(rows) == {'id_isla': 1, 'nombre': 'Tenerife'}
+    assert dbc.cur.fetches == 1
+    assert [row['id_isla'] for row in rows] == [2, 3]
+    assert dbc.cur.fetches == 3
+
+
+def test_get_rows_with_cast():
+    dbc = FakeConnection([(1, 'Tenerife'), (2, 'La Palma')])
+    sql = 'SELECT id_isla, nombre FROM Agora.Isla WHERE id_isla > :1'
+    assert dba.get_rows(dbc, sql, 0, cast=lambda row: row['nombre']) == [
+        'Tenerife',
+        'La Palma',
+        ]
+    assert dbc.cur.parameters == [0]
+
+
+# --[ as_ts_mod / as_datetime functions ]------------------------------
+
+
+def test_as_ts_mod_date():
+    assert dba.as_ts_mod(datetime.date(2024, 3, 5)) == '20240305000000'
+
+
+def test_as_ts_mod_datetime():
+    assert dba.as_ts_mod(datetime.datetime(2024, 3, 5, 9, 8, 7)) == '20240305090807'
+
+
+def test_as_datetime():
+    expected = datetime.datetime(2024, 3, 5)
+    assert dba.as_datetime(datetime.date(2024, 3, 5)) == expected
+    assert dba.as_datetime(expected) == expected
+    assert dba.as_datetime('20240305000000') == expected
+    assert dba.as_datetime(None) is None
+    assert dba.as_datetime('no es una fecha') is None
+
+
+# --[ sqlite / postgresql backends ]-----------------------------------
+
+
+def test_translate_sqlite():
+    sql, has_binds = dba.translate("SELECT * FROM t WHERE a > :1 AND b = ':2'", 'sqlite')
+    assert sql == "SELECT * FROM t WHERE a > ?1 AND b = ':2'"
+    assert has_binds
+
+
+def test_translate_postgresql():
+    sql, _ = dba.translate(
+        "SELECT * FROM t WHERE a > :1 AND b = :nombre AND c LIKE 'x%'"
+        " AND d > TO_DATE('2024-01-01', 'YYYY-MM-DD')",
+        'postgresql',
+        )
+    assert sql == (
+        "SELECT * FROM t WHERE a > %(p1)s AND b = %(nombre)s AND c LIKE 'x%%'"
+        " AND d > TO_TIMESTAMP('2024-01-01', 'YYYY-MM-DD')"
+        )
+
+
+def test_adapt_parameters_postgresql():
+    assert dba.adapt_parameters([7, 'x'], 'postgresql') == {'p1': 7, 'p2': 'x'}
+
+
+def test_sqlite_connection():
+    conn = dba.get_sqlite_connection(':memory:')
+    dba.execute(conn, 'CREATE TABLE Agora.Isla (id_isla INTEGER PRIMARY KEY, alta DATE)')
+    dba.execute(
+        conn,
+        "INSERT INTO Agora.Isla VALUES (:1, TO_DATE('2024-03-01', 'YYYY-MM-DD'))",
+        1,
+        )
+    row = dba.get_row(conn, 'SELECT * FROM Agora.Isla WHERE id_isla = :1', 1)
+    assert row == {'id_isla': 1, 'alta': datetime.date(2024, 3, 1)}
+
+
+# --[ Pools ]----------------------------------------------------------
+
+
+class FakeDBConnection:
+
+    def __init__(self):
+        self.autocommit = False
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+def test_connection_pool_reuses_idle_connections():
+    pool = dba.ConnectionPool(FakeDBConnection, max=1)
+    first, second = pool.acquire(), pool.acquire()
+    assert first is not second
+    pool.release(first)
+    pool.release(second)
+    assert second.closed and not first.closed
+    assert pool.acquire() is first
+
+
+def test_configure_pools(monkeypatch):
+    monkeypatch.setattr(dba, '_pools', {})
+    monkeypatch.setattr(dba, '_pool_max', dba.POOL_MAX)
+    monkeypatch.setenv('DB_POOL_TEST', 'sqlite:///:memory:')
+    dba.configure_pools(dba.POOL_MAX + 5)
+    with dba.connection('DB_POOL_TEST') as conn:
+        assert dba.is_autocommit(conn)
+    pool = dba.get_pool('DB_POOL_TEST')
+    assert pool.max == dba.POOL_MAX + 5
+    assert len(pool.idle) == 1
+    dba.configure_pools(1)
+    assert dba._pool_max == dba.POOL_MAX
+
+
+# --[ execute_many ]---------------------------------------------------
+
+
+def test_execute_many_reports_row_offsets():
+    conn = dba.get_sqlite_connection(':memory:')
+    dba.execute(conn, 'CREATE TABLE t (id INTEGER PRIMARY KEY, nombre TEXT NOT NULL)')
+    dba.execute(conn, "INSERT INTO t VALUES (3, 'ya estaba')")
+    rows = [{'id': i, 'nombre': f'n{i}'} for i in range(1, 8)]
+    rows[4]['nombre'] = None
+    sql = 'INSERT INTO t VALUES (:id, :nombre)'
+    result = dba.execute_many(conn, sql, rows, batch_size=4)
+    assert result.num_rows == 5
+    assert [offset for offset, _message in result.errors] == [2, 4]
+    ids = [row['id'] for row in dba.get_rows(conn, 'SELECT id FROM t ORDER BY id')]
+    assert ids == [1, 2, 3, 4, 6, 7]
+
+
+def test_execute_many_without_errors():
+    conn = dba.get_sqlite_connection(':memory:')
+    dba.execute(conn, 'CREATE TABLE t (id INTEGER PRIMARY KEY)')
+    sql = 'INSERT INTO t VALUES (:1)'
+    result = dba.execute_many(conn, sql, [[1], [2], [3]], batch_size=2)
+    assert result == dba.BulkResult(num_rows=3)
+    assert dba.get_scalar(conn, 'SELECT Count(*) FROM t') == 3
+
+
+# --[ Transaction ]----------------------------------------------------
+
+
+def test_transaction_commits_every_n_rows(tmp_path):
+    conn = dba.get_sqlite_connection(str(tmp_path / 'target.db'))
+    dba.execute(conn, 'CREATE TABLE t (id INTEGER PRIMARY KEY)')
+    committed = []
+    transaction = dba.Transaction(conn, max_rows=2, max_seconds=60)
+    dba.execute(conn, 'INSERT INTO t VALUES (1)')
+    transaction.add(1, on_commit=lambda: committed.append(1))
+    assert committed == []
+    dba.execute(conn, 'INSERT INTO t VALUES (2)')
+    transaction.add(1, on_commit=lambda: committed.append(2))
+    assert committed == [1, 2]
+    dba.execute(conn, 'INSERT INTO t VALUES (3)')
+    transaction.add(1, on_commit=lambda: committed.append(3))
+    assert transaction.rollback() == 1
+    transaction.close()
+    assert committed == [1, 2]
+    assert dba.get_rows(conn, 'SELECT id FROM t') == [{'id': 1}, {'id': 2}]
+
+
+class FakeOracleCursor:
+
+    def __init__(self):
+        self.calls = []
+
+    def close(self):
+        pass
+
+    def setinputsizes(self, **kwargs):
+        self.calls.append(('setinputsizes', kwargs))
+
+    def executemany(self, sql, rows, batcherrors):
+        self.calls.append(('executemany', len(rows)))
+
+    def getbatcherrors(self):
+        return []
+
+
+class FakeOracleConnection:
+
+    autocommit = True
+
+    def __init__(self):
+        self.cur = FakeOracleCursor()
+
+    def cursor(self):
+        return self.cur
+
+
+def test_execute_many_binds_oracle_lobs(monkeypatch):
+    monkeypatch.setitem(
+        sys.modules, 'cx_Oracle', types.SimpleNamespace(DB_TYPE_CLOB='CLOB'),
+        )
+    dbc = FakeOracleConnection()
+    rows = [{'id_nota': pk, 'texto': 'x' * 5000} for pk in range(3)]
+    sql = 'INSERT INTO Tareas.Nota (id_nota, texto) VALUES (:id_nota, :texto)'
+    result = dba.execute_many(dbc, sql, rows, batch_size=2, lobs=('texto',))
+    assert result.num_rows == 3
+    assert dbc.cur.calls == [
+        ('setinputsizes', {'texto': 'CLOB'}),
+        ('executemany', 2),
+        ('setinputsizes', {'texto': 'CLOB'}),
+        ('executemany', 1),
+        ]
+
+
+def test_transaction_savepoint_reserves_sqlite(tmp_path, monkeypatch):
+    monkeypatch.setattr(dba, 'SQLITE_BUSY_TIMEOUT', 0.01)
+    filename = str(tmp_path / 'target.db')
+    conn, other = dba.get_sqlite_connection(filename), dba.get_sqlite_connection(filename)
+    dba.execute(conn, 'CREATE TABLE t (id INTEGER PRIMARY KEY)')
+    transaction = dba.Transaction(conn, max_rows=1, max_seconds=60)
+    transaction.savepoint()
+    with pytest.raises(sqlite3.OperationalError, match='locked'):
+        dba.execute(other, 'INSERT INTO t VALUES (1)')
+    dba.execute(conn, 'INSERT INTO t VALUES (2)')
+    transaction.add(1)
+    dba.execute(other, 'INSERT INTO t VALUES (1)')
+    assert dba.get_scalar(conn, 'SELECT Count(*) FROM t') == 2
+
+
+def test_execute_many_in_transaction_keeps_good_rows(tmp_path):
+    conn = dba.get_sqlite_connection(str(tmp_path / 'target.db'))
+    dba.execute(conn, 'CREATE TABLE t (id INTEGER PRIMARY KEY)')
+    transaction = dba.Transaction(conn, max_rows=100, max_seconds=60)
+    dba.execute(conn, 'INSERT INTO t VALUES (1)')
+    result = dba.execute_many(conn, 'INSERT INTO t VALUES (:1)', [[2], [1], [3]])
+    assert [offset for offset, _message in result.errors] == [1]
+    transaction.close()
+    ids = [row['id'] for row in dba.get_rows(conn, 'SELECT id FROM t ORDER BY id')]
+    assert ids == [1, 2, 3]
+
+
+def test_transaction_rollback_to_savepoint(tmp_path):
+    conn = dba.get_sqlite_connection(str(tmp_path / 'target.db'))
+    dba.execute(conn, 'CREATE TABLE t (id INTEGER PRIMARY KEY)')
+    transaction = dba.Transaction(conn, max_rows=100, max_seconds=60)
+    transaction.savepoint()
+    dba.execute(conn, 'INSERT INTO t VALUES (1)')
+    transaction.savepoint()
+    dba.execute(conn, 'INSERT INTO t VALUES (2)')
+    transaction.rollback_to_savepoint()
+    transaction.savepoint()
+    dba.execute(conn, 'INSERT INTO t VALUES (3)')
+    transaction.close()
+    ids = [row['id'] for row in dba.get_rows(conn, 'SELECT id FROM t ORDER BY id')]
+    assert ids == [1, 3]
 
 
 if __name__ == "__main__":
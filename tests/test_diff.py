@@ -0,0 +1,159 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import dataclasses
+
+import pytest
+
+from diff import diff_batch
+from models import Model, MetaModel
+import dba
+
+
+@dataclasses.dataclass
+class Isla(Model):
+
+    Meta = MetaModel(
+        table_name='Agora.Isla',
+        primary_key='id_isla',
+        )
+
+    id_isla: int
+    descripcion: str
+
+
+@dataclasses.dataclass
+class Nota(Model):
+
+    Meta = MetaModel(
+        table_name='Tareas.Nota',
+        primary_key='id_nota',
+        natural_keys={'id_tarea', 'numero'},
+        )
+
+    id_nota: int
+    id_tarea: int
+    numero: int
+    texto: str
+
+
+def fake_target(monkeypatch, model, rows):
+    monkeypatch.setattr(
+        model, '_load_many',
+        classmethod(lambda cls, dbc, keys: [
+            row for row in rows if getattr(row, cls.Meta.primary_key) in keys
+            ]),
+        )
+    monkeypatch.setattr(
+        model, '_load_from_natural_keys_in',
+        classmethod(lambda cls, dbc, objs: [
+            row for row in rows
+            if cls._natural_key(row) in {cls._natural_key(obj) for obj in objs}
+            ]),
+        )
+
+
+def test_diff_batch_by_primary_key(monkeypatch):
+    fake_target(monkeypatch, Isla, [
+        Isla(1, 'Tenerife'),
+        Isla(2, 'Gran Canaria'),
+        ])
+    diff = diff_batch(Isla, None, [
+        Isla(1, 'Tenerife'),
+        Isla(2, 'Gran canaria'),
+        Isla(3, 'La Palma'),
+        ])
+    assert diff.to_insert == [Isla(3, 'La Palma')]
+    assert diff.to_update == [
+        (Isla(2, 'Gran canaria'), Isla(2, 'Gran Canaria'), {'descripcion': 'Gran canaria'}),
+        ]
+    assert diff.unchanged == [Isla(1, 'Tenerife')]
+    assert len(diff) == 3
+
+
+def test_diff_batch_by_natural_keys(monkeypatch):
+    fake_target(monkeypatch, Nota, [
+        Nota(10, 1, 1, 'Hola'),
+        ])
+    diff = diff_batch(Nota, None, [
+        Nota(99, 1, 1, 'Hola'),
+        Nota(98, 1, 2, 'Adios'),
+        ])
+    assert diff.to_insert == [Nota(98, 1, 2, 'Adios')]
+    assert diff.to_update == []
+    assert diff.unchanged == [Nota(99, 1, 1, 'Hola')]
+
+
+def test_diff_batch_with_hashes(monkeypatch):
+    fake_target(monkeypatch, Isla, [
+        Isla(1, 'Tenerife'),
+        Isla(2, 'Gran Canaria'),
+        ])
+    hashes = {
+        'source': {1: b'a', 2: b'b', 3: b'c'},
+        'target': {1: b'a', 2: b'x'},
+        }
+    monkeypatch.setattr(
+        Isla, '_load_hashes',
+        classmethod(lambda cls, dbc, keys: hashes[dbc]),
+        )
+    loaded = []
+    load_many = Isla._load_many
+    monkeypatch.setattr(
+        Isla, '_load_many',
+        classmethod(lambda cls, dbc, keys: loaded.extend(keys) or load_many(dbc, keys)),
+        )
+    diff = diff_batch(Isla, 'target', [
+        Isla(1, 'Tenerife'),
+        Isla(2, 'Gran canaria'),
+        Isla(3, 'La Palma'),
+        ], db_source='source')
+    assert loaded == [2, 3]
+    assert diff.unchanged == [Isla(1, 'Tenerife')]
+    assert diff.to_insert == [Isla(3, 'La Palma')]
+    assert [instance for instance, _, _ in diff.to_update] == [Isla(2, 'Gran canaria')]
+
+
+@pytest.fixture
+def notas():
+    """Tabla SQLite de destino con dos notas de la tarea 1.
+    """
+    dbc = dba.get_sqlite_connection(':memory:')
+    dba.execute(
+        dbc,
+        'CREATE TABLE Tareas.Nota (id_nota INTEGER PRIMARY KEY, id_tarea, numero, texto)',
+        )
+    Nota._insert_many(dbc, [
+        Nota._to_dict(Nota(10, 1, 1, 'Hola')),
+        Nota._to_dict(Nota(11, 1, 2, 'Adios')),
+        ])
+    return dbc
+
+
+def test_load_from_natural_keys_in_sqlite(notas):
+    found = Nota._load_from_natural_keys_in(notas, [
+        Nota(99, 1, 2, ''),
+        Nota(98, 2, 1, ''),
+        Nota(97, 1, 1, ''),
+        ])
+    assert sorted(found, key=lambda nota: nota.id_nota) == [
+        Nota(10, 1, 1, 'Hola'),
+        Nota(11, 1, 2, 'Adios'),
+        ]
+
+
+def test_diff_batch_by_natural_keys_sqlite(notas):
+    diff = diff_batch(Nota, notas, [
+        Nota(99, 1, 1, 'Hola'),
+        Nota(11, 1, 2, 'Adiós'),
+        Nota(98, 1, 3, 'Nueva'),
+        ])
+    assert diff.to_insert == [Nota(98, 1, 3, 'Nueva')]
+    assert diff.to_update == [
+        (Nota(11, 1, 2, 'Adiós'), Nota(11, 1, 2, 'Adios'), {'texto': 'Adiós'}),
+        ]
+    assert diff.unchanged == [Nota(99, 1, 1, 'Hola')]
+
+
+if __name__ == "__main__":
+    pytest.main()
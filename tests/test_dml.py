@@ -0,0 +1,146 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import datetime
+
+import pytest
+
+import dba
+import dml
+
+
+# --[ Insert with binds ]----------------------------------------------
+
+
+def test_insert_binds():
+    sql = dml.Insert('Agora.Isla', binds=True)
+    sql = sql.Set('id_isla', 9).Set('descripcion', "O'Donnell")
+    assert str(sql) == (
+        'INSERT INTO Agora.Isla (ID_ISLA, DESCRIPCION)\n'
+        ' VALUES (:id_isla, :descripcion)'
+        )
+    assert sql.binds == {'id_isla': 9, 'descripcion': "O'Donnell"}
+
+
+def test_insert_binds_same_text_for_different_values():
+    first = dml.Insert('Agora.Isla', binds=True).Set('id_isla', 1)
+    second = dml.Insert('Agora.Isla', binds=True).Set('id_isla', 2)
+    assert str(first) == str(second)
+
+
+def test_insert_binds_set_twice():
+    sql = dml.Insert('Agora.Isla', binds=True)
+    sql = sql.Set('id_isla', 1).Set('id_isla', 2)
+    assert sql.binds == {'id_isla': 2}
+    assert sql.get('id_isla') == 2
+
+
+# --[ Update with binds ]----------------------------------------------
+
+
+def test_update_binds():
+    fecha = datetime.date(2023, 5, 1)
+    sql = dml.Update('Agora.Sesion', binds=True)
+    sql = sql.Set('fecha', fecha).Filter(id_sesion='A1', fecha__lt=fecha)
+    assert str(sql) == (
+        'UPDATE Agora.Sesion\n'
+        '   SET FECHA = :fecha\n'
+        ' WHERE id_sesion = :id_sesion\n'
+        '   AND fecha < :fecha_2'
+        )
+    assert sql.binds == {'fecha': fecha, 'id_sesion': 'A1', 'fecha_2': fecha}
+
+
+# --[ Select.Filter with binds ]---------------------------------------
+
+
+def test_select_filter_binds():
+    sql = dml.Select('Count(*)', binds=True).From('Tareas.Nota')
+    sql = sql.Filter(id_tarea=4, numero__between=(1, 3), texto__isnull=True)
+    assert str(sql) == (
+        'SELECT Count(*)\n'
+        '  FROM Tareas.Nota\n'
+        ' WHERE id_tarea = :id_tarea\n'
+        '   AND numero BETWEEN :numero AND :numero_2\n'
+        '   AND texto IS NULL'
+        )
+    assert sql.binds == {'id_tarea': 4, 'numero': 1, 'numero_2': 3}
+
+
+def test_select_filter_without_binds():
+    sql = dml.Select('Count(*)').From('Tareas.Nota').Filter(id_tarea=4)
+    assert str(sql) == (
+        'SELECT Count(*)\n'
+        '  FROM Tareas.Nota\n'
+        ' WHERE id_tarea = 4'
+        )
+    assert sql.binds == {}
+
+
+def test_select_str_is_repeatable():
+    sql = dml.Select('*').From('Agora.Isla').Where('a = 1').And('b = 2')
+    assert str(sql) == str(sql)
+
+
+# --[ Delete ]---------------------------------------------------------
+
+
+def test_delete():
+    sql = dml.Delete('Agora.Isla').Where('id_isla IN (:1, :2)').And('migrable = 1')
+    assert str(sql) == (
+        'DELETE FROM Agora.Isla\n'
+        ' WHERE id_isla IN (:1, :2)\n'
+        '   AND migrable = 1'
+        )
+
+
+def test_delete_without_conditions():
+    with pytest.raises(ValueError):
+        str(dml.Delete('Agora.Isla'))
+
+
+# --[ Merge ]----------------------------------------------------------
+
+
+def test_merge_natural_keys():
+    sql = dml.Merge(
+        'Tareas.Nota',
+        ['id_nota', 'id_tarea', 'numero', 'texto'],
+        ['id_tarea', 'numero'],
+        fijos=['id_nota'],
+        lobs=['texto'],
+        )
+    assert str(sql) == (
+        'MERGE INTO Tareas.Nota t\n'
+        'USING (SELECT :id_nota AS ID_NOTA, :id_tarea AS ID_TAREA,'
+        ' :numero AS NUMERO, :texto AS TEXTO FROM Dual) s\n'
+        '   ON (t.ID_TAREA = s.ID_TAREA AND t.NUMERO = s.NUMERO)\n'
+        ' WHEN MATCHED THEN UPDATE SET t.TEXTO = s.TEXTO\n'
+        '      WHERE (NVL(DBMS_LOB.COMPARE(t.TEXTO, s.TEXTO), 1) <> 0'
+        ' AND NOT (t.TEXTO IS NULL AND s.TEXTO IS NULL))\n'
+        ' WHEN NOT MATCHED THEN INSERT (ID_NOTA, ID_TAREA, NUMERO, TEXTO)\n'
+        '      VALUES (s.ID_NOTA, s.ID_TAREA, s.NUMERO, s.TEXTO)'
+        )
+
+
+def test_merge_only_keys():
+    keys = ['id_aplicacion', 'id_usuario']
+    sql = dml.Merge('Comun.Acceso', keys, keys)
+    assert 'WHEN MATCHED' not in str(sql)
+    assert sql.upsert('postgresql').endswith(
+        'ON CONFLICT (ID_APLICACION, ID_USUARIO) DO NOTHING'
+        )
+
+
+def test_merge_upsert_on_sqlite():
+    conn = dba.get_sqlite_connection(':memory:')
+    dba.execute(conn, 'CREATE TABLE Agora.Isla (id_isla INTEGER PRIMARY KEY, descripcion)')
+    sql = dml.Merge('Agora.Isla', ['id_isla', 'descripcion'], ['id_isla']).upsert('sqlite')
+    dba.execute_many(conn, sql, [{'id_isla': 1, 'descripcion': 'a'}])
+    rows = [{'id_isla': 1, 'descripcion': 'b'}, {'id_isla': 2, 'descripcion': None}]
+    dba.execute_many(conn, sql, rows)
+    assert dba.get_rows(conn, 'SELECT * FROM Agora.Isla ORDER BY id_isla') == rows
+
+
+if __name__ == "__main__":
+    pytest.main()
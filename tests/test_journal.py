@@ -0,0 +1,54 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from journal import Journal
+
+
+@pytest.fixture
+def filename(tmp_path):
+    return tmp_path / 'madrox.db'
+
+
+def test_journal_record_and_resume(filename):
+    journal = Journal(run_id='run-1', filename=filename, flush_every=2)
+    journal.record('Sesion', ['A1'])
+    journal.record('Sesion', ['A2', 'A3'])
+    journal.record('Tarea', [7])
+    journal.close()  # Simula una ejecución interrumpida
+    assert Journal.last_unfinished(filename) == 'run-1'
+    resumed = Journal(run_id='run-1', filename=filename)
+    assert resumed.done('Sesion') == {'A1', 'A2', 'A3'}
+    assert resumed.done('Tarea') == {'7'}
+    resumed.close()
+
+
+def test_journal_finish(filename):
+    journal = Journal(run_id='run-2', filename=filename)
+    journal.record('Sesion', ['A1'])
+    journal.finish()
+    assert journal.done('Sesion') == set()
+    journal.close()
+    assert Journal.last_unfinished(filename) is None
+
+
+def test_journal_ignores_runs_before_a_finished_one(filename):
+    journal = Journal(run_id='20260101', filename=filename)
+    journal.record('Sesion', ['S1'])
+    journal.close()  # Se interrumpe
+    journal = Journal(run_id='20260102', filename=filename)
+    journal.finish()
+    journal.close()
+    assert Journal.last_unfinished(filename) is None
+    journal = Journal(run_id='20260103', filename=filename)
+    journal.close()  # Se interrumpe
+    assert Journal.last_unfinished(filename) == '20260103'
+
+
+def test_journal_without_file(filename):
+    assert Journal.last_unfinished(filename) is None
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,337 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+from datetime import datetime as DateTime
+import argparse
+import functools
+import pathlib
+import tomllib
+
+import pytest
+
+from checkpoints import CheckpointStore
+from journal import Journal
+from results import Failure
+import dba
+import madrox
+import models
+
+
+# --[ IdentityMap ]----------------------------------------------------
+
+
+def test_identity_map_visit():
+    identity = madrox.IdentityMap()
+    assert identity.visit(models.Isla, 1)
+    assert not identity.visit(models.Isla, 1)
+    assert not identity.visit(models.Isla, '1')
+    assert identity.visit(models.Organo, 1)
+    assert (identity.hits, identity.misses) == (2, 2)
+
+
+def test_identity_map_pending():
+    identity = madrox.IdentityMap()
+    identity.visit(models.Isla, '2')
+    assert identity.pending(models.Isla, [1, 2, 3, 1]) == [1, 3]
+    assert identity.pending(models.Isla, [1, 2, 3]) == []
+
+
+def test_identity_map_forget_keeps_counters():
+    identity = madrox.IdentityMap()
+    identity.pending(models.Isla, [1, 2])
+    identity.visit(models.Isla, 1)
+    identity.forget()
+    assert identity.visit(models.Isla, 1)
+    assert (identity.hits, identity.misses) == (1, 3)
+
+
+# --[ Handler ]--------------------------------------------------------
+
+
+class FakeJournal:
+
+    def close(self):
+        pass
+
+
+def test_handler_takes_connections_when_needed(handler):
+    new = madrox.Handler()
+    assert new._db_source is None and new._db_target is None
+    assert dba.get_scalar(new.db_target, 'SELECT Count(*) FROM Agora.Isla') == 0
+    assert new._db_source is None
+    new.close()
+    assert new._db_target is None
+    assert len(dba.get_pool('DB_TARGET').idle) == 1
+
+
+def migrate_options(**kwargs):
+    return argparse.Namespace(**{
+        'model': ['isla'],
+        'num_days': 7,
+        'batch_size': 500,
+        'workers': 1,
+        'incremental': False,
+        'hash_check': False,
+        'upsert': False,
+        'resume': False,
+        'metrics_json': None,
+        'metrics_prom': None,
+        'verbose': False,
+        'muted': True,
+        **kwargs,
+        })
+
+
+def test_migrate_closes_workers_on_error(handler, monkeypatch):
+    workers = []
+
+    def run(models, task, make_worker, num_workers):
+        workers.extend(make_worker() for _ in range(num_workers))
+        raise RuntimeError('Falla un trabajador')
+    monkeypatch.setattr(madrox.scheduler, 'run', run)
+    monkeypatch.setattr(madrox, 'Journal', lambda run_id: FakeJournal())
+    with pytest.raises(RuntimeError):
+        handler.cmd_migrate(migrate_options(workers=2))
+    assert len(workers) == 2
+    for worker in workers:
+        assert worker.transaction is None
+        assert worker._db_target is None
+
+
+def isla(pk):
+    return models.Isla(
+        id_isla=pk,
+        descripcion=f'Isla {pk}',
+        ts_mod='20240101000000',
+        migrable='S',
+        )
+
+
+def test_do_insert_reports_failed_primary_keys(handler):
+    models.Isla._insert_many(handler.db_target, [models.Isla._to_dict(isla(2))])
+    messages = []
+    handler.out = lambda message, **kwargs: messages.append(message) or message
+    result = handler._do_insert(models.Isla, isla(1), isla(2), isla(3))
+    assert isinstance(result, Failure)
+    assert result.error_message == 'Insertados 2 de 3, 1 errores'
+    assert len(messages) == 1
+    assert 'Agora.Isla[2]' in messages[0].error_message
+    num_rows = dba.get_scalar(handler.db_target, 'SELECT Count(*) FROM Agora.Isla')
+    assert num_rows == 3
+
+
+def test_workers_commit_every_group(handler):
+    handler.begin()
+    worker = handler.spawn()
+    try:
+        assert worker.transaction.max_rows == 1
+        assert handler.transaction.max_rows == madrox.COMMIT_ROWS
+    finally:
+        worker.transaction.close()
+        worker.close()
+
+
+# --[ Checkpoints ]----------------------------------------------------
+
+
+def strict_islas(handler):
+    """Islas 1, 2 y 3 en origen; en destino, la 2 no se puede insertar.
+    """
+    dba.execute(handler.db_target, 'DROP TABLE Agora.Isla')
+    dba.execute(
+        handler.db_target,
+        'CREATE TABLE Agora.Isla (id_isla INTEGER PRIMARY KEY, descripcion TEXT NOT NULL,'
+        ' ts_mod TEXT, migrable TEXT)',
+        )
+    islas = [isla(1), isla(2), isla(3)]
+    islas[1].descripcion = None
+    models.Isla._insert_many(handler.db_source, [models.Isla._to_dict(_) for _ in islas])
+    return islas
+
+
+@pytest.fixture
+def checkpoints(handler, tmp_path):
+    handler.checkpoints = CheckpointStore(tmp_path / 'checkpoints.db')
+    yield handler.checkpoints
+    handler.checkpoints.close()
+
+
+def test_failed_insert_keeps_checkpoint(handler, checkpoints):
+    islas = strict_islas(handler)
+    islas[2].ts_mod = '20240301000000'
+    handler.migrar_instancias(models.Isla, islas)
+    assert handler.failures == {'Isla': {'2'}}
+    handler.save_checkpoint(models.Isla)
+    assert checkpoints.get('Isla') is None
+
+
+def test_checkpoint_saved_without_failures(handler, checkpoints):
+    handler.migrar_instancias(models.Isla, [isla(1), isla(2)])
+    assert handler.failures == {}
+    handler.save_checkpoint(models.Isla)
+    assert checkpoints.get('Isla') == DateTime(2024, 1, 1)
+
+
+def test_migrate_fails_if_keys_were_lost(handler):
+    strict_islas(handler)
+    options = migrate_options(num_days=100_000)
+    assert handler.cmd_migrate(options) == 1
+    assert handler.failures == {'Isla': {'2'}}
+    assert handler.metrics.as_dict()['Isla']['failed'] == 1
+
+
+def test_migrate_without_failures(handler):
+    islas = [isla(1), isla(2)]
+    models.Isla._insert_many(handler.db_source, [models.Isla._to_dict(_) for _ in islas])
+    options = migrate_options(num_days=100_000, workers=2)
+    assert handler.cmd_migrate(options) == 0
+    assert dba.get_scalar(handler.db_target, 'SELECT Count(*) FROM Agora.Isla') == 2
+
+
+# --[ Diario ]---------------------------------------------------------
+
+
+@pytest.fixture
+def journal(handler, tmp_path):
+    handler.journal = Journal(filename=tmp_path / 'journal.db')
+    yield handler.journal
+    handler.journal.close()
+
+
+def test_journal_skips_failed_keys(handler, journal):
+    strict_islas(handler)
+    step = functools.partial(handler.migrar_lote, models.Isla)
+    handler.migrar_claves(models.Isla, [1, 2, 3], step)
+    journal.flush()
+    assert journal.done('Isla') == {'1', '3'}
+
+
+def test_journal_skips_failed_keys_in_transaction(handler, journal):
+    strict_islas(handler)
+    handler.begin()
+    step = functools.partial(handler.migrar_lote, models.Isla)
+    handler.migrar_claves(models.Isla, [1, 2, 3], step)
+    assert journal.done('Isla') == set()
+    handler.transaction.commit()
+    assert journal.done('Isla') == {'1', '3'}
+
+
+def test_failed_group_rolls_back_only_itself(handler, journal):
+    islas = [isla(pk) for pk in (1, 2, 3, 4)]
+    islas[1].ts_mod = '20240301000000'
+    models.Isla._insert_many(handler.db_source, [models.Isla._to_dict(_) for _ in islas])
+    handler.begin()
+    step = functools.partial(handler.migrar_lote, models.Isla)
+
+    def failing_step(keys):
+        step(keys)
+        raise RuntimeError('Falla el grupo')
+    handler.migrar_claves(models.Isla, [1], step)
+    handler.migrar_claves(models.Isla, [2, 3], failing_step)
+    handler.migrar_claves(models.Isla, [4], step)
+    handler.transaction.commit()
+    ids = dba.get_rows(handler.db_target, 'SELECT id_isla FROM Agora.Isla ORDER BY id_isla')
+    assert [row['id_isla'] for row in ids] == [1, 4]
+    assert journal.done('Isla') == {'1', '4'}
+    assert handler.failures == {'Isla': {'2', '3'}}
+    assert handler.watermarks[models.Isla] == DateTime(2024, 1, 1)
+    assert handler.identity.pending(models.Isla, [1, 2, 3, 4]) == [2, 3]
+
+
+# --[ verify ]---------------------------------------------------------
+
+
+def write_manifest(tmp_path, *tables):
+    manifest = tmp_path / 'manifest.toml'
+    manifest.write_text(''.join(
+        f'[[table]]\nname = "{name}"\nnumber = {numbers!r}\n\n'
+        for name, numbers in tables
+        ))
+    return argparse.Namespace(manifest=str(manifest), workers=2)
+
+
+def test_verify_tables(handler, tmp_path):
+    rows = [models.Isla._to_dict(isla(pk)) for pk in (1, 2, 3)]
+    models.Isla._insert_many(handler.db_source, rows)
+    models.Isla._insert_many(handler.db_target, rows)
+    options = write_manifest(tmp_path, ('Agora.Isla', ['id_isla']))
+    assert handler.cmd_verify(options) == 0
+    dba.execute(handler.db_target, 'DELETE FROM Agora.Isla WHERE id_isla = 3')
+    assert handler.cmd_verify(options) == 1
+
+
+def test_verify_error_does_not_abort_other_tables(handler, tmp_path):
+    models.Isla._insert_many(handler.db_source, [models.Isla._to_dict(isla(1))])
+    models.Isla._insert_many(handler.db_target, [models.Isla._to_dict(isla(1))])
+    results = [
+        handler.verificar_tabla({'name': 'Agora.NoExiste'}),
+        handler.verificar_tabla({'name': 'Agora.Isla', 'number': ['id_isla']}),
+        ]
+    [(missing, err, _seconds), (name, ok, _seconds)] = results
+    assert missing == 'Agora.NoExiste' and 'no such table' in err
+    assert (name, ok) == ('Agora.Isla', '')
+    options = write_manifest(
+        tmp_path, ('Agora.NoExiste', []), ('Agora.Isla', ['id_isla']),
+        )
+    assert handler.cmd_verify(options) == 1
+
+
+@pytest.mark.parametrize('filename', ['agora.toml', 'elecciones.toml'])
+def test_manifests_parse(filename):
+    path = pathlib.Path(__file__).parent.parent / 'manifests' / filename
+    with open(path, 'rb') as f:
+        tables = tomllib.load(f)['table']
+    assert tables
+    for table in tables:
+        assert isinstance(table['name'], str)
+        assert all(isinstance(name, str) for name in table.get('number', []))
+
+
+# --[ plan ]-----------------------------------------------------------
+
+
+def plan_options(**kwargs):
+    return argparse.Namespace(**{
+        'model': ['isla'],
+        'num_days': 7,
+        'batch_size': 500,
+        'incremental': False,
+        'hash_check': False,
+        'from_metrics': None,
+        'upsert': False,
+        'resume': False,
+        'verbose': False,
+        'muted': True,
+        **kwargs,
+        })
+
+
+def test_plan_counts_without_writing(handler):
+    recent = dba.as_ts_mod(DateTime.now())
+    islas = [isla(pk) for pk in (1, 2, 3)]
+    for instance in islas:
+        instance.ts_mod = recent
+    rows = [models.Isla._to_dict(instance) for instance in islas]
+    models.Isla._insert_many(handler.db_source, rows)
+    rows[1]['descripcion'] = 'Cambiada'
+    models.Isla._insert_many(handler.db_target, rows[:2])
+    assert handler.cmd_plan(plan_options()) == 0
+    stats = handler.metrics.as_dict()['Isla']
+    assert (stats['keys'], stats['inserted'], stats['updated']) == (3, 1, 1)
+    assert dba.get_scalar(handler.db_target, 'SELECT Count(*) FROM Agora.Isla') == 2
+    descripcion = dba.get_scalar(
+        handler.db_target,
+        'SELECT descripcion FROM Agora.Isla WHERE id_isla = 2',
+        )
+    assert descripcion == 'Cambiada'
+
+
+def test_plan_rejects_row_by_row(handler):
+    parser = handler.get_parser()
+    with pytest.raises(SystemExit):
+        parser.parse_args(['plan', 'isla', '--batch-size', '0'])
+    assert parser.parse_args(['plan', 'isla', '--batch-size', '10']).batch_size == 10
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import io
+import json
+
+import pytest
+
+import dba
+from metrics import Metrics
+
+
+def test_phase_counts_round_trips():
+    metrics = Metrics()
+    with metrics.phase('Sesion', 'source'):
+        dba.round_trips.add(3)
+        dba.rows_fetched.add(10)
+    metrics.count('Sesion', 'inserted', 10)
+    data = metrics.as_dict()['Sesion']
+    assert data['round_trips'] == 3
+    assert data['rows_fetched'] == 10
+    assert data['inserted'] == 10
+    assert data['calls'] == {'since': 0, 'source': 1, 'exists': 0, 'target': 0, 'write': 0}
+
+
+def test_as_prometheus():
+    metrics = Metrics()
+    with metrics.phase('Nota', 'write'):
+        pass
+    text = metrics.as_prometheus()
+    assert 'madrox_rows_total{model="Nota",kind="inserted"} 0' in text
+    assert 'madrox_phase_seconds_bucket{model="Nota",phase="write",le="+Inf"} 1' in text
+    assert 'madrox_phase_seconds_count{model="Nota",phase="write"} 1' in text
+
+
+def test_save_json_and_table(tmp_path):
+    metrics = Metrics()
+    metrics.count('Tarea', 'keys', 5)
+    filename = tmp_path / 'metrics.json'
+    metrics.save_json(filename)
+    assert json.loads(filename.read_text())['Tarea']['keys'] == 5
+    stream = io.StringIO()
+    metrics.print_table(_stdout=stream)
+    assert 'Tarea' in stream.getvalue()
+
+
+if __name__ == "__main__":
+    pytest.main()
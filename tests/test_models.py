@@ -0,0 +1,160 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import dataclasses
+
+import pytest
+
+from benchmarks import synthetic
+import dba
+import models
+from models import Model, MetaModel
+
+
+@dataclasses.dataclass
+class Parrafo(Model):
+
+    Meta = MetaModel(
+        table_name='Noticias.parrafo',
+        primary_key='id_parrafo',
+        )
+
+    id_parrafo: int
+    id_noticia: int
+    texto: str
+
+
+def test_row_loader_same_order_uses_positions():
+    loader = Parrafo._row_loader(('id_parrafo', 'id_noticia', 'texto'))
+    assert loader((1, 7, 'Hola')) == Parrafo(1, 7, 'Hola')
+    assert Parrafo._row_loader(('id_parrafo', 'id_noticia', 'texto')) is loader
+
+
+def test_row_loader_other_order_and_extra_columns():
+    loader = Parrafo._row_loader(('texto', 'extra', 'id_noticia', 'id_parrafo'))
+    assert loader(('Hola', None, 7, 1)) == Parrafo(1, 7, 'Hola')
+
+
+def test_to_dict_uses_cached_fields():
+    parrafo = Parrafo(1, 7, 'Hola')
+    assert Parrafo._field_names() == ['id_parrafo', 'id_noticia', 'texto']
+    assert Parrafo._to_dict(parrafo) == {'id_parrafo': 1, 'id_noticia': 7, 'texto': 'Hola'}
+    assert Parrafo._to_dict(parrafo, exclude={'id_parrafo'}) == {
+        'id_noticia': 7,
+        'texto': 'Hola',
+        }
+
+
+def test_iter_rows_with_rowfactory():
+    dbc = dba.get_sqlite_connection(':memory:')
+    dba.execute(dbc, 'CREATE TABLE Noticias.parrafo (id_parrafo, id_noticia, texto)')
+    dba.execute(dbc, "INSERT INTO Noticias.parrafo VALUES (1, 7, 'Hola'), (2, 7, 'Adiós')")
+    sql = 'SELECT texto, id_parrafo, id_noticia FROM Noticias.parrafo ORDER BY id_parrafo'
+    assert dba.get_rows(dbc, sql, rowfactory=Parrafo._row_loader) == [
+        Parrafo(1, 7, 'Hola'),
+        Parrafo(2, 7, 'Adiós'),
+        ]
+    assert Parrafo._load_instance(dbc, 2) == Parrafo(2, 7, 'Adiós')
+
+
+def test_catalog_models_are_slotted():
+    for _name, model in models.catalog.items():
+        assert '__dict__' not in dir(model), model
+    parrafo = models.Parrafo(1, 7, 1, 'Hola')
+    assert not hasattr(parrafo, '__dict__')
+    assert models.Parrafo._row_loader(tuple(models.Parrafo._field_names()))(
+        (1, 7, 1, 'Hola'),
+        ) == parrafo
+
+
+def test_insert_many_writes_good_rows():
+    dbc = dba.get_sqlite_connection(':memory:')
+    dba.execute(
+        dbc,
+        'CREATE TABLE Noticias.parrafo (id_parrafo PRIMARY KEY, id_noticia, texto)',
+        )
+    dba.execute(dbc, "INSERT INTO Noticias.parrafo VALUES (2, 7, 'Ya estaba')")
+    rows = [Parrafo._to_dict(Parrafo(pk, 7, f'P{pk}')) for pk in (1, 2, 3)]
+    result = Parrafo._insert_many(dbc, rows)
+    assert result.num_rows == 2
+    assert [offset for offset, _message in result.errors] == [1]
+    assert dba.get_scalar(dbc, 'SELECT Count(*) FROM Noticias.parrafo') == 3
+
+
+def test_lob_fields_are_hashed_with_dbms_crypto():
+    expression = models.Nota._hash_expression()
+    assert 'RAWTOHEX(DBMS_CRYPTO.HASH(texto, 2))' in expression
+    assert "RAWTOHEX(STANDARD_HASH(autor, 'MD5'))" in expression
+    assert 'STANDARD_HASH(texto' not in expression
+    for model, name in [
+            (models.Nota, 'texto'),
+            (models.Noticia, 'texto'),
+            (models.Asunto, 'extracto'),
+            ]:
+        assert name in model.Meta.lob_fields
+
+
+def test_load_hashes_query(monkeypatch):
+    queries = []
+    monkeypatch.setattr(
+        models.Nota, '_iter_rows',
+        classmethod(lambda cls, db, sql, *args: queries.append(str(sql)) or []),
+        )
+    assert models.Nota._load_hashes(None, [1, 2]) == {}
+    [sql] = queries
+    assert sql.startswith(
+        f'SELECT id_nota as pk, {models.Nota._hash_expression()} as hash\n'
+        )
+    assert sql.endswith('WHERE id_nota IN (:1, :2)')
+
+
+def nota(pk, numero, texto):
+    return models.Nota._to_dict(models.Nota(
+        id_nota=pk,
+        id_tarea=1,
+        numero=numero,
+        autor=7,
+        texto=texto,
+        notificar='N',
+        f_modificacion=None,
+        f_creacion=None,
+        ))
+
+
+def test_upsert_many_sqlite():
+    dbc = dba.get_sqlite_connection(':memory:')
+    synthetic.create_table(dbc, models.Nota)
+    models.Nota._insert_many(dbc, [nota(1, 1, 'Hola'), nota(2, 2, None)])
+    # La 10 coincide en claves naturales con la 1: se actualiza, sin cambiar su clave
+    result = models.Nota._upsert_many(dbc, [
+        nota(10, 1, 'Adiós'),
+        nota(2, 2, None),
+        nota(3, 3, 'Nueva'),
+        ])
+    assert result.errors == []
+    rows = dba.get_rows(dbc, 'SELECT id_nota, texto FROM Tareas.Nota ORDER BY id_nota')
+    assert rows == [
+        {'id_nota': 1, 'texto': 'Adiós'},
+        {'id_nota': 2, 'texto': None},
+        {'id_nota': 3, 'texto': 'Nueva'},
+        ]
+
+
+def test_upsert_many_oracle_compares_lobs(monkeypatch):
+    statements = []
+    monkeypatch.setattr(dba, 'dialect', lambda dbc: 'oracle')
+    monkeypatch.setattr(
+        dba, 'execute_many',
+        lambda dbc, sql, rows, batch_size, lobs: statements.append((str(sql), lobs)),
+        )
+    models.Nota._upsert_many(None, [nota(1, 1, 'Hola')])
+    [(sql, lobs)] = statements
+    assert lobs == ('texto',)
+    assert sql.startswith('MERGE INTO Tareas.Nota t')
+    assert 'DBMS_LOB.COMPARE(t.TEXTO, s.TEXTO)' in sql
+    assert 'DECODE(t.TEXTO' not in sql
+    assert 'DECODE(t.AUTOR, s.AUTOR, 0, 1) = 1' in sql
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import threading
+
+import pytest
+
+import models
+import scheduler
+
+
+def test_prerequisites_follow_depends_on():
+    result = scheduler.prerequisites([models.Tarea, models.Proyecto, models.Usuario])
+    assert result[models.Tarea] == {models.Proyecto, models.Usuario}
+    assert result[models.Proyecto] == set()
+
+
+def test_prerequisites_are_transitive():
+    result = scheduler.prerequisites([models.Jornada, models.Legislatura])
+    assert result[models.Jornada] == {models.Legislatura}
+
+
+def test_prerequisites_master_of():
+    result = scheduler.prerequisites([models.Nota, models.Tarea])
+    assert result[models.Nota] == {models.Tarea}
+
+
+def test_topological_order():
+    order = scheduler.topological_order([
+        models.Jornada,
+        models.Sesion,
+        models.Organo,
+        models.Noticia,
+        ])
+    assert order.index(models.Organo) < order.index(models.Sesion)
+    assert order.index(models.Sesion) < order.index(models.Jornada)
+
+
+def test_run_respects_dependencies():
+    done = []
+    lock = threading.Lock()
+
+    def task(worker, model):
+        with lock:
+            done.append(model)
+
+    workers = scheduler.run(
+        [models.Tarea, models.Noticia, models.Proyecto, models.Usuario],
+        task=task,
+        make_worker=object,
+        num_workers=3,
+        )
+    assert len(workers) == 3
+    assert len(done) == 4
+    assert done.index(models.Proyecto) < done.index(models.Tarea)
+    assert done.index(models.Usuario) < done.index(models.Tarea)
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import pytest
+
+from show_diff import merge_diff, get_options, Repair, MISSING, EXTRA
+import dba
+import models
+
+
+def test_merge_diff_equal():
+    assert list(merge_diff([1, 2, 3], [1, 2, 3])) == []
+
+
+def test_merge_diff_same_size_different_keys():
+    assert list(merge_diff([1, 2, 4], [1, 3, 4])) == [
+        (2, MISSING),
+        (3, EXTRA),
+        ]
+
+
+def test_merge_diff_tails():
+    assert list(merge_diff([1, 5, 6], [0, 1])) == [
+        (0, EXTRA),
+        (5, MISSING),
+        (6, MISSING),
+        ]
+
+
+def test_merge_diff_empty_target():
+    assert list(merge_diff(['A', 'B'], [])) == [('A', MISSING), ('B', MISSING)]
+
+
+def test_merge_diff_is_lazy():
+    result = merge_diff(iter(range(10**9)), iter([]))
+    assert next(result) == (0, MISSING)
+
+
+def test_merge_diff_unsorted():
+    with pytest.raises(ValueError):
+        list(merge_diff([2, 1], [1, 2]))
+
+
+def test_dry_run_requires_repair():
+    with pytest.raises(SystemExit):
+        get_options(['agora.isla', '--dry-run'])
+    options = get_options(['agora.isla', '--repair', '--dry-run'])
+    assert options.repair and options.dry_run
+
+
+# --[ Repair ]---------------------------------------------------------
+
+
+class SQLRecorder:
+
+    def __init__(self):
+        self.sql = []
+
+    def record(self, sql, seconds, num_rows):
+        self.sql.append(sql)
+
+
+@pytest.fixture
+def islas(handler, monkeypatch):
+    """Islas 1, 2 y 3 en origen; 2 y 4 en destino.
+    """
+    def isla(pk):
+        return models.Isla._to_dict(models.Isla(pk, f'Isla {pk}', '20240101000000', 'S'))
+    models.Isla._insert_many(handler.db_source, [isla(1), isla(2), isla(3)])
+    models.Isla._insert_many(handler.db_target, [isla(2), isla(4)])
+    recorder = SQLRecorder()
+    monkeypatch.setattr(dba, 'tracer', recorder)
+    return recorder
+
+
+def target_keys(handler):
+    sql = 'SELECT id_isla FROM Agora.Isla ORDER BY id_isla'
+    return [row['id_isla'] for row in dba.get_rows(handler.db_target, sql)]
+
+
+def test_repair_statements(handler, islas):
+    repair = Repair(handler, models.Isla, batch_size=10)
+    for pk, kind in [(1, MISSING), (3, MISSING), (4, EXTRA)]:
+        repair.add(pk, kind)
+    repair.close()
+    assert repair.done == {MISSING: 2, EXTRA: 1}
+    assert repair.errors == 0
+    assert target_keys(handler) == [1, 2, 3]
+    assert 'DELETE FROM Agora.Isla\n WHERE id_isla IN (?1)' in islas.sql
+    loads = [sql for sql in islas.sql if 'id_isla IN (?1, ?2)' in sql]
+    assert loads and loads[0].startswith('SELECT id_isla, descripcion, ts_mod, migrable')
+    assert any(sql.startswith('INSERT INTO Agora.Isla') for sql in islas.sql)
+
+
+def test_repair_dry_run_writes_nothing(handler, islas):
+    repair = Repair(handler, models.Isla, batch_size=1, dry_run=True)
+    for pk, kind in [(1, MISSING), (3, MISSING), (4, EXTRA)]:
+        repair.add(pk, kind)
+    repair.close()
+    assert repair.done == {MISSING: 2, EXTRA: 1}
+    assert islas.sql == []
+    assert target_keys(handler) == [2, 4]
+
+
+if __name__ == "__main__":
+    pytest.main()
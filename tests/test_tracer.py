@@ -0,0 +1,49 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+import pytest
+
+import dba
+import tracer
+
+
+def test_normalize():
+    sql = "SELECT *  FROM t\n WHERE a IN (:1, :2, :3) AND b = 'x' AND c > 10"
+    assert tracer.normalize(sql) == "SELECT * FROM t WHERE a IN (...) AND b = '?' AND c > ?"
+    assert tracer.normalize('SELECT * FROM t WHERE a IN (?1, ?2) AND b = ?3') == (
+        'SELECT * FROM t WHERE a IN (...) AND b = ?'
+        )
+
+
+def test_percentile():
+    values = [1, 2, 3, 4, 5, 6, 7, 8, 9, 10]
+    assert tracer.percentile(values, 0.5) == 5
+    assert tracer.percentile(values, 0.99) == 10
+    assert tracer.percentile([], 0.5) == 0.0
+
+
+@pytest.fixture
+def traced(monkeypatch):
+    result = tracer.Tracer()
+    monkeypatch.setattr(dba, 'tracer', result)
+    return result
+
+
+def test_tracer_groups_by_shape(traced):
+    conn = dba.get_sqlite_connection(':memory:')
+    dba.execute(conn, 'CREATE TABLE t (id INTEGER, name TEXT)')
+    for i in range(3):
+        dba.execute(conn, f"INSERT INTO t VALUES ({i}, 'n{i}')")
+    assert dba.get_rows(conn, 'SELECT * FROM t WHERE id > :1', 0) == [
+        {'id': 1, 'name': 'n1'},
+        {'id': 2, 'name': 'n2'},
+        ]
+    stats = {item['sql']: item for item in traced.stats()}
+    insert = stats["INSERT INTO t VALUES (?, '?')"]
+    assert insert['count'] == 3
+    assert insert['caller'].endswith('test_tracer.test_tracer_groups_by_shape')
+    assert stats['SELECT * FROM t WHERE id > ?']['rows'] == 2
+
+
+if __name__ == "__main__":
+    pytest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3.12
+# -*- coding: utf-8 -*-
+
+"""Trazas de las sentencias SQL que pasan por `dba`.
+
+Es opcional: se activa con `install()` (o con `madrox --trace-sql N`).
+Cada sentencia se apunta con su duración, las filas devueltas y el
+método del modelo desde el que se ejecutó (`Sesion._load_instance`,
+`Nota.not_exists`, ...). Al terminar, las sentencias se agrupan por su
+forma (sin literales y con las listas `IN` resumidas) y se muestran las
+`top` que más tiempo han consumido, con sus percentiles de latencia.
+Así se ven los patrones N+1 del camino fila a fila.
+"""
+
+import atexit
+import collections
+import re
+import sys
+import threading
+
+from clitools import Tabula
+import dba
+
+# Variables de enlace de Oracle (`:1`, `:nombre`), SQLite (`?1`) y
+# PostgreSQL (`%(p1)s`), ya que se traza la sentencia traducida
+_BIND = r'(?::\w+|\?\d*|%\(\w+\)s)'
+_BINDS = re.compile(_BIND)
+_STRINGS = re.compile(r"'(?:[^']|'')*'")
+_NUMBERS = re.compile(r'\b\d+(?:\.\d+)?\b')
+_BIND_LISTS = re.compile(rf'\(\s*{_BIND}(?:\s*,\s*{_BIND})+\s*\)')
+_BIND_TUPLES = re.compile(r'\(\s*\(\.\.\.\)(?:\s*,\s*\(\.\.\.\))+\s*\)')
+_SPACES = re.compile(r'\s+')
+
+
+def normalize(sql) -> str:
+    """Forma de una sentencia: sin literales, con las listas de variables
+    de enlace resumidas como `(...)` y con los espacios normalizados.
+    """
+    sql = _STRINGS.sub("'?'", sql)
+    sql = _BIND_LISTS.sub('(...)', sql)
+    sql = _BIND_TUPLES.sub('(...)', sql)
+    sql = _BINDS.sub('?', sql)
+    sql = _NUMBERS.sub('?', sql)
+    return _SPACES.sub(' ', sql).strip()
+
+
+def percentile(values, fraction):
+    """Percentil por el método del rango más cercano; `values` ordenados.
+    """
+    if not values:
+        return 0.0
+    index = max(0, min(len(values) - 1, round(fraction * len(values)) - 1))
+    return values[index]
+
+
+def caller() -> str:
+    """Método del modelo (o, si no hay, función) que lanzó la sentencia.
+    """
+    frame = sys._getframe(2)
+    first = None
+    while frame is not None:
+        module = frame.f_globals.get('__name__')
+        if module not in ('dba', 'tracer', 'contextlib'):
+            name = frame.f_code.co_name
+            if first is None:
+                first = f'{module}.{name}'
+            if module == 'models':
+                owner = frame.f_locals.get('cls') or type(frame.f_locals.get('self'))
+                return f'{getattr(owner, "__name__", module)}.{name}'
+        frame = frame.f_back
+    return first or '?'
+
+
+class Tracer:
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.calls = collections.defaultdict(list)
+
+    def record(self, sql, seconds, num_rows):
+        key = (sql, caller())
+        with self.lock:
+            self.calls[key].append((seconds, num_rows))
+
+    def stats(self) -> list[dict]:
+        """Estadísticas por forma de sentencia y método, de más a menos
+        tiempo total.
+        """
+        groups = collections.defaultdict(list)
+        with self.lock:
+            for (sql, where), calls in self.calls.items():
+                groups[(normalize(sql), where)].extend(calls)
+        result = []
+        for (shape, where), calls in groups.items():
+            latencies = sorted(seconds for seconds, _num_rows in calls)
+            result.append({
+                'sql': shape,
+                'caller': where,
+                'count': len(calls),
+                'total': sum(latencies),
+                'p50': percentile(latencies, 0.50),
+                'p95': percentile(latencies, 0.95),
+                'p99': percentile(latencies, 0.99),
+                'rows': sum(num_rows for _seconds, num_rows in calls),
+                })
+        result.sort(key=lambda item: item['total'], reverse=True)
+        return result
+
+    def report(self, top=20, **kwargs):
+        stats = self.stats()
+        if not stats:
+            return
+        width = max(len(item['caller']) for item in stats[:top])
+        with Tabula(
+                llamadas=-8, total=-9, p50=-8, p95=-8, p99=-8, filas=-8,
+                metodo=max(width, 6), sql=70, **kwargs,
+                ) as tab:
+            for item in stats[:top]:
+                tab(
+                    item['count'],
+                    f"{item['total']:.3f}",
+                    *[f'{item[name] * 1000:.2f}' for name in ('p50', 'p95', 'p99')],
+                    item['rows'],
+                    item['caller'],
+                    item['sql'][:70],
+                    )
+
+
+def install(top=20) -> Tracer:
+    """Activar las trazas en `dba` y mostrar el informe al salir.
+
+    Las latencias del informe están en milisegundos; el total, en segundos.
+    """
+    tracer = Tracer()
+    dba.tracer = tracer
+    atexit.register(tracer.report, top=top)
+    return tracer